@@ -2,15 +2,26 @@ import streamlit as st
 import pandas as pd
 import io
 import os
+import tempfile
 
 # --- IMPORTS DE TU LÓGICA ---
 import logic.utils as utils 
-from logic.config import MAPA_TITULACIONES
+import logic.instrumentacion as instrumentacion
+import logic.trabajos as trabajos
+from logic.config import (
+    MAPA_TITULACIONES, INSTRUMENTAR_MEMORIA,
+    FORMATOS_GRAFICAS, FORMATO_GRAFICAS, DPI_GRAFICAS, CALIDAD_JPEG, RECORTE_AJUSTADO, FILAS_TABLA_PPT,
+    DIR_EXPORTACIONES,
+)
+from logic.cargar_excel import cargar_excel, hash_contenido
+from logic.almacen_encuestas import ingerir_excel, consultar_almacen, hay_almacen, version_almacen
 from logic.obtener_datos_subgrupo import obtener_datos_subgrupo
 from logic.generar_resumen_datos import generar_resumen_datos
-from logic.generar_partes_docentes import generar_partes_docentes
-from logic.genera_graficas import genera_graficas
-from logic.generar_ppt import generar_ppt 
+from logic.cubo_kpis import construir_cubo, indicadores_cubo
+from logic.exportar_zip import exportar_zip_a_disco, ARTEFACTOS
+from logic.generar_partes_docentes import generar_partes_docentes_stream
+from logic.genera_graficas import renderizar_graficas
+from logic.generar_ppt import generar_ppt, MODO_NATIVO, MODO_IMAGEN
 # NUEVO IMPORT
 from logic.generar_acta_texto import generar_acta_texto
 
@@ -27,6 +38,118 @@ Esta aplicación procesa las encuestas docentes, genera visualizaciones y permit
 el informe final en formato Word y la presentación en PowerPoint.
 """)
 
+# --- CARGA DE DATOS (COMPARTIDA ENTRE RERUNS) ---
+@st.cache_resource(max_entries=4, show_spinner=False)
+def cargar_datos(contenido, titulacion):
+    """Excel parseado (fechas ya en datetime64) y su índice ordenado de fechas."""
+    df = cargar_excel(contenido, titulacion)
+    return df, utils.IndiceFechas(df)
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def ingerir_en_almacen(contenido):
+    """Añade al almacén histórico las respuestas nuevas (una vez por fichero subido)."""
+    return ingerir_excel(contenido)
+
+# --- TRABAJOS EN SEGUNDO PLANO ---
+# Se ejecutan en logic/trabajos.py (fuera del hilo de Streamlit) y reciben el
+# callback 'progreso'. El resultado queda en el almacén de trabajos, así que
+# también hace de caché por (tipo, clave).
+
+def trabajo_word(df_subgrupo, progreso):
+    buffer = io.BytesIO()
+    generar_partes_docentes_stream(df_subgrupo, buffer,
+                                   progreso=trabajos.subprogreso(progreso, 0, 1, "Asignaturas"))
+    return buffer.getvalue()
+
+def trabajo_graficas(df_resumen, opciones, progreso):
+    informe = {}
+    imagenes = renderizar_graficas(df_resumen, progreso=trabajos.subprogreso(progreso, 0, 1, "Gráficas"),
+                                   informe=informe, **opciones)
+    return imagenes, informe
+
+def trabajo_prompt(df_subgrupo, progreso):
+    return generar_acta_texto(df_subgrupo, progreso=trabajos.subprogreso(progreso, 0, 1, "Asignaturas"))
+
+def trabajo_ppt(df_resumen, contenido_json, modo_graficas, opciones, filas_tabla, progreso):
+    # 1. Las figuras (reutiliza la caché de la pestaña Gráficas); las nativas no las necesitan.
+    #    PowerPoint no admite SVG: en ese caso se incrustan en PNG
+    figuras = None
+    inicio_diapositivas = 0
+    if modo_graficas == MODO_IMAGEN:
+        opciones = dict(opciones, formato="png") if opciones["formato"] == "svg" else opciones
+        figuras = renderizar_graficas(df_resumen, progreso=trabajos.subprogreso(progreso, 0, 0.7, "Gráficas"),
+                                      **opciones)
+        inicio_diapositivas = 0.7
+
+    # 2. JSON de la IA en un fichero temporal (se borra siempre al terminar)
+    ruta_json = None
+    if contenido_json:
+        with tempfile.NamedTemporaryFile("wb", suffix=".json", delete=False) as f:
+            f.write(contenido_json)
+            ruta_json = f.name
+    try:
+        buffer = generar_ppt(df_resumen, figuras, ruta_json=ruta_json, modo_graficas=modo_graficas,
+                             filas_tabla=filas_tabla,
+                             progreso=trabajos.subprogreso(progreso, inicio_diapositivas, 1, "Diapositivas"))
+    finally:
+        if ruta_json and os.path.exists(ruta_json):
+            os.remove(ruta_json)
+    return buffer.getvalue()
+
+def trabajo_cubo(contenido, f_inicio_str, f_fin_str, progreso):
+    # Todas las titulaciones: Excel completo (caché en disco) o almacén sin podar por titulación
+    if contenido is None:
+        df = consultar_almacen(f_inicio_str, f_fin_str)
+    else:
+        df = utils.filtrar_por_fechas(cargar_excel(contenido), f_inicio_str, f_fin_str)
+    return construir_cubo(df, progreso=trabajos.subprogreso(progreso, 0, 1, "Titulaciones"))
+
+def trabajo_exportar(contenido, f_inicio_str, f_fin_str, codigos, artefactos, modo_graficas,
+                     opciones, filas_tabla, ruta_zip, progreso):
+    # Una sola lectura y filtrado para todos los subgrupos (solo sus columnas, si es un Excel)
+    if contenido is None:
+        df = consultar_almacen(f_inicio_str, f_fin_str)
+    else:
+        df = utils.filtrar_por_fechas(cargar_excel(contenido, codigos), f_inicio_str, f_fin_str)
+
+    # El ZIP se escribe en disco según se generan los ficheros (memoria acotada);
+    # el directorio se mantiene dentro de LIMITE_EXPORTACIONES_MB
+    informe = exportar_zip_a_disco(df, ruta_zip, codigos, artefactos, modo_graficas, opciones, filas_tabla,
+                                   progreso=trabajos.subprogreso(progreso, 0, 1, "Ficheros"))
+    return ruta_zip, informe
+
+@st.fragment(run_every=0.5)
+def progreso_trabajo(id_trabajo):
+    """Barra de progreso que se refresca sola; al terminar relanza la app para mostrar el resultado."""
+    trabajo = trabajos.obtener_trabajo(id_trabajo)
+    if trabajo is None or not trabajo.en_curso:
+        st.rerun()
+    st.progress(trabajo.progreso, text=trabajo.mensaje)
+
+def panel_trabajo(tipo, clave, funcion, *args, etiqueta_boton=None, key=None):
+    """
+    Lanza el trabajo al pulsar el botón (o directamente si no hay botón) y
+    muestra su progreso. Devuelve el trabajo cuando ha terminado; si no, None.
+    Pulsar otra vez o cambiar un widget no relanza un trabajo ya en marcha.
+    Un trabajo fallido nunca se relanza solo: hay que pulsar "Reintentar".
+    """
+    trabajo = trabajos.buscar_trabajo(tipo, clave)
+    if trabajo is not None and trabajo.estado == trabajos.ERROR:
+        st.error(f"Error en el trabajo anterior: {trabajo.error}")
+        if not st.button("🔁 Reintentar", key=f"{key or tipo}_reintentar"):
+            return None
+        trabajo = None
+    elif trabajo is None and etiqueta_boton and not st.button(etiqueta_boton, key=key):
+        return None
+
+    if trabajo is None:
+        trabajo = trabajos.obtener_trabajo(trabajos.enviar_trabajo(tipo, clave, funcion, *args))
+
+    if trabajo.en_curso:
+        progreso_trabajo(trabajo.id)
+        return None
+    return trabajo
+
 # --- BARRA LATERAL (SIDEBAR) ---
 with st.sidebar:
     st.header("Configuración")
@@ -44,19 +167,52 @@ with st.sidebar:
     fecha_inicio = st.date_input("Fecha Inicio Filtro", value=pd.to_datetime("2024-01-01"))
     fecha_fin = st.date_input("Fecha Fin Filtro (Opcional)", value=None)
 
+    st.markdown("---")
+
+    # 4. Almacén histórico (carga incremental de exportaciones acumuladas)
+    usar_almacen = st.checkbox(
+        "Usar almacén histórico",
+        value=hay_almacen(),
+        help="El Excel subido solo añade las respuestas nuevas; las consultas se leen del almacén."
+    )
+
+    st.markdown("---")
+
+    # 5. Rendimiento (la tabla se rellena al final, con las etapas de esta ejecución)
+    with st.expander("⏱️ Rendimiento"):
+        instrumentacion.activar_memoria(
+            st.checkbox("Medir memoria (más lento)", value=INSTRUMENTAR_MEMORIA)
+        )
+        panel_rendimiento = st.container()
+
 # --- LÓGICA PRINCIPAL ---
-if uploaded_file is not None:
+if uploaded_file is not None or usar_almacen:
     try:
         # Carga de datos con spinner visual
         with st.spinner('Cargando y procesando archivo...'):
-            df_raw = pd.read_excel(uploaded_file)
-            
             # Preparar fechas 
             f_inicio_str = fecha_inicio.strftime('%d-%m-%Y')
             f_fin_str = fecha_fin.strftime('%d-%m-%Y') if fecha_fin else None
-            
-            # Filtramos el DataFrame completo
-            df_filtrado = utils.filtrar_por_fechas(df_raw, f_inicio_str, f_fin_str)
+
+            if usar_almacen:
+                # Solo se ingieren las respuestas nuevas; la consulta lee únicamente
+                # las particiones (curso/cuatrimestre) del rango y la titulación
+                if uploaded_file is not None:
+                    informe_almacen = ingerir_en_almacen(uploaded_file.getvalue())
+                    st.sidebar.caption(
+                        f"📦 Almacén: {informe_almacen['nuevas']} respuestas nuevas, "
+                        f"{informe_almacen['duplicadas']} repetidas."
+                    )
+                df_filtrado = consultar_almacen(f_inicio_str, f_fin_str, titulacion_seleccionada)
+                origen_datos = f"almacen:{version_almacen()}"
+            else:
+                # Caché por hash del contenido: los reruns no vuelven a parsear el Excel.
+                # Solo se leen las columnas que necesita la titulación seleccionada.
+                df_raw, indice_fechas = cargar_datos(uploaded_file.getvalue(), titulacion_seleccionada)
+
+                # Filtramos el DataFrame completo (búsqueda binaria sobre el índice de fechas)
+                df_filtrado = utils.filtrar_por_fechas(df_raw, f_inicio_str, f_fin_str, indice=indice_fechas)
+                origen_datos = hash_contenido(uploaded_file.getvalue())
             
             # Obtenemos solo los datos de la titulación seleccionada
             df_subgrupo = obtener_datos_subgrupo(df_filtrado, titulacion_seleccionada)
@@ -66,9 +222,12 @@ if uploaded_file is not None:
             
             # Generación de Resumen Numérico
             df_resumen = generar_resumen_datos(df_subgrupo)
+
+            # Clave de los trabajos: mismos datos de origen, titulación y fechas
+            clave_datos = (origen_datos, titulacion_seleccionada, f_inicio_str, f_fin_str)
             
             # --- TABS DE RESULTADOS ---
-            tab1, tab2, tab3 = st.tabs(["📋 Datos y KPIs", "📈 Gráficas", "📥 Exportar Informes"])
+            tab1, tab2, tab3, tab4 = st.tabs(["📋 Datos y KPIs", "📈 Gráficas", "📥 Exportar Informes", "🏛️ Comparativa"])
             
             # TAB 1: DATOS
             with tab1:
@@ -89,16 +248,48 @@ if uploaded_file is not None:
             with tab2:
                 st.subheader("Visualización de Resultados")
                 
-                if st.button("Generar Gráficas de Análisis"):
-                    with st.spinner("Generando gráficas..."):
-                        lista_figuras = genera_graficas(df_resumen)
-                        
-                        if lista_figuras:
-                            for titulo, fig in lista_figuras:
-                                st.markdown(f"### {titulo}")
-                                st.pyplot(fig)
-                        else:
-                            st.warning("No hay datos suficientes para generar las gráficas.")
+                # Opciones de imagen (también para el PPT con gráficas en imagen)
+                with st.expander("⚙️ Opciones de imagen"):
+                    col_formato, col_dpi = st.columns(2)
+                    formato = col_formato.selectbox(
+                        "Formato", FORMATOS_GRAFICAS, index=FORMATOS_GRAFICAS.index(FORMATO_GRAFICAS),
+                        key="sel_formato_graficas"
+                    )
+                    dpi = col_dpi.slider("Resolución (dpi)", 50, 300, DPI_GRAFICAS, step=25, key="sld_dpi_graficas")
+                    opciones_imagen = {"formato": formato, "dpi": dpi, "compresion": None,
+                                       "calidad": CALIDAD_JPEG, "recorte": RECORTE_AJUSTADO}
+                    if formato == "png":
+                        opciones_imagen["compresion"] = st.slider(
+                            "Compresión PNG (0 = más rápida, 9 = más pequeña)", 0, 9, 6, key="sld_compresion_png"
+                        )
+                    elif formato == "jpeg":
+                        opciones_imagen["calidad"] = st.slider("Calidad JPEG", 10, 95, CALIDAD_JPEG, key="sld_calidad_jpeg")
+                    opciones_imagen["recorte"] = st.checkbox(
+                        "Recortar márgenes (más lento)", value=RECORTE_AJUSTADO, key="chk_recorte_graficas"
+                    )
+                    if formato == "svg":
+                        st.caption("En el PowerPoint las gráficas SVG se incrustan en PNG.")
+                
+                # Imágenes ya codificadas (figuras cerradas y cacheadas para el PPT)
+                clave_graficas = clave_datos + tuple(sorted(opciones_imagen.items()))
+                trabajo = panel_trabajo("graficas", clave_graficas, trabajo_graficas, df_resumen, opciones_imagen,
+                                        etiqueta_boton="Generar Gráficas de Análisis", key="btn_graficas")
+                if trabajo is not None:
+                    lista_figuras, informe_imagenes = trabajo.resultado
+                    
+                    if lista_figuras:
+                        st.caption(
+                            f"🖼️ {informe_imagenes['imagenes']} imágenes ({informe_imagenes['unicas']} únicas) · "
+                            f"{informe_imagenes['bytes'] / 1024:.0f} KB · "
+                            f"codificación {informe_imagenes['tiempo_codificacion_s']:.2f}s"
+                            + (" (caché)" if informe_imagenes["cache"] else "")
+                        )
+                        for titulo, imagen in lista_figuras:
+                            st.markdown(f"### {titulo}")
+                            # st.image acepta SVG como texto
+                            st.image(imagen.decode("utf-8") if formato == "svg" else imagen)
+                    else:
+                        st.warning("No hay datos suficientes para generar las gráficas.")
 
             # TAB 3: EXPORTAR (WORD Y PPT)
             with tab3:
@@ -112,16 +303,18 @@ if uploaded_file is not None:
                     st.markdown("### 📄 Informe Word")
                     st.info("Informe detallado con tablas y comentarios.")
                     
-                    # Generamos el Word en memoria
-                    buffer_word = generar_partes_docentes(df_subgrupo)
-                    
-                    st.download_button(
-                        label="Descargar Informe .DOCX",
-                        data=buffer_word,
-                        file_name=f"Informe_Calidad_{titulacion_seleccionada}.docx",
-                        mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-                        key="btn_word"
-                    )
+                    # El Word solo se genera cuando se pide; después se sirve desde el
+                    # almacén de trabajos mientras no cambien el fichero, la titulación o las fechas
+                    trabajo = panel_trabajo("word", clave_datos, trabajo_word, df_subgrupo,
+                                            etiqueta_boton="Preparar Informe Word", key="btn_prep_word")
+                    if trabajo is not None:
+                        st.download_button(
+                            label="Descargar Informe .DOCX",
+                            data=trabajo.resultado,
+                            file_name=f"Informe_Calidad_{titulacion_seleccionada}.docx",
+                            mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+                            key="btn_word"
+                        )
                 
                 # --- COLUMNA 2: POWERPOINT ---
                 with col_ppt:
@@ -148,14 +341,15 @@ if uploaded_file is not None:
                                 with open(ruta_plantilla_txt, "r", encoding="utf-8") as f:
                                     instrucciones_prompt = f.read()
                                 
-                                # 2. Generar el texto plano de los datos (tu función lógica)
-                                texto_datos = generar_acta_texto(df_subgrupo)
-                                
-                                # 3. Concatenar
-                                prompt_completo = instrucciones_prompt + "\n\n" + texto_datos
+                                # 2. Generar el texto plano de los datos (en segundo plano)
+                                trabajo = panel_trabajo("prompt", clave_datos, trabajo_prompt, df_subgrupo)
                                 
-                                # 4. Mostrar bloque de código con botón de copiar nativo
-                                st.code(prompt_completo, language="text")
+                                if trabajo is not None:
+                                    # 3. Concatenar
+                                    prompt_completo = instrucciones_prompt + "\n\n" + trabajo.resultado
+                                    
+                                    # 4. Mostrar bloque de código con botón de copiar nativo
+                                    st.code(prompt_completo, language="text")
                             except Exception as e:
                                 st.error(f"Error al leer la plantilla o generar texto: {e}")
 
@@ -175,45 +369,132 @@ if uploaded_file is not None:
                     if uploaded_json:
                         st.success("✅ JSON cargado. Se usará para rellenar la plantilla.")
                     
-                    # Botón para generar el PPT
-                    if st.button("Generar PowerPoint", key="btn_prep_ppt"):
-                        with st.spinner("Inyectando datos y gráficas en la plantilla..."):
-                            try:
-                                # 1. Necesitamos las figuras para el PPT
-                                figs_para_ppt = genera_graficas(df_resumen)
-                                
-                                # 2. GESTIÓN DEL ARCHIVO JSON TEMPORAL
-                                ruta_temporal_json = None
-                                if uploaded_json is not None:
-                                    ruta_temporal_json = f"temp_acta_{titulacion_seleccionada}.json"
-                                    with open(ruta_temporal_json, "wb") as f:
-                                        f.write(uploaded_json.getbuffer())
-                                
-                                # 3. Generamos el archivo PPT
-                                buffer_ppt = generar_ppt(
-                                    df_resumen, 
-                                    figs_para_ppt, 
-                                    ruta_json=ruta_temporal_json
-                                )
-                                
-                                # 4. Botón de descarga
-                                st.success("✅ Presentación generada correctamente")
+                    # Gráficas nativas: editables y sin renderizar imágenes (más rápido y ligero)
+                    modos_graficas = {"Nativas (editables)": MODO_NATIVO, "Imágenes": MODO_IMAGEN}
+                    modo_graficas = modos_graficas[st.radio(
+                        "Gráficas del PowerPoint", list(modos_graficas), horizontal=True, key="radio_modo_ppt"
+                    )]
+                    filas_tabla = st.number_input(
+                        "Filas de la tabla resumen por diapositiva", min_value=5, max_value=30,
+                        value=FILAS_TABLA_PPT, key="num_filas_tabla"
+                    )
+                    
+                    # Botón para generar el PPT (en segundo plano, con barra de progreso)
+                    contenido_json = uploaded_json.getvalue() if uploaded_json is not None else None
+                    opciones_ppt = opciones_imagen if modo_graficas == MODO_IMAGEN else None
+                    clave_ppt = clave_datos + (hash_contenido(contenido_json) if contenido_json else None, modo_graficas,
+                                               tuple(sorted(opciones_ppt.items())) if opciones_ppt else None, filas_tabla)
+                    
+                    trabajo = panel_trabajo("ppt", clave_ppt, trabajo_ppt, df_resumen, contenido_json,
+                                            modo_graficas, opciones_imagen, filas_tabla,
+                                            etiqueta_boton="Generar PowerPoint", key="btn_prep_ppt")
+                    if trabajo is not None:
+                        st.success("✅ Presentación generada correctamente")
+                        st.download_button(
+                            label="Descargar Presentación .PPTX",
+                            data=trabajo.resultado,
+                            file_name=f"Presentacion_{titulacion_seleccionada}.pptx",
+                            mime="application/vnd.openxmlformats-officedocument.presentationml.presentation",
+                            key="btn_down_ppt"
+                        )
+                
+                # --- EXPORTAR TODO (ZIP de todos los subgrupos) ---
+                st.markdown("---")
+                st.markdown("#### 📦 Exportar todo")
+                st.caption("Word, PowerPoint y prompt de varios subgrupos en un único ZIP, con las fechas del filtro.")
+                
+                codigos_zip = st.multiselect(
+                    "Subgrupos", list(MAPA_TITULACIONES.keys()),
+                    default=list(MAPA_TITULACIONES.keys()), key="sel_codigos_zip"
+                )
+                artefactos_zip = st.multiselect(
+                    "Ficheros", ARTEFACTOS, default=ARTEFACTOS, key="sel_artefactos_zip"
+                )
+                
+                if codigos_zip and artefactos_zip:
+                    opciones_zip = opciones_imagen if modo_graficas == MODO_IMAGEN else None
+                    clave_zip = (origen_datos, f_inicio_str, f_fin_str, tuple(codigos_zip), tuple(artefactos_zip),
+                                 modo_graficas, tuple(sorted(opciones_zip.items())) if opciones_zip else None,
+                                 filas_tabla)
+                    ruta_zip = os.path.join(DIR_EXPORTACIONES, hash_contenido(repr(clave_zip).encode())[:16] + ".zip")
+                    contenido_zip = None if usar_almacen else uploaded_file.getvalue()
+                    
+                    trabajo = panel_trabajo("zip", clave_zip, trabajo_exportar, contenido_zip, f_inicio_str, f_fin_str,
+                                            codigos_zip, artefactos_zip, modo_graficas, opciones_zip, filas_tabla,
+                                            ruta_zip,
+                                            etiqueta_boton="Exportar todo (ZIP)", key="btn_exportar_zip")
+                    if trabajo is not None:
+                        ruta_generada, informe_zip = trabajo.resultado
+                        errores = [s["codigo"] for s in informe_zip["subgrupos"] if s["estado"] == "error"]
+                        n_ficheros = sum(len(s["ficheros"]) for s in informe_zip["subgrupos"])
+                        st.caption(f"📦 {n_ficheros} ficheros en {informe_zip['tiempo_total']:.1f}s"
+                                   + (f" · ❌ errores en: {', '.join(errores)}" if errores else ""))
+                        
+                        if os.path.exists(ruta_generada):
+                            # El mtime hace de marca de último uso para limpiar_exportaciones
+                            os.utime(ruta_generada)
+                            with open(ruta_generada, "rb") as f:
                                 st.download_button(
-                                    label="Descargar Presentación .PPTX",
-                                    data=buffer_ppt,
-                                    file_name=f"Presentacion_{titulacion_seleccionada}.pptx",
-                                    mime="application/vnd.openxmlformats-officedocument.presentationml.presentation",
-                                    key="btn_down_ppt"
+                                    label="Descargar ZIP",
+                                    data=f,
+                                    file_name=f"Informes_{f_inicio_str}.zip",
+                                    mime="application/zip",
+                                    key="btn_down_zip"
                                 )
-
-                                # 5. LIMPIEZA: Borramos el json temporal si se creó
-                                if ruta_temporal_json and os.path.exists(ruta_temporal_json):
-                                    os.remove(ruta_temporal_json)
-
-                            except Exception as e:
-                                st.error(f"Error al generar el PowerPoint: {e}")
-                                st.warning("Por favor, verifica que el archivo 'Plantilla_ReunionesCoordinacionFinCuatrimestre.pptx' existe en la carpeta 'assets'.")
+                        else:
+                            st.warning("El ZIP ya no está en disco; cambia alguna opción para volver a generarlo.")
+                
+            # TAB 4: COMPARATIVA ENTRE TITULACIONES
+            with tab4:
+                st.subheader("Comparativa entre titulaciones")
+                st.caption("Cubo de KPIs de todas las titulaciones x curso x cuatrimestre para el rango de fechas.")
                 
+                # El cubo se calcula bajo demanda, una vez por datos y fechas (en segundo
+                # plano); después las comparaciones y el desglose son solo agregaciones sobre él
+                clave_cubo = (origen_datos, f_inicio_str, f_fin_str)
+                contenido_cubo = None if usar_almacen else uploaded_file.getvalue()
+                trabajo = panel_trabajo("cubo", clave_cubo, trabajo_cubo, contenido_cubo, f_inicio_str, f_fin_str,
+                                        etiqueta_boton="Calcular comparativa", key="btn_cubo")
+                
+                if trabajo is not None:
+                    cubo = trabajo.resultado
+                    
+                    if cubo.empty:
+                        st.warning("No hay datos de ninguna titulación en el rango de fechas.")
+                    else:
+                        por_titulacion = indicadores_cubo(cubo, ["Titulación"])
+                        
+                        col1, col2 = st.columns(2)
+                        indicador = col1.selectbox(
+                            "Indicador",
+                            ["% Aprobados (media)", "% Aprobados (ponderado)", "Valoración Resultados", "Valoración Grupo"],
+                            key="sel_indicador_cubo"
+                        )
+                        seleccion = col2.multiselect(
+                            "Titulaciones",
+                            por_titulacion["Titulación"].tolist(),
+                            default=por_titulacion["Titulación"].tolist(),
+                            key="sel_titulaciones_cubo"
+                        )
+                        
+                        comparativa = por_titulacion[por_titulacion["Titulación"].isin(seleccion)]
+                        st.bar_chart(comparativa.set_index("Titulación")[indicador])
+                        st.dataframe(comparativa, hide_index=True)
+                        
+                        # Desglose (drill-down) de una titulación por curso y cuatrimestre
+                        st.markdown("#### Desglose por curso y cuatrimestre")
+                        codigos_cubo = por_titulacion["Titulación"].tolist()
+                        titulacion_desglose = st.selectbox(
+                            "Titulación",
+                            codigos_cubo,
+                            index=codigos_cubo.index(titulacion_seleccionada) if titulacion_seleccionada in codigos_cubo else 0,
+                            key="sel_desglose_cubo"
+                        )
+                        cubo_titulacion = cubo[cubo["Titulación"] == titulacion_desglose]
+                        
+                        st.dataframe(indicadores_cubo(cubo_titulacion, ["Curso"]), hide_index=True)
+                        st.dataframe(indicadores_cubo(cubo_titulacion, ["Curso", "Cuatrimestre"]), hide_index=True)
+
         else:
             st.error("❌ No se encontraron datos.")
             st.warning(f"Revisa que la titulación '{titulacion_seleccionada}' tenga datos en el rango de fechas seleccionado.")
@@ -223,3 +504,19 @@ if uploaded_file is not None:
         st.exception(e)
 else:
     st.info("👋 Por favor, carga un archivo Excel en la barra lateral para comenzar.")
+
+# --- PANEL DE RENDIMIENTO ---
+with panel_rendimiento:
+    medidas = instrumentacion.medidas()
+    if medidas:
+        columnas_panel = ["etapa", "tiempo_s", "cpu_s", "memoria_pico_mb", "filas_entrada", "filas_salida"]
+        st.dataframe(pd.DataFrame(medidas[::-1])[columnas_panel].head(50), hide_index=True)
+    else:
+        st.caption("Todavía no hay medidas.")
+
+    st.download_button("Exportar JSON", data=instrumentacion.exportar_json(),
+                       file_name="rendimiento.json", mime="application/json", key="btn_rend_json")
+    st.download_button("Exportar Prometheus", data=instrumentacion.exportar_prometheus(),
+                       file_name="rendimiento.prom", mime="text/plain", key="btn_rend_prom")
+    if st.button("Limpiar medidas", key="btn_rend_limpiar"):
+        instrumentacion.limpiar_medidas()
@@ -0,0 +1,200 @@
+"""
+Benchmark de las etapas del informe sobre Excel sintéticos de distintos tamaños.
+
+Mide, para cada tamaño, el tiempo (mínimo y mediana de varias repeticiones) y el
+pico de memoria (tracemalloc, en una ejecución aparte) de cada etapa, y guarda el
+resultado en JSON para comparar versiones.
+
+Ejemplo:
+    python -m benchmarks.benchmark_etapas --filas 100 1000 10000 --salida bench_nuevo.json
+    python -m benchmarks.benchmark_etapas --filas 1000 --comparar bench_anterior.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+
+import matplotlib
+matplotlib.use("Agg")
+
+import pandas as pd
+
+import logic.utils as utils
+import logic.genera_graficas as genera_graficas
+import logic.generar_acta_texto as generar_acta_texto
+from logic.cargar_excel import cargar_excel
+from logic.instrumentacion import medir_etapa, activar_memoria
+from logic.obtener_datos_subgrupo import obtener_datos_subgrupo
+from logic.generar_resumen_datos import generar_resumen_datos
+from logic.generar_partes_docentes import generar_partes_docentes
+from logic.generar_ppt import generar_ppt, MODO_NATIVO
+from benchmarks.datos_sinteticos import generar_encuestas
+
+DIR_DATOS = os.path.join(".cache", "benchmarks")
+
+# -----------------------------------------------------------------------------
+# Medición
+# -----------------------------------------------------------------------------
+
+def _limpiar_memoizacion():
+    """Vacía las cachés en memoria para medir siempre en frío."""
+    genera_graficas._cache_graficas.clear()
+    generar_acta_texto._cache_acta.clear()
+
+def _filas(resultado):
+    """Filas (o elementos) de la salida de una etapa, si tiene sentido contarlas."""
+    if isinstance(resultado, pd.DataFrame):
+        return len(resultado)
+    if isinstance(resultado, (list, tuple)):
+        return len(resultado)
+    return None
+
+def medir(funcion, repeticiones):
+    """
+    Ejecuta funcion() 'repeticiones' veces (en frío) y una más midiendo la memoria.
+    Devuelve (resultado, métricas).
+    """
+    tiempos = []
+    for _ in range(repeticiones):
+        _limpiar_memoizacion()
+        with contextlib.redirect_stdout(io.StringIO()):
+            t0 = time.perf_counter()
+            resultado = funcion()
+            tiempos.append(time.perf_counter() - t0)
+
+    _limpiar_memoizacion()
+    with contextlib.redirect_stdout(io.StringIO()):
+        with medir_etapa("benchmark", memoria=True) as medida:
+            funcion()
+
+    return resultado, {
+        "tiempo_min": round(min(tiempos), 4),
+        "tiempo_mediana": round(statistics.median(tiempos), 4),
+        "memoria_pico_mb": medida["memoria_pico_mb"],
+        "filas_salida": _filas(resultado),
+    }
+
+def ruta_excel_sintetico(n_filas, semilla):
+    """Genera (una sola vez) el Excel sintético de n_filas y devuelve su ruta."""
+    os.makedirs(DIR_DATOS, exist_ok=True)
+    ruta = os.path.join(DIR_DATOS, f"encuestas_{n_filas}_{semilla}.xlsx")
+    if not os.path.exists(ruta):
+        print(f"🧪 Generando Excel sintético de {n_filas} filas...")
+        generar_encuestas(n_filas, semilla).to_excel(ruta, index=False)
+    return ruta
+
+def benchmark_tamano(n_filas, args):
+    """Mide todas las etapas para un tamaño. Cada etapa parte de la salida de la anterior."""
+    ruta = ruta_excel_sintetico(n_filas, args.semilla)
+    etapas = {}
+
+    def etapa(nombre, funcion):
+        resultado, etapas[nombre] = medir(funcion, args.repeticiones)
+        print(f"   {nombre:<26}{etapas[nombre]['tiempo_mediana']:>10.3f}s"
+              f"{etapas[nombre]['memoria_pico_mb']:>10.1f} MB")
+        return resultado
+
+    print(f"\n📏 {n_filas} filas ({args.subgrupo})")
+    with tempfile.TemporaryDirectory() as dir_cache:
+        # Lectura en frío: caché de disco vacía en cada repetición
+        def leer_excel():
+            for nombre in os.listdir(dir_cache):
+                os.remove(os.path.join(dir_cache, nombre))
+            return cargar_excel(ruta, directorio=dir_cache)
+        df_raw = etapa("lectura_excel", leer_excel)
+
+    df_filtrado = etapa("filtrar_por_fechas",
+                        lambda: utils.filtrar_por_fechas(df_raw, args.desde, args.hasta))
+    df_subgrupo = etapa("obtener_datos_subgrupo",
+                        lambda: obtener_datos_subgrupo(df_filtrado, args.subgrupo))
+    if df_subgrupo is None or df_subgrupo.empty:
+        print("   ⚠️ Subgrupo sin datos: se omiten el resto de etapas.")
+        return etapas
+
+    df_resumen = etapa("generar_resumen_datos", lambda: generar_resumen_datos(df_subgrupo))
+    figuras = etapa("genera_graficas",
+                    lambda: genera_graficas.renderizar_graficas(df_resumen, paralelo=not args.sin_paralelo))
+    etapa("generar_partes_docentes", lambda: generar_partes_docentes(df_subgrupo))
+    etapa("generar_acta_texto", lambda: generar_acta_texto.generar_acta_texto(df_subgrupo))
+    etapa("generar_ppt", lambda: generar_ppt(df_resumen, figuras))
+    etapa("generar_ppt_nativo", lambda: generar_ppt(df_resumen, modo_graficas=MODO_NATIVO))
+    return etapas
+
+# -----------------------------------------------------------------------------
+# Informe y comparación
+# -----------------------------------------------------------------------------
+
+def _version_codigo():
+    """Commit actual (si es un repositorio git), para identificar la versión medida."""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+def comparar(actual, anterior):
+    """Imprime la variación de la mediana de tiempo por tamaño y etapa."""
+    previos = {r["filas"]: r["etapas"] for r in anterior["resultados"]}
+    print(f"\n🔍 Comparación con {anterior.get('version') or 'resultado anterior'}")
+    print(f"{'Filas':>8}  {'Etapa':<26}{'Antes (s)':>11}{'Ahora (s)':>11}{'Cambio':>9}")
+    for resultado in actual["resultados"]:
+        etapas_previas = previos.get(resultado["filas"], {})
+        for nombre, metricas in resultado["etapas"].items():
+            if nombre not in etapas_previas:
+                continue
+            antes = etapas_previas[nombre]["tiempo_mediana"]
+            ahora = metricas["tiempo_mediana"]
+            cambio = f"{(ahora - antes) / antes * 100:+.0f}%" if antes else "-"
+            print(f"{resultado['filas']:>8}  {nombre:<26}{antes:>11.3f}{ahora:>11.3f}{cambio:>9}")
+
+def parsear_argumentos(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de las etapas del informe de calidad docente.")
+    parser.add_argument("--filas", type=int, nargs="+", default=[100, 1000, 10000],
+                        help="Tamaños del Excel sintético (100 - 100000).")
+    parser.add_argument("--subgrupo", default="GII_VIC", help="Código de MAPA_TITULACIONES a procesar.")
+    parser.add_argument("--desde", default="01-01-2023", help="Fecha de inicio DD-MM-AAAA.")
+    parser.add_argument("--hasta", default=None, help="(Opcional) Fecha de fin DD-MM-AAAA.")
+    parser.add_argument("--repeticiones", type=int, default=3, help="Repeticiones por etapa.")
+    parser.add_argument("--semilla", type=int, default=0, help="Semilla del generador.")
+    parser.add_argument("--sin-paralelo", action="store_true", help="Gráficas en el proceso actual.")
+    parser.add_argument("--salida", default=None, help="JSON de resultados (por defecto benchmark_<commit>.json).")
+    parser.add_argument("--comparar", default=None, help="(Opcional) JSON de una ejecución anterior.")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parsear_argumentos(argv)
+    version = _version_codigo()
+
+    # La memoria solo se mide en la ejecución aparte de cada etapa (no en las cronometradas)
+    activar_memoria(False)
+
+    resultados = [{"filas": n, "etapas": benchmark_tamano(n, args)} for n in args.filas]
+    informe = {
+        "version": version,
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "subgrupo": args.subgrupo,
+        "repeticiones": args.repeticiones,
+        "resultados": resultados,
+    }
+
+    ruta = args.salida or f"benchmark_{version or 'local'}.json"
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(informe, f, ensure_ascii=False, indent=2)
+    print(f"\n✅ Resultados guardados en {ruta}")
+
+    if args.comparar:
+        with open(args.comparar, "r", encoding="utf-8") as f:
+            comparar(informe, json.load(f))
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,154 @@
+"""
+Generador de Excel sintéticos de encuestas con la misma disposición de columnas
+que el real (MAPA_TITULACIONES / IDX_COMUNES): 94 columnas, una titulación por
+respuesta y sus columnas de asignatura, aprobados, matriculados y campus.
+
+Ejemplo:
+    python -m benchmarks.datos_sinteticos --filas 10000 --salida encuestas_10k.xlsx
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from logic.config import MAPA_TITULACIONES, IDX_COMUNES
+
+N_COLUMNAS = max(IDX_COMUNES) + 1
+
+# Preguntas comunes (posición en el Excel -> cabecera). Las posiciones coinciden
+# con IDX_CAMPOS_SUBGRUPO una vez extraído el subgrupo (Excel 65 -> subgrupo 9).
+PREGUNTAS = {
+    65: "Curso",
+    66: "Cuatrimestre",
+    67: "Modalidad de impartición",
+    68: "Grado de satisfacción con los resultados obtenidos (1-5)",
+    69: "Justifique la valoración e indique acciones de mejora",
+    70: "¿Ha detectado deficiencias de formación previa en el alumnado?",
+    71: "Describa las deficiencias detectadas",
+    72: "Número de grupos",
+    73: "Horas de tutoría",
+    74: "¿Se ha completado el temario previsto?",
+    75: "Indique la causa por la que no se completó",
+    76: "Incidencias generales durante la impartición",
+    77: "Problemas detectados",
+    78: "Detalles adicionales",
+    79: "Características del grupo de estudiantes",
+    80: "Grado de satisfacción con el grupo (1-5)",
+}
+
+TEXTOS_LIBRES = [
+    "Los resultados son coherentes con los de cursos anteriores.",
+    "Se han incorporado prácticas guiadas semanales y cuestionarios de autoevaluación.",
+    "El nivel de asistencia ha bajado en la segunda mitad del cuatrimestre.",
+    "Parte del alumnado llega sin la base de programación necesaria.",
+    "Se propone coordinar las fechas de entrega con el resto de asignaturas del curso.",
+    "El laboratorio no dispuso de todos los equipos durante las dos primeras semanas.",
+    "Grupo participativo, con buen ambiente de trabajo en clase.",
+    "La evaluación continua ha mejorado la tasa de presentados.",
+    "Se detecta una carga de trabajo elevada en las últimas semanas.",
+    "Se recomienda reforzar los contenidos de matemáticas en primer curso.",
+]
+
+CURSOS = ["Primero", "Segundo", "Tercero", "Cuarto"]
+CUATRIMESTRES = ["Primero", "Segundo"]
+SI_NO = ["Sí", "No"]
+
+def cabecera_sintetica():
+    """Cabecera de 94 columnas con los textos que buscan los módulos de lógica."""
+    cabecera = [f"Pregunta {i}" for i in range(N_COLUMNAS)]
+    cabecera[:6] = ["ID", "Hora de inicio", "Hora de finalización",
+                    "Correo electrónico", "Profesor/a responsable", "Titulación"]
+
+    for codigo, config in MAPA_TITULACIONES.items():
+        asig, aprob, matric = config['cols']
+        cabecera[asig] = f"Seleccione la asignatura ({config['raiz']})"
+        cabecera[aprob] = f"Aprobados {codigo}"
+        cabecera[matric] = f"Matriculados {codigo}"
+        if 'filtro_campus' in config:
+            cabecera[config['filtro_campus']['col']] = f"Campus ({config['raiz']})"
+
+    for pos, texto in PREGUNTAS.items():
+        cabecera[pos] = texto
+    return cabecera
+
+def _texto_libre(rng):
+    """Respuesta abierta: de una a tres frases, o vacía."""
+    if rng.random() < 0.25:
+        return np.nan
+    return " ".join(rng.sample(TEXTOS_LIBRES, rng.randint(1, 3)))
+
+def generar_encuestas(n_filas, semilla=0, desde=datetime(2022, 9, 1), dias=3 * 365):
+    """
+    DataFrame sintético de n_filas respuestas en orden cronológico (como la
+    exportación de Forms).
+    """
+    rng = random.Random(semilla)
+    codigos = list(MAPA_TITULACIONES)
+    # Asignaturas fijas por titulación: se repiten como en el Excel real
+    asignaturas = {codigo: [f"Asignatura {codigo.split('_')[0]} {i:02d}" for i in range(1, 41)]
+                   for codigo in codigos}
+    profesores = [f"Profesor/a {i:03d}" for i in range(1, 201)]
+    segundos = sorted(rng.randrange(dias * 86400) for _ in range(n_filas))
+
+    filas = []
+    for i in range(n_filas):
+        fila = [np.nan] * N_COLUMNAS
+        codigo = rng.choice(codigos)
+        config = MAPA_TITULACIONES[codigo]
+        asig, aprob, matric = config['cols']
+
+        inicio = desde + timedelta(seconds=segundos[i])
+        fila[0] = i + 1
+        fila[1] = inicio
+        fila[2] = inicio + timedelta(minutes=rng.randint(3, 30))
+        fila[3] = f"docente{rng.randint(1, 200):03d}@universidad.es"
+        fila[4] = rng.choice(profesores)
+        fila[5] = config['raiz'] + (" " if rng.random() < 0.1 else "")
+        fila[asig] = rng.choice(asignaturas[codigo])
+
+        matriculados = rng.randint(5, 120)
+        fila[matric] = matriculados
+        if rng.random() > 0.03:
+            fila[aprob] = rng.randint(0, matriculados)
+        if 'filtro_campus' in config:
+            fila[config['filtro_campus']['col']] = config['filtro_campus']['valor']
+
+        fila[65] = rng.choice(CURSOS)
+        fila[66] = rng.choice(CUATRIMESTRES)
+        fila[67] = rng.choice(["Presencial", "Semipresencial", "En línea"])
+        fila[68] = rng.randint(1, 5)
+        fila[69] = _texto_libre(rng)
+        fila[70] = rng.choice(SI_NO)
+        fila[71] = _texto_libre(rng) if fila[70] == "Sí" else np.nan
+        fila[72] = rng.randint(1, 4)
+        fila[73] = rng.randint(2, 10)
+        fila[74] = rng.choice(SI_NO)
+        fila[75] = _texto_libre(rng) if fila[74] == "No" else np.nan
+        for pos in (76, 77, 78, 79):
+            fila[pos] = _texto_libre(rng)
+        fila[80] = rng.randint(1, 5)
+        for pos in range(81, N_COLUMNAS):
+            fila[pos] = _texto_libre(rng) if rng.random() < 0.5 else rng.choice(SI_NO)
+
+        filas.append(fila)
+
+    return pd.DataFrame(filas, columns=cabecera_sintetica())
+
+def parsear_argumentos(argv=None):
+    parser = argparse.ArgumentParser(description="Genera un Excel sintético de encuestas.")
+    parser.add_argument("--filas", type=int, default=1000, help="Número de respuestas (100 - 100000).")
+    parser.add_argument("--semilla", type=int, default=0, help="Semilla aleatoria.")
+    parser.add_argument("--salida", default="encuestas_sinteticas.xlsx", help="Fichero Excel de salida.")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parsear_argumentos(argv)
+    df = generar_encuestas(args.filas, args.semilla)
+    df.to_excel(args.salida, index=False)
+    print(f"✅ {len(df)} respuestas guardadas en {args.salida}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
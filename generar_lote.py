@@ -0,0 +1,196 @@
+"""
+Generación por lotes (sin Streamlit) de los informes Word y PowerPoint.
+
+Ejemplo:
+    python generar_lote.py encuestas.xlsx --desde 01-01-2024 --subgrupos all --salida informes
+    python generar_lote.py encuestas.xlsx --desde 01-09-2024 --hasta 31-01-2025 --subgrupos GIC GIA
+    python generar_lote.py encuestas.xlsx --desde 01-01-2024 --zip informes/todo.zip
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import matplotlib
+matplotlib.use("Agg")  # Sin pantalla: los workers solo renderizan a fichero
+
+import logic.utils as utils
+from logic.config import MAPA_TITULACIONES, FORMATOS_GRAFICAS, FORMATO_GRAFICAS, DPI_GRAFICAS, FILAS_TABLA_PPT
+from logic.cargar_excel import cargar_excel
+from logic.obtener_datos_subgrupo import obtener_todos_subgrupos
+from logic.generar_resumen_datos import generar_resumen_datos
+from logic.generar_partes_docentes import generar_partes_docentes_stream
+from logic.genera_graficas import renderizar_graficas
+from logic.generar_ppt import generar_ppt, MODO_IMAGEN, MODO_NATIVO
+from logic.exportar_zip import exportar_zip
+
+# -----------------------------------------------------------------------------
+# Trabajo de un subgrupo (se ejecuta en un proceso del pool)
+# -----------------------------------------------------------------------------
+
+def procesar_subgrupo(codigo, df_subgrupo, dir_salida, ruta_json=None, modo_graficas=MODO_IMAGEN,
+                      opciones_imagen=None, filas_tabla=FILAS_TABLA_PPT):
+    """
+    Ejecuta resumen -> Word -> gráficas -> PowerPoint para un subgrupo y
+    escribe los ficheros en dir_salida. Devuelve un dict con estado y tiempos.
+
+    opciones_imagen: argumentos de renderizar_graficas (formato, dpi, compresion...).
+    El PPT no admite SVG: en ese caso sus imágenes se generan en PNG.
+    """
+    informe = {"codigo": codigo, "registros": len(df_subgrupo), "estado": "ok", "tiempos": {}}
+    t_inicio = time.perf_counter()
+
+    def cronometrar(etapa, funcion, *args, **kwargs):
+        t0 = time.perf_counter()
+        resultado = funcion(*args, **kwargs)
+        informe["tiempos"][etapa] = round(time.perf_counter() - t0, 3)
+        return resultado
+
+    try:
+        df_resumen = cronometrar("resumen", generar_resumen_datos, df_subgrupo)
+
+        # Word escrito en streaming directamente al fichero (memoria acotada)
+        ruta_word = os.path.join(dir_salida, f"Informe_Calidad_{codigo}.docx")
+        cronometrar("word", generar_partes_docentes_stream, df_subgrupo, ruta_word)
+
+        # Ya estamos en un worker del pool: sin pool anidado para las gráficas.
+        # Las gráficas nativas del PPT se dibujan desde df_resumen (sin Matplotlib)
+        figuras = None
+        if modo_graficas == MODO_IMAGEN:
+            opciones = dict(opciones_imagen or {})
+            if opciones.get("formato") == "svg":
+                opciones["formato"] = "png"
+            informe["imagenes"] = {}
+            figuras = cronometrar("graficas", renderizar_graficas, df_resumen, paralelo=False,
+                                  informe=informe["imagenes"], **opciones)
+
+        if ruta_json and not os.path.exists(ruta_json):
+            ruta_json = None
+        buffer_ppt = cronometrar("ppt", generar_ppt, df_resumen, figuras, ruta_json=ruta_json,
+                                 modo_graficas=modo_graficas, filas_tabla=filas_tabla)
+        ruta_ppt = os.path.join(dir_salida, f"Presentacion_{codigo}.pptx")
+        with open(ruta_ppt, "wb") as f:
+            f.write(buffer_ppt.getvalue())
+
+        informe["ficheros"] = [ruta_word, ruta_ppt]
+    except Exception as e:
+        informe["estado"] = "error"
+        informe["error"] = f"{type(e).__name__}: {e}"
+
+    informe["tiempos"]["total"] = round(time.perf_counter() - t_inicio, 3)
+    return informe
+
+# -----------------------------------------------------------------------------
+# Programa principal
+# -----------------------------------------------------------------------------
+
+def parsear_argumentos(argv=None):
+    parser = argparse.ArgumentParser(description="Genera los informes de calidad docente de varios subgrupos.")
+    parser.add_argument("excel", help="Excel de encuestas.")
+    parser.add_argument("--desde", required=True, help="Fecha de inicio DD-MM-AAAA.")
+    parser.add_argument("--hasta", default=None, help="(Opcional) Fecha de fin DD-MM-AAAA.")
+    parser.add_argument("--subgrupos", nargs="+", default=["all"],
+                        help="Códigos de MAPA_TITULACIONES o 'all' (por defecto).")
+    parser.add_argument("--salida", default="informes", help="Directorio de salida.")
+    parser.add_argument("--dir-json", default=None,
+                        help="(Opcional) Carpeta con los JSON de la IA, uno por subgrupo: <CODIGO>.json")
+    parser.add_argument("--graficas-ppt", choices=[MODO_IMAGEN, MODO_NATIVO], default=MODO_IMAGEN,
+                        help="Gráficas del PowerPoint: imágenes Matplotlib o gráficos nativos editables.")
+    parser.add_argument("--formato-imagen", choices=FORMATOS_GRAFICAS, default=FORMATO_GRAFICAS,
+                        help="Formato de las gráficas en imagen (en el PPT, SVG se sustituye por PNG).")
+    parser.add_argument("--dpi", type=int, default=DPI_GRAFICAS, help="Resolución de las gráficas en imagen.")
+    parser.add_argument("--compresion", type=int, choices=range(10), default=None, metavar="0-9",
+                        help="(Opcional) Nivel de compresión PNG: 0 más rápido, 9 más pequeño.")
+    parser.add_argument("--filas-tabla", type=int, default=FILAS_TABLA_PPT,
+                        help="Filas de la tabla resumen por diapositiva del PPT.")
+    parser.add_argument("--zip", default=None,
+                        help="(Opcional) Escribe todos los informes (Word, PPT y prompt) en este ZIP, en streaming.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="Procesos en paralelo (por defecto, uno por núcleo).")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parsear_argumentos(argv)
+
+    if [c.lower() for c in args.subgrupos] == ["all"]:
+        codigos = list(MAPA_TITULACIONES.keys())
+    else:
+        codigos = [c.upper() for c in args.subgrupos]
+        desconocidos = [c for c in codigos if c not in MAPA_TITULACIONES]
+        if desconocidos:
+            raise SystemExit(f"Códigos no encontrados: {', '.join(desconocidos)}")
+
+    # Fechas comprobadas antes de leer el Excel (mal escritas, el filtro devolvería un DataFrame vacío)
+    for fecha in (args.desde, args.hasta):
+        if fecha is None:
+            continue
+        try:
+            utils._parsear_fecha(fecha)
+        except (ValueError, TypeError):
+            raise SystemExit(f"Fecha no válida: {fecha} (formato DD-MM-AAAA)")
+
+    os.makedirs(args.salida, exist_ok=True)
+    opciones_imagen = {"formato": args.formato_imagen, "dpi": args.dpi, "compresion": args.compresion}
+    t_inicio = time.perf_counter()
+
+    # 1. Lectura única del Excel (solo las columnas de los subgrupos pedidos)
+    df_raw = cargar_excel(args.excel, codigos)
+    df_filtrado = utils.filtrar_por_fechas(df_raw, args.desde, args.hasta)
+
+    # Modo ZIP: todo en un único fichero, escrito según se genera (secuencial)
+    if args.zip:
+        os.makedirs(os.path.dirname(os.path.abspath(args.zip)), exist_ok=True)
+        informe = exportar_zip(df_filtrado, args.zip, codigos, modo_graficas=args.graficas_ppt,
+                               opciones_imagen=opciones_imagen, filas_tabla=args.filas_tabla,
+                               dir_json=args.dir_json)
+        print(f"\nZIP guardado en {args.zip} ({time.perf_counter() - t_inicio:.2f}s en total)")
+        return 0 if all(s["estado"] != "error" for s in informe["subgrupos"]) else 1
+
+    # 2. Reparto en subgrupos con una sola pasada
+    subgrupos = obtener_todos_subgrupos(df_filtrado, codigos)
+
+    informes = []
+    for codigo in codigos:
+        if subgrupos[codigo].empty:
+            informes.append({"codigo": codigo, "registros": 0, "estado": "sin datos", "tiempos": {}})
+
+    # 3. Un subgrupo por tarea, un proceso por núcleo
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futuros = {}
+        for codigo, df_subgrupo in subgrupos.items():
+            if df_subgrupo.empty:
+                continue
+            ruta_json = os.path.join(args.dir_json, f"{codigo}.json") if args.dir_json else None
+            futuros[pool.submit(procesar_subgrupo, codigo, df_subgrupo, args.salida, ruta_json,
+                                args.graficas_ppt, opciones_imagen, args.filas_tabla)] = codigo
+
+        for futuro in as_completed(futuros):
+            informe = futuro.result()
+            informes.append(informe)
+            print(f"{'✅' if informe['estado'] == 'ok' else '❌'} {informe['codigo']}: "
+                  f"{informe['registros']} registros en {informe['tiempos']['total']:.2f}s")
+
+    # 4. Informe de estado y tiempos
+    informes.sort(key=lambda i: codigos.index(i["codigo"]))
+    resumen = {
+        "excel": args.excel,
+        "desde": args.desde,
+        "hasta": args.hasta,
+        "tiempo_total": round(time.perf_counter() - t_inicio, 3),
+        "subgrupos": informes,
+    }
+    ruta_informe = os.path.join(args.salida, "informe_lote.json")
+    with open(ruta_informe, "w", encoding="utf-8") as f:
+        json.dump(resumen, f, ensure_ascii=False, indent=2)
+
+    print(f"\n{'Subgrupo':<18}{'Estado':<12}{'Registros':>10}{'Tiempo (s)':>12}")
+    for informe in informes:
+        print(f"{informe['codigo']:<18}{informe['estado']:<12}{informe['registros']:>10}"
+              f"{informe['tiempos'].get('total', 0):>12.2f}")
+    print(f"\nInforme guardado en {ruta_informe} ({resumen['tiempo_total']:.2f}s en total)")
+
+    return 0 if all(i["estado"] != "error" for i in informes) else 1
+
+if __name__ == "__main__":
+    raise SystemExit(main())
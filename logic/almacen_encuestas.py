@@ -0,0 +1,249 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+from logic.config import DIR_ALMACEN, MAPA_TITULACIONES
+from logic.cargar_excel import cargar_excel, compactar_tipos
+from logic.utils import filtrar_por_fechas
+from logic.instrumentacion import instrumentar
+
+# Fichero con el estado del almacén (cabecera, marca de agua y particiones)
+MANIFIESTO = "manifiesto.json"
+
+# Columnas internas de cada fichero Parquet
+COL_HASH = "_hash_fila"   # huella de la fila completa (detección de duplicados)
+COL_ORDEN = "_fila"       # orden de llegada (se devuelve en el mismo orden que el Excel)
+COL_FECHA = "c001"        # marca temporal (Col 1)
+
+# Tipos de columna object que Arrow guarda sin convertir
+TIPOS_ARROW = {"string", "empty", "integer", "floating", "boolean", "datetime", "datetime64"}
+
+# -----------------------------------------------------------------------------
+# Funciones auxiliares
+# -----------------------------------------------------------------------------
+
+def _nombre_columna(j):
+    """Nombre de la columna en Parquet: la posición (las cabeceras van en el manifiesto)."""
+    return f"c{j:03d}"
+
+def _manifiesto_vacio():
+    return {"cabecera": None, "marca_agua": None, "n_filas": 0, "lotes": 0, "particiones": {}}
+
+def _leer_manifiesto(directorio):
+    ruta = os.path.join(directorio, MANIFIESTO)
+    if not os.path.exists(ruta):
+        return _manifiesto_vacio()
+    with open(ruta, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def _guardar_manifiesto(directorio, manifiesto):
+    """Escritura atómica: el manifiesto es lo último que se actualiza en cada carga."""
+    ruta = os.path.join(directorio, MANIFIESTO)
+    with open(ruta + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f, ensure_ascii=False, indent=2)
+    os.replace(ruta + ".tmp", ruta)
+
+def claves_particion(fechas):
+    """
+    Partición 'AAAA-AAAA/N' de cada fecha: curso académico (septiembre-agosto) y
+    cuatrimestre (1 = septiembre-enero, 2 = febrero-agosto).
+    """
+    anio = fechas.dt.year.to_numpy()
+    mes = fechas.dt.month.to_numpy()
+    inicio = np.where(mes >= 9, anio, anio - 1)
+    cuatri = np.where((mes >= 9) | (mes == 1), 1, 2)
+    return pd.Series([f"{a}-{a + 1}/{c}" for a, c in zip(inicio, cuatri)], index=fechas.index)
+
+def _hash_filas(df):
+    """
+    Huella de cada fila independiente del tipo compacto elegido al cargar
+    (Int8/Int16/float, category/object), para reconocer la misma respuesta en
+    exportaciones distintas.
+    """
+    canonico = {}
+    for j in range(df.shape[1]):
+        serie = df.iloc[:, j]
+        if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+            serie = serie.astype("float64")
+        elif not pd.api.types.is_datetime64_any_dtype(serie):
+            serie = serie.astype(object)
+        canonico[j] = serie
+    return pd.util.hash_pandas_object(pd.DataFrame(canonico), index=False).to_numpy()
+
+def _a_tabla_almacen(df):
+    """Columnas por posición; las de tipos mezclados se guardan como texto (igual que se muestran)."""
+    tabla = df.set_axis([_nombre_columna(j) for j in range(df.shape[1])], axis=1)
+    for j in range(tabla.shape[1]):
+        serie = tabla.iloc[:, j]
+        if serie.dtype == object and pd.api.types.infer_dtype(serie, skipna=True) not in TIPOS_ARROW:
+            tabla.isetitem(j, serie.where(serie.isna(), serie.astype(str)))
+    return tabla.reset_index(drop=True)
+
+def _hashes_desde(directorio, manifiesto, marca):
+    """Huellas ya almacenadas con fecha >= marca (las únicas que pueden repetirse)."""
+    hashes = []
+    for meta in manifiesto["particiones"].values():
+        if pd.Timestamp(meta["hasta"]) < marca:
+            continue
+        for fichero in meta["ficheros"]:
+            parte = pd.read_parquet(os.path.join(directorio, fichero), columns=[COL_HASH],
+                                    filters=[(COL_FECHA, ">=", marca)])
+            hashes.append(parte[COL_HASH].to_numpy())
+    return np.concatenate(hashes) if hashes else np.array([], dtype=np.uint64)
+
+# -----------------------------------------------------------------------------
+# Carga incremental
+# -----------------------------------------------------------------------------
+
+@instrumentar()
+def ingerir_excel(origen, directorio=DIR_ALMACEN):
+    """
+    Añade al almacén solo las respuestas nuevas de una exportación acumulada.
+
+    Se leen las filas con marca temporal (Col 1) igual o posterior a la marca de
+    agua del almacén y se descartan las que ya estaban (misma huella de fila).
+    Las filas sin fecha, o anteriores a la marca, no se añaden.
+
+    Args:
+        origen: Fichero subido (Streamlit), ruta o bytes del Excel.
+        directorio: Carpeta del almacén.
+
+    Returns:
+        Diccionario con el resumen de la carga (filas leídas, nuevas, duplicadas...).
+    """
+    df = cargar_excel(origen)
+    manifiesto = _leer_manifiesto(directorio)
+
+    cabecera = [str(c) for c in df.columns]
+    if manifiesto["cabecera"] is None:
+        manifiesto["cabecera"] = cabecera
+    elif manifiesto["cabecera"] != cabecera:
+        raise ValueError("Las columnas del Excel no coinciden con las del almacén de encuestas.")
+
+    fechas = df.iloc[:, 1]
+    con_fecha = fechas.notna().to_numpy()
+    marca = pd.Timestamp(manifiesto["marca_agua"]) if manifiesto["marca_agua"] else None
+    candidatas = con_fecha & (fechas >= marca).to_numpy() if marca is not None else con_fecha
+
+    df_nuevas = df[candidatas]
+    hashes = _hash_filas(df_nuevas)
+    conocidos = _hashes_desde(directorio, manifiesto, marca) if marca is not None else []
+    nuevas = ~pd.Index(hashes).duplicated() & ~np.isin(hashes, conocidos)
+
+    informe = {
+        "leidas": len(df),
+        "nuevas": int(nuevas.sum()),
+        "duplicadas": int((~nuevas).sum()),
+        "anteriores": int((con_fecha & ~candidatas).sum()),
+        "sin_fecha": int((~con_fecha).sum()),
+        "particiones": [],
+    }
+    if not informe["nuevas"]:
+        print(f"📦 Almacén al día: ninguna respuesta nueva ({len(df)} filas leídas).")
+        return informe
+
+    df_nuevas = df_nuevas[nuevas]
+    tabla = _a_tabla_almacen(df_nuevas)
+    tabla[COL_HASH] = hashes[nuevas]
+    tabla[COL_ORDEN] = np.arange(manifiesto["n_filas"], manifiesto["n_filas"] + len(tabla), dtype=np.int64)
+
+    lote = manifiesto["lotes"] + 1
+    claves = claves_particion(df_nuevas.iloc[:, 1]).to_numpy()
+    titulos = df_nuevas.iloc[:, 5].astype(str).str.strip().to_numpy()
+
+    for clave, posiciones in pd.Series(claves).groupby(claves, sort=True).indices.items():
+        curso, cuatri = clave.split("/")
+        fichero = os.path.join(f"curso={curso}", f"cuatrimestre={cuatri}", f"lote-{lote:05d}.parquet")
+        ruta = os.path.join(directorio, fichero)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        tabla.iloc[posiciones].to_parquet(ruta + ".tmp", index=False)
+        os.replace(ruta + ".tmp", ruta)
+
+        fechas_parte = tabla[COL_FECHA].iloc[posiciones]
+        meta = manifiesto["particiones"].setdefault(clave, {
+            "ficheros": [], "filas": 0, "desde": None, "hasta": None, "titulaciones": [],
+        })
+        meta["ficheros"].append(fichero)
+        meta["filas"] += len(posiciones)
+        meta["desde"] = min(filter(None, [meta["desde"], fechas_parte.min().isoformat()]))
+        meta["hasta"] = max(filter(None, [meta["hasta"], fechas_parte.max().isoformat()]))
+        meta["titulaciones"] = sorted(set(meta["titulaciones"]) | set(titulos[posiciones]))
+        informe["particiones"].append(clave)
+
+    manifiesto["marca_agua"] = tabla[COL_FECHA].max().isoformat()
+    manifiesto["n_filas"] += len(tabla)
+    manifiesto["lotes"] = lote
+    _guardar_manifiesto(directorio, manifiesto)
+
+    print(f"📥 Almacén: {informe['nuevas']} respuestas nuevas en {len(informe['particiones'])} "
+          f"partición(es); {informe['duplicadas']} repetidas descartadas.")
+    return informe
+
+# -----------------------------------------------------------------------------
+# Consultas
+# -----------------------------------------------------------------------------
+
+def version_almacen(directorio=DIR_ALMACEN):
+    """Identificador que cambia con cada carga que añade filas (para claves de caché)."""
+    manifiesto = _leer_manifiesto(directorio)
+    return f"{manifiesto['lotes']}-{manifiesto['n_filas']}"
+
+def hay_almacen(directorio=DIR_ALMACEN):
+    """True si el almacén tiene datos."""
+    return bool(_leer_manifiesto(directorio)["particiones"])
+
+@instrumentar()
+def consultar_almacen(fecha_inicio, fecha_fin=None, codigo=None, directorio=DIR_ALMACEN):
+    """
+    Respuestas del almacén en un rango de fechas (DD-MM-AAAA), con el mismo
+    formato que filtrar_por_fechas(cargar_excel(...)).
+
+    Solo se abren las particiones cuyo rango de fechas se solapa con el pedido y,
+    si se indica el código de un subgrupo, que contienen su titulación. Dentro
+    de cada fichero el filtro de fechas se aplica al leer (Arrow).
+    """
+    manifiesto = _leer_manifiesto(directorio)
+    if manifiesto["cabecera"] is None:
+        print("⚠️ El almacén de encuestas está vacío.")
+        return pd.DataFrame()
+
+    try:
+        inicio_dt = pd.to_datetime(fecha_inicio, dayfirst=True)
+        fin_dt = pd.to_datetime(fecha_fin, dayfirst=True) if fecha_fin else None
+    except Exception as e:
+        print(f"Error al procesar las fechas: {e}")
+        return pd.DataFrame()
+
+    raiz = MAPA_TITULACIONES[codigo.upper()]['raiz'] if codigo and codigo.upper() in MAPA_TITULACIONES else None
+
+    seleccion = [
+        meta for meta in manifiesto["particiones"].values()
+        if pd.Timestamp(meta["hasta"]) >= inicio_dt
+        and (fin_dt is None or pd.Timestamp(meta["desde"]) <= fin_dt)
+        and (raiz is None or raiz in meta["titulaciones"])
+    ]
+    print(f"🗂️ Almacén: {len(seleccion)} de {len(manifiesto['particiones'])} particiones leídas.")
+
+    filtros = [(COL_FECHA, ">=", inicio_dt)]
+    if fin_dt is not None:
+        filtros.append((COL_FECHA, "<=", fin_dt))
+
+    partes = [
+        pd.read_parquet(os.path.join(directorio, fichero), filters=filtros)
+        for meta in seleccion for fichero in meta["ficheros"]
+    ]
+    cabecera = manifiesto["cabecera"]
+    if not partes:
+        df = pd.DataFrame({c: pd.Series(dtype=object) for c in cabecera})
+        df.isetitem(1, pd.Series(dtype="datetime64[ns]"))
+        return df
+
+    df = pd.concat(partes, ignore_index=True).sort_values(COL_ORDEN, kind="stable")
+    df = df.drop(columns=[COL_HASH, COL_ORDEN]).reset_index(drop=True)
+    df.columns = cabecera
+
+    # Tras unir lotes, las categorías distintas de cada fichero pasan a object
+    compactar_tipos(df)
+
+    # Misma semántica exacta de límites que con el Excel
+    return filtrar_por_fechas(df, fecha_inicio, fecha_fin)
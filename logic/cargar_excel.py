@@ -0,0 +1,278 @@
+import hashlib
+import io
+import os
+import numpy as np
+import pandas as pd
+from logic.config import (
+    DIR_CACHE_EXCEL, LIMITE_CACHE_EXCEL_MB, MAPA_TITULACIONES, IDX_COMUNES,
+    IDX_TEXTO_CATEGORICO, UMBRAL_CARDINALIDAD,
+)
+from logic.utils import preparar_fechas
+from logic.instrumentacion import instrumentar
+
+# Extensiones de los ficheros de caché (Feather preferente, pickle como reserva)
+EXT_FEATHER = ".feather"
+EXT_PICKLE = ".pkl"
+
+# Enteros con nulos, de menor a mayor, para los recuentos de alumnos (las columnas
+# que ya eran enteras, sin nulos, usan el equivalente de NumPy: 'int8', 'int16'...)
+TIPOS_CONTADOR = ["Int8", "Int16", "Int32", "Int64"]
+
+# -----------------------------------------------------------------------------
+# Funciones auxiliares
+# -----------------------------------------------------------------------------
+
+def leer_bytes(origen):
+    """Devuelve el contenido binario de un fichero subido, una ruta o unos bytes."""
+    if isinstance(origen, (bytes, bytearray)):
+        return bytes(origen)
+    if hasattr(origen, "getvalue"):
+        return origen.getvalue()
+    with open(origen, "rb") as f:
+        return f.read()
+
+def hash_contenido(contenido):
+    """Huella SHA-256 (hex) de los bytes del Excel."""
+    return hashlib.sha256(contenido).hexdigest()
+
+def _ficheros_cache(directorio):
+    """Lista (ruta, tamaño, mtime) de las entradas de la caché."""
+    entradas = []
+    if not os.path.isdir(directorio):
+        return entradas
+    for nombre in os.listdir(directorio):
+        if not nombre.endswith((EXT_FEATHER, EXT_PICKLE)):
+            continue
+        ruta = os.path.join(directorio, nombre)
+        try:
+            info = os.stat(ruta)
+        except OSError:
+            continue
+        entradas.append((ruta, info.st_size, info.st_mtime))
+    return entradas
+
+def _expulsar_lru(directorio, limite_bytes, conservar=None):
+    """Borra las entradas menos usadas hasta quedar por debajo del presupuesto."""
+    entradas = sorted(_ficheros_cache(directorio), key=lambda e: e[2])
+    total = sum(tam for _, tam, _ in entradas)
+
+    for ruta, tam, _ in entradas:
+        if total <= limite_bytes:
+            break
+        if ruta == conservar:
+            continue
+        try:
+            os.remove(ruta)
+            total -= tam
+        except OSError:
+            pass
+
+def _leer_de_cache(directorio, clave):
+    """Devuelve el DataFrame cacheado (o None) y marca la entrada como usada."""
+    for ext, lector in ((EXT_FEATHER, pd.read_feather), (EXT_PICKLE, pd.read_pickle)):
+        ruta = os.path.join(directorio, clave + ext)
+        if not os.path.exists(ruta):
+            continue
+        try:
+            df = lector(ruta)
+        except Exception as e:
+            print(f"⚠️ Entrada de caché corrupta, se descarta ({ruta}): {e}")
+            os.remove(ruta)
+            continue
+        # El mtime hace de marca de último uso para la expulsión LRU
+        os.utime(ruta)
+        return df
+    return None
+
+def _guardar_en_cache(directorio, clave, df):
+    """Guarda el DataFrame en Feather; si Arrow no lo admite (tipos mezclados), en pickle."""
+    os.makedirs(directorio, exist_ok=True)
+
+    for ext, escritor in ((EXT_FEATHER, df.to_feather), (EXT_PICKLE, df.to_pickle)):
+        ruta = os.path.join(directorio, clave + ext)
+        ruta_tmp = ruta + ".tmp"
+        try:
+            escritor(ruta_tmp)
+            os.replace(ruta_tmp, ruta)
+            return ruta
+        except Exception as e:
+            if os.path.exists(ruta_tmp):
+                os.remove(ruta_tmp)
+            print(f"⚠️ No se pudo cachear en formato {ext}: {e}")
+    return None
+
+# -----------------------------------------------------------------------------
+# Plan de columnas (usecols)
+# -----------------------------------------------------------------------------
+
+def plan_columnas(codigos):
+    """
+    Índices de columna necesarios para procesar los subgrupos indicados.
+
+    Es la unión de IDX_COMUNES, las 'cols' de cada subgrupo y su columna de
+    campus (necesaria para filtrar aunque luego se descarte).
+
+    Args:
+        codigos: Código o lista de códigos de MAPA_TITULACIONES.
+    """
+    if isinstance(codigos, str):
+        codigos = [codigos]
+
+    plan = set(IDX_COMUNES)
+    for codigo in codigos:
+        config = MAPA_TITULACIONES.get(codigo.upper())
+        if not config:
+            print(f"Error: Código '{codigo}' no encontrado.")
+            continue
+        plan.update(config['cols'])
+        if 'filtro_campus' in config:
+            plan.add(config['filtro_campus']['col'])
+
+    return sorted(plan)
+
+def _leer_excel_podado(contenido, plan):
+    """
+    Lee solo las columnas del plan (openpyxl en modo read_only) y rellena el
+    resto con columnas vacías, de modo que los índices posicionales (iloc) del
+    resto de módulos siguen siendo válidos.
+    """
+    # Solo la cabecera, para conocer nombres y anchura real de la hoja
+    cabecera = pd.read_excel(io.BytesIO(contenido), nrows=0, engine="openpyxl").columns
+    plan = [i for i in plan if i < len(cabecera)]
+
+    df_parcial = pd.read_excel(io.BytesIO(contenido), usecols=plan, engine="openpyxl")
+
+    # Reconstruimos la anchura original respetando las posiciones
+    posiciones = {pos: j for j, pos in enumerate(plan)}
+    columnas = []
+    for pos in range(len(cabecera)):
+        if pos in posiciones:
+            columnas.append(df_parcial.iloc[:, posiciones[pos]])
+        else:
+            columnas.append(pd.Series(np.nan, index=df_parcial.index, dtype="float64"))
+
+    df = pd.concat(columnas, axis=1, ignore_index=True)
+    df.columns = cabecera
+    return df
+
+# -----------------------------------------------------------------------------
+# Tipos compactos
+# -----------------------------------------------------------------------------
+
+def uso_memoria_mb(df):
+    """Memoria real del DataFrame (incluyendo el contenido de los textos) en MB."""
+    return df.memory_usage(deep=True).sum() / (1024 * 1024)
+
+def _columnas_compactables(n_columnas):
+    """Posiciones de texto repetido y de recuentos (Aprobados/Matriculados)."""
+    texto = set(IDX_TEXTO_CATEGORICO)
+    contadores = set()
+    for config in MAPA_TITULACIONES.values():
+        texto.add(config['cols'][0])
+        contadores.update(config['cols'][1:])
+        if 'filtro_campus' in config:
+            texto.add(config['filtro_campus']['col'])
+    return (sorted(i for i in texto if i < n_columnas),
+            sorted(i for i in contadores if i < n_columnas))
+
+def _tipo_contador(valores):
+    """Entero con nulos más pequeño que admite los valores (None si no son enteros)."""
+    if len(valores) == 0:
+        return TIPOS_CONTADOR[0]
+    if not np.array_equal(valores, np.round(valores)):
+        return None
+    minimo, maximo = valores.min(), valores.max()
+    for tipo in TIPOS_CONTADOR:
+        info = np.iinfo(tipo.lower())
+        if info.min <= minimo and maximo <= info.max:
+            return tipo
+    return None
+
+def compactar_tipos(df, umbral=UMBRAL_CARDINALIDAD):
+    """
+    Reduce la memoria del Excel de encuestas (modifica df y lo devuelve):
+        - Texto repetido (titulación, campus, profesor, asignatura, curso,
+          cuatrimestre) -> 'category', si todos los valores son texto y hay pocos
+          distintos.
+        - Aprobados / Matriculados -> enteros con nulos (Int8/Int16/...), si
+          todos los valores son enteros; las que ya eran int64 -> int8/int16/...
+          Así el texto de los informes no cambia (ver normalizar_columnas_texto).
+    Las posiciones de las columnas no cambian.
+    """
+    antes = uso_memoria_mb(df)
+    idx_texto, idx_contadores = _columnas_compactables(df.shape[1])
+
+    for idx in idx_texto:
+        serie = df.iloc[:, idx]
+        if serie.dtype != object or pd.api.types.infer_dtype(serie, skipna=True) != "string":
+            continue
+        n_validos = serie.count()
+        if n_validos and serie.nunique() <= umbral * n_validos:
+            df.isetitem(idx, serie.astype("category"))
+
+    for idx in idx_contadores:
+        serie = df.iloc[:, idx]
+        if serie.dtype.kind not in "fi":
+            continue
+        tipo = _tipo_contador(serie.dropna().to_numpy())
+        if tipo:
+            entero_numpy = serie.dtype.kind == "i" and not pd.api.types.is_extension_array_dtype(serie.dtype)
+            df.isetitem(idx, serie.astype(tipo.lower() if entero_numpy else tipo))
+
+    print(f"🗜️ Memoria del Excel: {antes:.1f} MB -> {uso_memoria_mb(df):.1f} MB")
+    return df
+
+# -----------------------------------------------------------------------------
+# Función principal
+# -----------------------------------------------------------------------------
+
+@instrumentar()
+def cargar_excel(origen, codigos=None, compactar=True, directorio=DIR_CACHE_EXCEL, limite_mb=LIMITE_CACHE_EXCEL_MB):
+    """
+    Lee el Excel de encuestas usando una caché en disco indexada por SHA-256.
+
+    Si el mismo contenido ya se parseó antes (re-subida o rerun de Streamlit),
+    se devuelve el DataFrame desde la copia columnar sin volver a abrir el Excel.
+    La columna de marca temporal (Col 1) se devuelve ya convertida a datetime64.
+
+    Args:
+        origen: Fichero subido (Streamlit), ruta o bytes del Excel.
+        codigos: (Opcional) Código o lista de códigos de MAPA_TITULACIONES. Si se
+            indica, solo se leen las columnas que necesitan esos subgrupos; el
+            resto se devuelven vacías para conservar las posiciones.
+        compactar: Convierte texto repetido a 'category' y los recuentos a
+            enteros pequeños (ver compactar_tipos).
+        directorio: Carpeta de la caché.
+        limite_mb: Presupuesto de disco; se expulsan las entradas menos usadas.
+    """
+    contenido = leer_bytes(origen)
+    clave = hash_contenido(contenido)
+
+    plan = plan_columnas(codigos) if codigos else None
+    if plan is not None:
+        # Cada plan de columnas es una entrada distinta de la caché
+        clave += "_" + hash_contenido(",".join(map(str, plan)).encode())[:12]
+    if compactar:
+        # "_c2": los recuentos que ya eran int64 ya no pasan a Int* (cachés antiguas fuera)
+        clave += "_c2"
+
+    df = _leer_de_cache(directorio, clave)
+    if df is not None:
+        print(f"⚡ Excel servido desde caché ({clave[:12]}).")
+        return preparar_fechas(df)
+
+    if plan is not None:
+        df = _leer_excel_podado(contenido, plan)
+    else:
+        df = pd.read_excel(io.BytesIO(contenido))
+
+    # La marca temporal se convierte una sola vez y se guarda ya como datetime64
+    preparar_fechas(df)
+    if compactar:
+        compactar_tipos(df)
+
+    ruta = _guardar_en_cache(directorio, clave, df)
+    if ruta:
+        _expulsar_lru(directorio, limite_mb * 1024 * 1024, conservar=ruta)
+
+    return df
@@ -1,3 +1,5 @@
+import os
+
 # -----------------------------------------------------------------------------
 # 1. CONFIGURACIÓN DE ÍNDICES
 # -----------------------------------------------------------------------------
@@ -46,3 +48,108 @@ MAPA_TITULACIONES = {
     'GMAT_ECO':          {'raiz': 'Grado en Matemáticas',                       'cols': [54, 61, 62]},
     'GMAT_PRIM':         {'raiz': 'Grado en Matemáticas',                       'cols': [54, 63, 64]}
 }
+
+# Campos del DataFrame de un subgrupo (IDX_COMUNES + cols del subgrupo) -> posición.
+# Asignatura, Curso y Cuatrimestre se buscan antes por cabecera (ver logic/esquema.py);
+# la posición es la reserva si la cabecera no coincide.
+IDX_CAMPOS_SUBGRUPO = {
+    'profesor': 4,
+    'titulacion': 5,
+    'asignatura': 6,
+    'aprobados': 7,
+    'matriculados': 8,
+    'curso': 9,
+    'cuatrimestre': 10,
+    'valoracion': 12,
+    'justificacion': 13,
+    'deficiencias': 14,
+    'detalle_deficiencias': 15,
+    'temario': 18,
+    'causa_temario': 19,
+    'incidencias': 20,
+    'problemas': 21,
+    'detalles': 22,
+    'caracteristicas_grupo': 23,
+    'satisfaccion': 24,
+    'coordinacion': 30,
+    'otras_incidencias': 33,
+    'sugerencias': 34,
+}
+
+
+# Orden de los textos de Curso / Cuatrimestre (lo que no aparece va al final)
+ORDEN_CURSOS = {
+    'Primero': 1, 'Segundo': 2, 'Tercero': 3, 'Cuarto': 4, 'Quinto': 5,
+    '1': 1, '2': 2, '3': 3, '4': 4, '1º': 1, '2º': 2, '3º': 3, '4º': 4
+}
+
+
+# -----------------------------------------------------------------------------
+# 2. CONFIGURACIÓN DE CACHÉ
+# -----------------------------------------------------------------------------
+
+# Directorio local donde se guardan los Excel ya parseados (formato columnar)
+DIR_CACHE_EXCEL = os.path.join(".cache", "excel")
+
+# Presupuesto máximo de disco para la caché (se expulsan primero los menos usados)
+LIMITE_CACHE_EXCEL_MB = 512
+
+# Almacén histórico de encuestas (Parquet particionado por curso académico y cuatrimestre)
+DIR_ALMACEN = os.path.join(".cache", "almacen")
+
+# Directorio de los ZIP de "Exportar todo" (uno por combinación de datos y opciones)
+DIR_EXPORTACIONES = os.path.join(".cache", "exportaciones")
+
+# Presupuesto máximo de disco para esos ZIP (se borran primero los menos usados)
+LIMITE_EXPORTACIONES_MB = 1024
+
+
+# -----------------------------------------------------------------------------
+# 3. TIPOS COMPACTOS (INGESTA)
+# -----------------------------------------------------------------------------
+
+# Columnas de texto muy repetido (Profesor, Titulación, Curso, Cuatrimestre).
+# Las de asignatura y campus se toman de MAPA_TITULACIONES.
+IDX_TEXTO_CATEGORICO = [4, 5, 65, 66]
+
+# Proporción máxima de valores distintos para convertir una columna a 'category'
+UMBRAL_CARDINALIDAD = 0.5
+
+
+# -----------------------------------------------------------------------------
+# 4. INSTRUMENTACIÓN (RENDIMIENTO)
+# -----------------------------------------------------------------------------
+
+# Medir el pico de memoria con tracemalloc. Desactivado por defecto: multiplica por
+# ~3 el tiempo de las etapas con muchas asignaciones (p.ej. el Word)
+INSTRUMENTAR_MEMORIA = False
+
+# Número de medidas recientes que se conservan para el panel de rendimiento
+MAX_MEDIDAS = 500
+
+
+# -----------------------------------------------------------------------------
+# 5. EXPORTACIÓN DE GRÁFICAS (IMÁGENES)
+# -----------------------------------------------------------------------------
+
+# Formatos admitidos. El PPT no admite SVG: en ese caso se incrustan en PNG
+FORMATOS_GRAFICAS = ["png", "jpeg", "svg"]
+FORMATO_GRAFICAS = "png"
+DPI_GRAFICAS = 150
+
+# Nivel de compresión PNG (0 = rápido y grande, 9 = lento y pequeño; None = el de Pillow)
+COMPRESION_PNG = None
+
+# Calidad JPEG (1-95)
+CALIDAD_JPEG = 85
+
+# bbox_inches='tight' recorta los márgenes a costa de una pasada extra de maquetación
+RECORTE_AJUSTADO = True
+
+
+# -----------------------------------------------------------------------------
+# 6. PRESENTACIÓN (PPT)
+# -----------------------------------------------------------------------------
+
+# Filas de la tabla resumen por diapositiva (cabecera aparte); el resto, en más diapositivas
+FILAS_TABLA_PPT = 12
@@ -0,0 +1,157 @@
+import numpy as np
+import pandas as pd
+from logic.config import MAPA_TITULACIONES, ORDEN_CURSOS
+from logic.esquema import resolver_esquema
+from logic.obtener_datos_subgrupo import obtener_indices_subgrupos, columnas_subgrupo
+from logic.instrumentacion import instrumentar
+
+# Dimensiones del cubo, de lo general a lo concreto
+DIMENSIONES = ["Titulación", "Curso", "Cuatrimestre"]
+
+# Medidas aditivas: se suman al agregar y los indicadores se calculan al final,
+# de modo que cualquier nivel (titulación, titulación x curso...) sale exacto
+MEDIDAS = [
+    "asignaturas", "aprobados", "matriculados", "suma_pct",
+    "suma_val_resultados", "n_val_resultados", "suma_val_grupo", "n_val_grupo",
+]
+
+# Indicadores que se muestran en el panel comparativo
+INDICADORES = [
+    "Asignaturas", "Aprobados", "Matriculados",
+    "% Aprobados (media)", "% Aprobados (ponderado)",
+    "Valoración Resultados", "Valoración Grupo",
+]
+
+# -----------------------------------------------------------------------------
+# Construcción del cubo
+# -----------------------------------------------------------------------------
+
+@instrumentar()
+def construir_cubo(df, codigos=None, progreso=None):
+    """
+    Cubo de KPIs de todas las titulaciones en una pasada.
+
+    Calcula las filas de cada subgrupo en una sola pasada
+    (obtener_indices_subgrupos) y de cada uno lee solo las columnas que usa el
+    cubo, sin construir los DataFrames de los subgrupos. Después agrega todo
+    con un único groupby por Titulación x Curso x Cuatrimestre.
+
+    Args:
+        df: DataFrame completo (ya filtrado por fechas).
+        codigos: (Opcional) Lista de códigos. Por defecto, todo MAPA_TITULACIONES.
+        progreso: (Opcional) función progreso(hechas, total), llamada tras cada subgrupo.
+
+    Returns:
+        DataFrame con las DIMENSIONES y las MEDIDAS (una fila por celda con datos).
+        Los indicadores se obtienen con indicadores_cubo.
+    """
+    _, indices = obtener_indices_subgrupos(df, codigos)
+
+    partes = []
+    for i, (codigo, posiciones) in enumerate(indices.items(), start=1):
+        if len(posiciones):
+            partes.append(_filas_subgrupo(df, codigo, posiciones))
+        if progreso:
+            progreso(i, len(indices))
+
+    if not partes:
+        return pd.DataFrame(columns=DIMENSIONES + MEDIDAS)
+
+    cubo = pd.concat(partes, ignore_index=True).groupby(DIMENSIONES, sort=False).sum().reset_index()
+    return _ordenar(cubo)
+
+def _filas_subgrupo(df, codigo, posiciones):
+    """
+    Una fila por asignatura del subgrupo con sus medidas aditivas. Las columnas
+    se resuelven con la cabecera que tendría el DataFrame del subgrupo y solo
+    se leen esas (df.iloc[posiciones, columnas]).
+    """
+    columnas, cabecera = columnas_subgrupo(df, MAPA_TITULACIONES[codigo])
+    esquema = resolver_esquema(cabecera)
+    n_filas = len(posiciones)
+
+    def columna(pos):
+        return df.iloc[posiciones, columnas[pos]]
+
+    def texto(campo):
+        if esquema.col(campo) is None:
+            return "N/A"
+        return columna(esquema.pos(campo)).astype(str).str.strip().to_numpy()
+
+    def numero(pos):
+        if pos is None or pos >= len(columnas):
+            return np.full(n_filas, np.nan)
+        return pd.to_numeric(columna(pos), errors="coerce").to_numpy(dtype="float64")
+
+    # Mismo criterio que generar_resumen_datos: recuentos vacíos como 0 y
+    # % Aprobados = 0 si no hay matriculados (así la media coincide con el KPI del panel)
+    aprobados = np.nan_to_num(numero(cabecera.index("Aprobados_Subgrupo")))
+    matriculados = np.nan_to_num(numero(cabecera.index("Matriculados_Subgrupo")))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = np.where(matriculados > 0, aprobados / matriculados * 100, 0).round(2)
+
+    val_resultados = numero(esquema.pos("satisfaccion_resultados"))
+    val_grupo = numero(esquema.pos("satisfaccion_grupo"))
+
+    return pd.DataFrame({
+        "Titulación": codigo,
+        "Curso": texto("curso"),
+        "Cuatrimestre": texto("cuatrimestre"),
+        "asignaturas": 1,
+        "aprobados": aprobados,
+        "matriculados": matriculados,
+        "suma_pct": pct,
+        "suma_val_resultados": np.nan_to_num(val_resultados),
+        "n_val_resultados": ~np.isnan(val_resultados),
+        "suma_val_grupo": np.nan_to_num(val_grupo),
+        "n_val_grupo": ~np.isnan(val_grupo),
+    })
+
+def _ordenar(cubo):
+    """Titulaciones en el orden de MAPA_TITULACIONES; cursos y cuatrimestres por ORDEN_CURSOS."""
+    orden_titulacion = {codigo: i for i, codigo in enumerate(MAPA_TITULACIONES)}
+    claves = pd.DataFrame({
+        "t": cubo["Titulación"].map(orden_titulacion),
+        "c": cubo["Curso"].map(ORDEN_CURSOS).fillna(99),
+        "q": cubo["Cuatrimestre"].map(ORDEN_CURSOS).fillna(99),
+        "c_txt": cubo["Curso"],
+        "q_txt": cubo["Cuatrimestre"],
+    })
+    orden = claves.sort_values(list(claves.columns), kind="stable").index
+    return cubo.loc[orden].reset_index(drop=True)
+
+# -----------------------------------------------------------------------------
+# Consulta: agregación a un nivel y cálculo de indicadores
+# -----------------------------------------------------------------------------
+
+def indicadores_cubo(cubo, niveles=DIMENSIONES):
+    """
+    Agrega el cubo a los niveles pedidos (p.ej. ["Titulación"] o
+    ["Titulación", "Curso"]; [] para el total) y calcula los INDICADORES.
+
+    % Aprobados (media) es la media por asignatura, como el KPI del panel;
+    % Aprobados (ponderado) pondera por matriculados (Σ aprobados / Σ matriculados).
+    """
+    niveles = list(niveles)
+    if cubo.empty:
+        return pd.DataFrame(columns=niveles + INDICADORES)
+
+    if niveles:
+        agregado = cubo.groupby(niveles, sort=False)[MEDIDAS].sum().reset_index()
+    else:
+        agregado = cubo[MEDIDAS].sum().to_frame().T
+
+    def cociente(numerador, denominador, escala=1):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(denominador > 0, numerador / denominador * escala, np.nan)
+
+    resultado = agregado[niveles].copy()
+    resultado["Asignaturas"] = agregado["asignaturas"].astype(int)
+    resultado["Aprobados"] = agregado["aprobados"]
+    resultado["Matriculados"] = agregado["matriculados"]
+    resultado["% Aprobados (media)"] = cociente(agregado["suma_pct"], agregado["asignaturas"])
+    resultado["% Aprobados (ponderado)"] = cociente(agregado["aprobados"], agregado["matriculados"], 100)
+    resultado["Valoración Resultados"] = cociente(agregado["suma_val_resultados"], agregado["n_val_resultados"])
+    resultado["Valoración Grupo"] = cociente(agregado["suma_val_grupo"], agregado["n_val_grupo"])
+
+    return resultado.round(2).reset_index(drop=True)
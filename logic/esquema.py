@@ -0,0 +1,100 @@
+import functools
+from logic.config import IDX_CAMPOS_SUBGRUPO
+from logic.utils import normalizar_columnas_texto
+
+# -----------------------------------------------------------------------------
+# Reglas de cabecera: campo -> condición sobre el texto de la columna.
+# Se queda la primera columna (de izquierda a derecha) que la cumple.
+# -----------------------------------------------------------------------------
+
+REGLAS_CABECERA = {
+    # DataFrame de un subgrupo (salida de obtener_datos_subgrupo)
+    "subgrupo": {
+        "asignatura": lambda c: c.strip().startswith("Seleccione"),
+        "curso": lambda c: "Curso" in c,
+        "cuatrimestre": lambda c: "Cuatrimestre" in c,
+        "satisfaccion_resultados": lambda c: "satisfacción" in c and "resultados" in c,
+        "satisfaccion_grupo": lambda c: "satisfacción" in c and "grupo" in c,
+    },
+    # DataFrame resumen (salida de generar_resumen_datos)
+    "resumen": {
+        "asignatura": lambda c: "Seleccione" in c or "Asignatura" in c,
+        "curso": lambda c: "Curso" in c,
+        "cuatrimestre": lambda c: "Cuatrimestre" in c,
+    },
+}
+
+# Campos posicionales de cada tipo de DataFrame
+POSICIONES_FIJAS = {
+    "subgrupo": IDX_CAMPOS_SUBGRUPO,
+    "resumen": {},
+}
+
+class Esquema:
+    """
+    Correspondencia campo -> columna de una cabecera concreta.
+
+    Se resuelve una vez por cabecera (ver resolver_esquema) y después se consulta
+    por nombre: esquema.pos('curso'), esquema.col('asignatura')...
+    """
+
+    def __init__(self, cabecera, posiciones, por_cabecera):
+        self.cabecera = cabecera
+        self.n_columnas = len(cabecera)
+        self.posiciones = posiciones
+        # Campos localizados por su texto de cabecera (no por posición fija)
+        self.por_cabecera = frozenset(por_cabecera)
+
+    def pos(self, campo):
+        """Posición del campo (None si no se encontró)."""
+        return self.posiciones.get(campo)
+
+    def col(self, campo):
+        """Etiqueta original de la columna del campo (None si no existe)."""
+        pos = self.pos(campo)
+        if pos is None or pos >= self.n_columnas:
+            return None
+        return self.cabecera[pos]
+
+    def faltan(self, campos, por_cabecera=False):
+        """
+        Campos de la lista que no están presentes en la cabecera. Con
+        por_cabecera=True, también los que solo se tienen por posición fija.
+        """
+        return [
+            c for c in campos
+            if self.col(c) is None or (por_cabecera and c not in self.por_cabecera)
+        ]
+
+    def textos(self, df, campos):
+        """
+        Columnas de los campos como listas de str (ver normalizar_columnas_texto).
+        Un campo fuera de rango devuelve "N/A" en todas las filas.
+        """
+        por_posicion = normalizar_columnas_texto(df, [self.posiciones[c] for c in campos])
+        return {c: por_posicion[self.posiciones[c]] for c in campos}
+
+def resolver_esquema(columnas, tipo="subgrupo"):
+    """
+    Esquema de una cabecera. Se cachea por firma de cabecera, así que llamar a
+    esta función en cada petición solo recorre las columnas la primera vez.
+
+    Args:
+        columnas: df.columns (o cualquier secuencia de etiquetas).
+        tipo: 'subgrupo' o 'resumen' (ver REGLAS_CABECERA).
+    """
+    return _resolver(tuple(columnas), tipo)
+
+@functools.lru_cache(maxsize=64)
+def _resolver(cabecera, tipo):
+    posiciones = dict(POSICIONES_FIJAS[tipo])
+    por_cabecera = []
+    textos = [str(c) for c in cabecera]
+
+    for campo, regla in REGLAS_CABECERA[tipo].items():
+        pos = next((i for i, c in enumerate(textos) if regla(c)), None)
+        if pos is not None:
+            posiciones[campo] = pos
+            por_cabecera.append(campo)
+
+    return Esquema(cabecera, posiciones, por_cabecera)
@@ -0,0 +1,228 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+from logic.config import MAPA_TITULACIONES, FILAS_TABLA_PPT, DIR_EXPORTACIONES, LIMITE_EXPORTACIONES_MB
+from logic.obtener_datos_subgrupo import obtener_todos_subgrupos
+from logic.generar_resumen_datos import generar_resumen_datos
+from logic.generar_partes_docentes import generar_partes_docentes_stream
+from logic.generar_acta_texto import iterar_acta_texto
+from logic.generar_ppt import generar_ppt, MODO_NATIVO, MODO_IMAGEN
+from logic.instrumentacion import instrumentar
+
+# Instrucciones del prompt para la IA (se anteponen a los datos, como en la app)
+RUTA_INSTRUCCIONES_PROMPT = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "assets", "prompt_instrucciones.txt"
+)
+
+# Artefactos de cada subgrupo y su nombre dentro del ZIP
+ARTEFACTOS = ["word", "ppt", "prompt"]
+NOMBRES_ARTEFACTOS = {
+    "word": "{codigo}/Informe_Calidad_{codigo}.docx",
+    "ppt": "{codigo}/Presentacion_{codigo}.pptx",
+    "prompt": "{codigo}/Prompt_{codigo}.txt",
+}
+
+# Resumen de la exportación (estado, registros y ficheros por subgrupo)
+NOMBRE_INFORME = "informe_exportacion.json"
+
+# Cada artefacto se genera en un temporal (en memoria hasta este tamaño, después
+# en disco) y solo se copia al ZIP si se completa: nunca quedan ficheros truncados
+MAX_MEMORIA_ARTEFACTO = 8 * 1024 * 1024
+
+# -----------------------------------------------------------------------------
+# Escritores: cada uno vuelca un artefacto en la entrada abierta del ZIP
+# -----------------------------------------------------------------------------
+
+def _escribir_word(f, codigo, df_subgrupo, contexto):
+    generar_partes_docentes_stream(df_subgrupo, f)
+
+def _escribir_ppt(f, codigo, df_subgrupo, contexto):
+    df_resumen = generar_resumen_datos(df_subgrupo)
+    figuras = None
+    if contexto["modo_graficas"] == MODO_IMAGEN:
+        # Import diferido: el modo nativo no carga Matplotlib. El PPT no admite SVG
+        from logic.genera_graficas import renderizar_graficas
+        opciones = dict(contexto["opciones_imagen"] or {})
+        if opciones.get("formato") == "svg":
+            opciones["formato"] = "png"
+        figuras = renderizar_graficas(df_resumen, **opciones)
+    # JSON de la IA del subgrupo (<CODIGO>.json), si existe
+    ruta_json = None
+    if contexto["dir_json"]:
+        ruta_json = os.path.join(contexto["dir_json"], f"{codigo}.json")
+        if not os.path.exists(ruta_json):
+            ruta_json = None
+    generar_ppt(df_resumen, figuras, ruta_json=ruta_json, modo_graficas=contexto["modo_graficas"],
+                filas_tabla=contexto["filas_tabla"], destino=f)
+
+def _escribir_prompt(f, codigo, df_subgrupo, contexto):
+    if contexto["instrucciones"]:
+        f.write((contexto["instrucciones"] + "\n\n").encode("utf-8"))
+    for trozo in iterar_acta_texto(df_subgrupo):
+        f.write(trozo.encode("utf-8"))
+
+ESCRITORES = {
+    "word": _escribir_word,
+    "ppt": _escribir_ppt,
+    "prompt": _escribir_prompt,
+}
+
+# -----------------------------------------------------------------------------
+# Función principal
+# -----------------------------------------------------------------------------
+
+@instrumentar()
+def exportar_zip(df, destino, codigos=None, artefactos=ARTEFACTOS, modo_graficas=MODO_NATIVO,
+                 opciones_imagen=None, filas_tabla=FILAS_TABLA_PPT, dir_json=None, progreso=None):
+    """
+    Genera los informes de varios subgrupos y los escribe en un único ZIP.
+
+    El DataFrame (ya leído y filtrado por fechas) se reparte en subgrupos una
+    sola vez. Cada artefacto se genera en un temporal acotado
+    (MAX_MEMORIA_ARTEFACTO) y se copia a su entrada del ZIP al terminar; si
+    falla, no se añade. Al final se añade NOMBRE_INFORME con el estado de cada
+    subgrupo (también de los códigos desconocidos).
+
+    Args:
+        df: DataFrame completo (ya filtrado por fechas).
+        destino: Ruta del ZIP o stream binario de escritura (no hace falta que
+            admita seek).
+        codigos: (Opcional) Lista de códigos. Por defecto, todo MAPA_TITULACIONES.
+        artefactos: Subconjunto de ARTEFACTOS ('word', 'ppt', 'prompt').
+        modo_graficas: Gráficas del PPT (MODO_NATIVO o MODO_IMAGEN).
+        opciones_imagen: (Opcional) Argumentos de renderizar_graficas en MODO_IMAGEN.
+        filas_tabla: Filas de la tabla resumen por diapositiva del PPT.
+        dir_json: (Opcional) Carpeta con los JSON de la IA, uno por subgrupo: <CODIGO>.json
+        progreso: (Opcional) función progreso(hechas, total), llamada tras cada artefacto.
+
+    Returns:
+        El informe (dict) que se guarda en NOMBRE_INFORME.
+    """
+    t_inicio = time.perf_counter()
+    codigos = [c.upper() for c in (codigos or MAPA_TITULACIONES.keys())]
+    artefactos = [a for a in ARTEFACTOS if a in artefactos]
+
+    # 1. Reparto en subgrupos con una sola pasada
+    subgrupos = obtener_todos_subgrupos(df, codigos)
+
+    contexto = {
+        "modo_graficas": modo_graficas,
+        "opciones_imagen": opciones_imagen,
+        "filas_tabla": filas_tabla,
+        "dir_json": dir_json,
+        "instrucciones": _leer_instrucciones() if "prompt" in artefactos else None,
+    }
+
+    total = sum(1 for d in subgrupos.values() if not d.empty) * len(artefactos)
+    hechas = 0
+    informe = {"codigos": codigos, "artefactos": artefactos, "subgrupos": []}
+
+    # 2. Un artefacto tras otro, cada uno copiado a su entrada del ZIP al completarse
+    with zipfile.ZipFile(destino, "w", compression=zipfile.ZIP_DEFLATED) as zout:
+        for codigo in codigos:
+            if codigo not in subgrupos:
+                informe["subgrupos"].append({"codigo": codigo, "registros": 0,
+                                             "estado": "código desconocido", "ficheros": []})
+                continue
+            df_subgrupo = subgrupos[codigo]
+            entrada = {"codigo": codigo, "registros": len(df_subgrupo), "estado": "ok", "ficheros": []}
+            informe["subgrupos"].append(entrada)
+            if df_subgrupo.empty:
+                entrada["estado"] = "sin datos"
+                continue
+
+            t0 = time.perf_counter()
+            for artefacto in artefactos:
+                nombre = NOMBRES_ARTEFACTOS[artefacto].format(codigo=codigo)
+                try:
+                    with tempfile.SpooledTemporaryFile(max_size=MAX_MEMORIA_ARTEFACTO) as temporal:
+                        ESCRITORES[artefacto](temporal, codigo, df_subgrupo, contexto)
+                        temporal.seek(0)
+                        with zout.open(nombre, "w") as f:
+                            shutil.copyfileobj(temporal, f)
+                    entrada["ficheros"].append(nombre)
+                except Exception as e:
+                    # El fichero no llega al ZIP: se marca en el informe y se sigue
+                    entrada["estado"] = "error"
+                    entrada.setdefault("errores", {})[nombre] = f"{type(e).__name__}: {e}"
+                    print(f"❌ {nombre}: {e}")
+                hechas += 1
+                if progreso:
+                    progreso(hechas, total)
+
+            entrada["tiempo"] = round(time.perf_counter() - t0, 3)
+            print(f"{'✅' if entrada['estado'] == 'ok' else '❌'} {codigo}: "
+                  f"{len(entrada['ficheros'])} ficheros en {entrada['tiempo']:.2f}s")
+
+        informe["tiempo_total"] = round(time.perf_counter() - t_inicio, 3)
+        zout.writestr(NOMBRE_INFORME, json.dumps(informe, ensure_ascii=False, indent=2))
+
+    return informe
+
+def _leer_instrucciones(ruta=RUTA_INSTRUCCIONES_PROMPT):
+    """Instrucciones del prompt (None si no existe el fichero)."""
+    if not os.path.exists(ruta):
+        print(f"⚠️ No se encuentra {ruta}: el prompt solo llevará los datos.")
+        return None
+    with open(ruta, "r", encoding="utf-8") as f:
+        return f.read()
+
+# -----------------------------------------------------------------------------
+# ZIP en disco (exportaciones de la app)
+# -----------------------------------------------------------------------------
+
+def exportar_zip_a_disco(df, ruta_zip, *args, limite_mb=LIMITE_EXPORTACIONES_MB, **kwargs):
+    """
+    exportar_zip sobre un temporal junto a ruta_zip que solo se renombra si
+    termina bien (si falla, se borra). Después se aplica el presupuesto de disco
+    del directorio (ver limpiar_exportaciones), sin tocar el ZIP recién creado.
+
+    Returns:
+        El informe de exportar_zip.
+    """
+    directorio = os.path.dirname(ruta_zip) or "."
+    os.makedirs(directorio, exist_ok=True)
+    ruta_tmp = ruta_zip + ".tmp"
+    try:
+        informe = exportar_zip(df, ruta_tmp, *args, **kwargs)
+        os.replace(ruta_tmp, ruta_zip)
+    except BaseException:
+        if os.path.exists(ruta_tmp):
+            os.remove(ruta_tmp)
+        raise
+    limpiar_exportaciones(directorio, limite_mb, conservar=ruta_zip)
+    return informe
+
+def limpiar_exportaciones(directorio=DIR_EXPORTACIONES, limite_mb=LIMITE_EXPORTACIONES_MB, conservar=None):
+    """
+    Borra los ZIP menos usados (por mtime) hasta quedar por debajo de limite_mb.
+    Los .tmp de exportaciones en curso no se tocan.
+    """
+    if not os.path.isdir(directorio):
+        return
+    entradas = []
+    for nombre in os.listdir(directorio):
+        if not nombre.endswith(".zip"):
+            continue
+        ruta = os.path.join(directorio, nombre)
+        try:
+            info = os.stat(ruta)
+        except OSError:
+            continue
+        entradas.append((ruta, info.st_size, info.st_mtime))
+
+    total = sum(tam for _, tam, _ in entradas)
+    for ruta, tam, _ in sorted(entradas, key=lambda e: e[2]):
+        if total <= limite_mb * 1024 * 1024:
+            break
+        if ruta == conservar:
+            continue
+        try:
+            os.remove(ruta)
+            total -= tam
+        except OSError:
+            pass
@@ -1,144 +1,233 @@
-import matplotlib.pyplot as plt
+import hashlib
+import io
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import matplotlib
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 import seaborn as sns
-
+from logic.config import (
+    FORMATO_GRAFICAS, DPI_GRAFICAS, COMPRESION_PNG, CALIDAD_JPEG, RECORTE_AJUSTADO,
+)
+from logic.utils import hash_dataframe
+from logic.preparar_datos_graficas import CONFIG_GRAFICAS, preparar_datos_graficas
+from logic.instrumentacion import instrumentar
+
+# Caché de gráficas ya codificadas: hash(df_resumen + config + opciones) -> ([(Titulo, bytes), ...], segundos)
+MAX_CACHE_GRAFICAS = 32
+_cache_graficas = OrderedDict()
+
+# Pool de procesos para renderizar en paralelo (se crea bajo demanda y se reutiliza).
+# Sin 'fork': se crea desde hilos del servidor (heredaría locks tomados y toda su memoria)
+MAX_WORKERS_GRAFICAS = os.cpu_count() or 1
+METODO_ARRANQUE_GRAFICAS = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+_pool_graficas = None
+
+# La caché y la creación del pool se comparten entre los hilos de trabajos en segundo plano
+_lock_graficas = threading.Lock()
+
+# Tema de seaborn ('whitegrid') como rcParams: se aplica una vez al arrancar cada
+# proceso del pool; en el proceso actual, solo mientras se dibuja (rc_context)
+RC_TEMA_GRAFICAS = {
+    **sns.axes_style("whitegrid"),
+    **sns.plotting_context("notebook"),
+    "axes.prop_cycle": matplotlib.cycler(color=sns.color_palette("deep")),
+}
+
+@instrumentar()
 def genera_graficas(df):
     """
     Genera gráficas de análisis utilizando Matplotlib/Seaborn.
     Retorna una lista de tuplas: [(Titulo, Figura), ...]
     Adaptado para detectar dinámicamente las columnas de cualquier titulación.
+
+    Las figuras se crean con la API orientada a objetos (Figure/Axes sobre Agg),
+    no se registran en pyplot y se liberan al dejar de usarse.
     """
-    
-    figuras_output = []
-
-    # --- 1. RENOMBRADO DINÁMICO (LA SOLUCIÓN AL ERROR) ---
-    # En lugar de usar nombres fijos, buscamos las columnas por palabras clave
-    
-    # Buscar columna que parezca la Asignatura
-    col_asig = next((c for c in df.columns if "Seleccione" in str(c) or "Asignatura" in str(c)), None)
-    # Buscar columna que parezca el Curso
-    col_curso = next((c for c in df.columns if "Curso" in str(c)), None)
-    # Buscar columna que parezca el Cuatrimestre
-    col_cuatri = next((c for c in df.columns if "Cuatrimestre" in str(c)), None)
-
-    rename_map = {}
-    if col_asig: rename_map[col_asig] = 'Asignatura'
-    if col_curso: rename_map[col_curso] = 'Curso'
-    if col_cuatri: rename_map[col_cuatri] = 'Cuatrimestre'
-
-    # Aplicamos el renombrado
-    df = df.rename(columns=rename_map)
-    df.columns = df.columns.str.strip()
-
-    # Validación de seguridad: Si no encontramos las columnas clave, salimos
-    if 'Asignatura' not in df.columns:
-        print("⚠️ No se encontró la columna de Asignatura.")
-        return []
-
-    sns.set_theme(style="whitegrid")
-
-    # --- 2. PREPARACIÓN DE DATOS ---
-    # Convertimos curso a string para evitar errores de ordenación con tipos mixtos
-    if 'Curso' in df.columns:
-        df['Curso'] = df['Curso'].astype(str)
-        cursos_unicos = sorted(df['Curso'].unique())
-    else:
-        cursos_unicos = []
+    with matplotlib.rc_context(RC_TEMA_GRAFICAS):
+        return [(spec["titulo"], _dibujar_grafica(spec)) for spec in preparar_datos_graficas(df)]
 
-    # Configuración de colores
-    if cursos_unicos:
-        colores = sns.color_palette("Set2", n_colors=len(cursos_unicos))
-        mapa_colores = dict(zip(cursos_unicos, colores))
+@instrumentar()
+def renderizar_graficas(df, formato=FORMATO_GRAFICAS, dpi=DPI_GRAFICAS, paralelo=True, progreso=None,
+                        compresion=COMPRESION_PNG, calidad=CALIDAD_JPEG, recorte=RECORTE_AJUSTADO,
+                        informe=None):
+    """
+    Genera las gráficas y las devuelve ya codificadas: [(Titulo, bytes), ...].
+
+    Cada gráfica (global, o curso x métrica) es una tarea independiente que se
+    reparte en un pool de procesos, de modo que el tiempo total se acerca al de
+    la gráfica más lenta. El resultado se memoiza por el hash de df_resumen, de
+    la configuración y de las opciones de imagen, así la pestaña de gráficas y
+    el PPT reutilizan las mismas imágenes.
+
+    Args:
+        df: DataFrame resumen (salida de generar_resumen_datos).
+        formato: 'png', 'jpeg' o 'svg' (ver FORMATOS_GRAFICAS).
+        dpi: Resolución de las imágenes rasterizadas.
+        paralelo: False para renderizar en el proceso actual (p.ej. si ya se
+            está dentro de un worker del procesado por lotes).
+        progreso: (Opcional) función progreso(hechas, total), llamada tras cada gráfica.
+        compresion: Nivel de compresión PNG 0-9 (None = el de Pillow).
+        calidad: Calidad JPEG 1-95.
+        recorte: bbox_inches='tight' (recorta márgenes; una pasada de maquetación más).
+        informe: (Opcional) dict que se rellena con tamaños, imágenes únicas y
+            tiempo de codificación (ver informe_imagenes).
+    """
+    opciones = _opciones_guardado(formato, dpi, compresion, calidad, recorte)
+    clave = hash_dataframe(df, CONFIG_GRAFICAS, formato, opciones)
+    with _lock_graficas:
+        cacheado = _cache_graficas.get(clave)
+        if cacheado is not None:
+            _cache_graficas.move_to_end(clave)
+    if cacheado is not None:
+        imagenes, segundos = cacheado
+        if progreso:
+            progreso(len(imagenes), len(imagenes))
+        if informe is not None:
+            informe.update(informe_imagenes(imagenes, formato, dpi, segundos), cache=True)
+        return list(imagenes)
+
+    tareas = [(spec, formato, opciones) for spec in preparar_datos_graficas(df)]
+
+    if paralelo and len(tareas) > 1 and MAX_WORKERS_GRAFICAS > 1:
+        resultados = _obtener_pool().map(_renderizar_tarea, tareas)
     else:
-        mapa_colores = {}
-
-    config_graficas = [
-        {"col": "% Aprobados", "titulo": "Porcentaje de Aprobados", "ylabel": "% Aprobados", "ylim": (0, 100)},
-        {"col": "Valoración Resultados", "titulo": "Valoración Resultados", "ylabel": "Puntuación (0-5)", "ylim": (0, 5)},
-        {"col": "Valoración Grupo", "titulo": "Valoración Grupo", "ylabel": "Puntuación (0-5)", "ylim": (0, 5)}
-    ]
-
-    # --- 3. GRÁFICAS GLOBALES ---
-    for cfg in config_graficas:
-        if cfg["col"] not in df.columns: continue
-
-        fig = plt.figure(figsize=(14, 8))
-        
-        # Intentamos ordenar, si falla (ej. curso no existe), usamos el df tal cual
-        try:
-            sort_cols = ['Curso', 'Asignatura'] if 'Curso' in df.columns else ['Asignatura']
-            df_sorted = df.sort_values(by=sort_cols)
-        except:
-            df_sorted = df
-
-        # Gráfica
-        kwargs_plot = {
-            'data': df_sorted,
-            'x': 'Asignatura',
-            'y': cfg["col"]
-        }
-        # Solo añadimos hue si tenemos cursos identificados
-        if 'Curso' in df.columns and mapa_colores:
-            kwargs_plot['hue'] = 'Curso'
-            kwargs_plot['palette'] = mapa_colores
-            kwargs_plot['dodge'] = False
-        
-        sns.barplot(**kwargs_plot)
-        
-        plt.ylim(cfg["ylim"])
-        
-        # Línea de media (solo si hay datos numéricos válidos)
-        if not df[cfg["col"]].isnull().all():
-            media_valor = df[cfg["col"]].mean()
-            plt.axhline(y=media_valor, color='red', linestyle='--', linewidth=2, alpha=0.8)
-            
-            plt.text(
-                x=len(df_sorted) - 0.5,
-                y=media_valor + (cfg["ylim"][1] * 0.02),
-                s=f'Media: {media_valor:.2f}', 
-                color='red', 
-                fontweight='bold', 
-                ha='right'
-            )
-        
-        plt.title(f"GLOBAL - {cfg['titulo']}", fontsize=16)
-        plt.ylabel(cfg["ylabel"])
-        plt.xlabel("Asignatura")
-        plt.xticks(rotation=45, ha='right')
-        
-        if 'Curso' in df.columns and mapa_colores:
-            plt.legend(title="Curso", bbox_to_anchor=(1.01, 1), loc='upper left')
-            
-        plt.tight_layout()
-        figuras_output.append((f"Global: {cfg['titulo']}", fig))
-
-    # --- 4. GRÁFICAS POR CURSO ---
-    for curso in cursos_unicos:
-        if curso not in mapa_colores: continue
-        
-        df_curso = df[df['Curso'] == curso].copy()
-        if df_curso.empty: continue
-
-        for cfg in config_graficas:
-            if cfg["col"] not in df_curso.columns: continue
-
-            fig = plt.figure(figsize=(10, 6))
-            
-            df_curso_sorted = df_curso.sort_values(by=cfg["col"], ascending=False)
-            
-            sns.barplot(
-                data=df_curso_sorted,
-                x='Asignatura',
-                y=cfg["col"],
-                color=mapa_colores[curso]
+        resultados = (_renderizar_tarea_en_proceso(tarea) for tarea in tareas)
+
+    # Los resultados llegan en orden; se avisa del progreso según se completan
+    imagenes = []
+    segundos = 0.0
+    for titulo, contenido, t_guardado in resultados:
+        imagenes.append((titulo, contenido))
+        segundos += t_guardado
+        if progreso:
+            progreso(len(imagenes), len(tareas))
+
+    with _lock_graficas:
+        _cache_graficas[clave] = (tuple(imagenes), segundos)
+        while len(_cache_graficas) > MAX_CACHE_GRAFICAS:
+            _cache_graficas.popitem(last=False)
+
+    resumen = informe_imagenes(imagenes, formato, dpi, segundos)
+    print(f"🖼️ Gráficas {formato.upper()} a {dpi} dpi: {resumen['imagenes']} imágenes "
+          f"({resumen['unicas']} únicas), {resumen['bytes'] / 1024:.0f} KB, "
+          f"{resumen['tiempo_codificacion_s']:.2f}s de codificación.")
+    if informe is not None:
+        informe.update(resumen, cache=False)
+
+    return imagenes
+
+def informe_imagenes(imagenes, formato=None, dpi=None, segundos=None):
+    """
+    Tamaño total, imágenes únicas por huella de contenido (las repetidas se
+    guardan una sola vez en el PPTX) y tiempo de codificación de [(Titulo, bytes), ...].
+    """
+    huellas = {}
+    for _, contenido in imagenes:
+        huellas.setdefault(hashlib.sha1(contenido).hexdigest(), len(contenido))
+    total = sum(len(contenido) for _, contenido in imagenes)
+    return {
+        "formato": formato,
+        "dpi": dpi,
+        "imagenes": len(imagenes),
+        "unicas": len(huellas),
+        "bytes": total,
+        "bytes_unicos": sum(huellas.values()),
+        "tiempo_codificacion_s": round(segundos, 3) if segundos is not None else None,
+    }
+
+# -----------------------------------------------------------------------------
+# Motor de renderizado (sin estado global de pyplot, apto para procesos)
+# -----------------------------------------------------------------------------
+
+def _obtener_pool():
+    global _pool_graficas
+    with _lock_graficas:
+        if _pool_graficas is None:
+            _pool_graficas = ProcessPoolExecutor(
+                max_workers=MAX_WORKERS_GRAFICAS,
+                mp_context=multiprocessing.get_context(METODO_ARRANQUE_GRAFICAS),
+                initializer=_iniciar_worker,
             )
-            
-            plt.ylim(cfg["ylim"])
-            plt.title(f"CURSO {curso} - {cfg['titulo']}", fontsize=16)
-            plt.ylabel(cfg["ylabel"])
-            plt.xlabel("Asignatura")
-            plt.xticks(rotation=45, ha='right')
-            plt.tight_layout()
-            
-            figuras_output.append((f"Curso {curso}: {cfg['titulo']}", fig))
-
-    return figuras_output
+        return _pool_graficas
+
+def _iniciar_worker():
+    """Tema de las gráficas para todo el proceso del pool (una sola vez)."""
+    matplotlib.rcParams.update(RC_TEMA_GRAFICAS)
+
+def _opciones_guardado(formato, dpi, compresion, calidad, recorte):
+    """Argumentos de savefig para el formato (solo los que le afectan)."""
+    opciones = {"dpi": dpi, "bbox_inches": "tight" if recorte else None}
+    if formato == "png" and compresion is not None:
+        opciones["pil_kwargs"] = {"compress_level": compresion}
+    elif formato == "jpeg":
+        opciones["pil_kwargs"] = {"quality": calidad}
+    return opciones
+
+def _renderizar_tarea(tarea):
+    """Dibuja y codifica una gráfica. Se ejecuta en un proceso del pool."""
+    spec, formato, opciones = tarea
+    fig = _dibujar_grafica(spec)
+    buffer = io.BytesIO()
+    t0 = time.perf_counter()
+    fig.savefig(buffer, format=formato, **opciones)
+    return (spec["titulo"], buffer.getvalue(), time.perf_counter() - t0)
+
+def _renderizar_tarea_en_proceso(tarea):
+    """Como _renderizar_tarea, sin tocar el tema global del proceso actual."""
+    with matplotlib.rc_context(RC_TEMA_GRAFICAS):
+        return _renderizar_tarea(tarea)
+
+def _dibujar_grafica(spec):
+    """Construye una Figure a partir de una especificación de gráfica (con el tema ya aplicado)."""
+    cfg = spec["cfg"]
+    fig = Figure(figsize=spec["figsize"])
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+
+    datos = spec["datos"]
+    kwargs_plot = {
+        'x': datos["asignaturas"],
+        'y': datos["valores"],
+        'ax': ax
+    }
+    if spec["palette"]:
+        # Global: un color por curso
+        kwargs_plot['hue'] = datos["cursos"]
+        kwargs_plot['palette'] = spec["palette"]
+        kwargs_plot['dodge'] = False
+    else:
+        kwargs_plot['color'] = spec["color"]
+
+    sns.barplot(**kwargs_plot)
+
+    ax.set_ylim(cfg["ylim"])
+
+    # Línea de media (solo gráficas globales con datos numéricos válidos)
+    if spec["media"] is not None:
+        ax.axhline(y=spec["media"], color='red', linestyle='--', linewidth=2, alpha=0.8)
+        ax.text(
+            x=len(datos["asignaturas"]) - 0.5,
+            y=spec["media"] + (cfg["ylim"][1] * 0.02),
+            s=f'Media: {spec["media"]:.2f}',
+            color='red',
+            fontweight='bold',
+            ha='right'
+        )
+
+    ax.set_title(spec["titulo_grafica"], fontsize=16)
+    ax.set_ylabel(cfg["ylabel"])
+    ax.set_xlabel("Asignatura")
+    for etiqueta in ax.get_xticklabels():
+        etiqueta.set_rotation(45)
+        etiqueta.set_ha('right')
+
+    if spec["palette"]:
+        ax.legend(title="Curso", bbox_to_anchor=(1.01, 1), loc='upper left')
+
+    fig.tight_layout()
+    return fig
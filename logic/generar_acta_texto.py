@@ -1,100 +1,142 @@
-import pandas as pd
+import threading
+import numpy as np
+from collections import OrderedDict
+from logic.utils import calcular_tasas_exito, hash_dataframe
+from logic.esquema import resolver_esquema
+from logic.generar_partes_docentes import orden_por_curso, FILAS_POR_TROZO
+from logic.instrumentacion import instrumentar
 
-def safe_get_text(row, idx):
-    """
-    Función auxiliar para obtener texto limpio del DataFrame por índice de columna.
-    Maneja valores nulos (NaN) y vacíos.
-    """
-    try:
-        val = row.iloc[idx]
-        if pd.isna(val) or val == "" or str(val).lower() == "nan":
-            return "No indicado / No aplica"
-        return str(val).strip()
-    except IndexError:
-        return "N/A"
-
-def generar_acta_texto(df):
+# Campos del esquema (ver logic/esquema.py) que se vuelcan en el texto del acta
+CAMPOS_ACTA = [
+    'profesor',
+    'titulacion',
+    'asignatura',
+    'aprobados',
+    'matriculados',
+    'curso',
+    'cuatrimestre',
+    'valoracion',
+    'justificacion',
+    'deficiencias',
+    'detalle_deficiencias',
+    'temario',
+    'causa_temario',
+    'incidencias',
+    'problemas',
+    'detalles',
+    'caracteristicas_grupo',
+    'satisfaccion',
+    'coordinacion',
+    'otras_incidencias',
+    'sugerencias',
+]
+
+# Caché del texto completo por hash de los datos del subgrupo (compartida por
+# los hilos de trabajos en segundo plano)
+MAX_CACHE_ACTA = 16
+_cache_acta = OrderedDict()
+_lock_acta = threading.Lock()
+
+def iterar_acta_texto(df):
     """
-    Toma el DataFrame filtrado y genera un string largo con toda la información
-    de las asignaturas, formateado para ser leído por una IA.
+    Genera el texto del acta por trozos: primero la cabecera y después un bloque
+    por asignatura. "".join() de los trozos es exactamente generar_acta_texto(df),
+    así la interfaz o un fichero pueden ir escribiéndolos sin acumular el texto.
     """
     
-    # 1. ORDENAR DATOS (Misma lógica que en el Word)
-    try:
-        df_sorted = df.copy()
-        # Intentamos convertir la columna curso (índice 9) a número
-        df_sorted['Curso_Num'] = pd.to_numeric(df_sorted.iloc[:, 9], errors='coerce').fillna(999)
-        # Ordenar por Curso -> Semestre (idx 10) -> Asignatura (idx 6)
-        df_sorted = df_sorted.sort_values(by=['Curso_Num', df.columns[10], df.columns[6]])
-    except Exception:
-        # Si falla, ordenamos por nombre de curso
-        df_sorted = df.sort_values(by=[df.columns[9], df.columns[6]])
+    # Posiciones de los campos, resueltas una vez por cabecera
+    esquema = resolver_esquema(df.columns)
+
+    # 1. ORDENAR DATOS (misma lógica que en el Word; solo las posiciones)
+    orden = orden_por_curso(df, esquema)
+
+    faltan = esquema.faltan(CAMPOS_ACTA)
+    if faltan:
+        print(f"⚠️ Campos no presentes en el subgrupo (se mostrarán como N/A): {', '.join(faltan)}")
 
     # 2. CONSTRUCCIÓN DEL TEXTO
-    texto_acumulado = []
-    
-    texto_acumulado.append(f"INFORME DE DATOS DE LA TITULACIÓN")
-    texto_acumulado.append(f"Total de asignaturas procesadas: {len(df)}")
-    texto_acumulado.append("=" * 60 + "\n")
-
-    for index, row in df_sorted.iterrows():
-        # --- EXTRACCIÓN DE VARIABLES (Índices basados en tu script original) ---
-        asignatura = safe_get_text(row, 6)
-        profesor = safe_get_text(row, 4)
-        titulacion = safe_get_text(row, 5)
-        curso = safe_get_text(row, 9)
-        semestre = safe_get_text(row, 10)
-        
-        matriculados = safe_get_text(row, 8)
-        aprobados = safe_get_text(row, 7)
-        
-        # Cálculo de tasa de éxito
-        tasa_exito = "N/A"
-        try:
-            m = float(matriculados)
-            a = float(aprobados)
-            if m > 0:
-                tasa_exito = f"{(a/m)*100:.1f}%"
-        except:
-            pass
+    yield "INFORME DE DATOS DE LA TITULACIÓN"
+    yield f"\nTotal de asignaturas procesadas: {len(df)}"
+    yield "\n" + "=" * 60 + "\n"
+
+    # 3. PRE-PASADA VECTORIZADA POR TROZOS: las columnas del trozo a listas de texto
+    for inicio in range(0, len(orden), FILAS_POR_TROZO):
+        yield from _bloques_trozo(esquema, df.iloc[orden[inicio:inicio + FILAS_POR_TROZO]])
 
+def _bloques_trozo(esquema, trozo):
+    """Texto de cada asignatura de un trozo de filas ya ordenado."""
+    col = esquema.textos(trozo, CAMPOS_ACTA)
+    tasas = calcular_tasas_exito(col['aprobados'], col['matriculados'], solo_matriculados_positivos=True)
+    textos_tasa = [f"{t:.1f}%" if not np.isnan(t) else "N/A" for t in tasas]
+
+    for i in range(len(trozo)):
         # --- BLOQUE DE TEXTO POR ASIGNATURA ---
-        bloque = f"""
-### ASIGNATURA: {asignatura}
-- Profesor/a: {profesor}
-- Curso: {curso} | Semestre: {semestre}
-- Titulación: {titulacion}
+        yield f"""\n
+### ASIGNATURA: {col['asignatura'][i]}
+- Profesor/a: {col['profesor'][i]}
+- Curso: {col['curso'][i]} | Semestre: {col['cuatrimestre'][i]}
+- Titulación: {col['titulacion'][i]}
 
 1. DATOS CUANTITATIVOS:
-   - Matriculados: {matriculados}
-   - Aprobados: {aprobados}
-   - Tasa de Éxito: {tasa_exito}
+   - Matriculados: {col['matriculados'][i]}
+   - Aprobados: {col['aprobados'][i]}
+   - Tasa de Éxito: {textos_tasa[i]}
 
 2. ANÁLISIS DE RESULTADOS:
-   - Valoración Docente (1-5): {safe_get_text(row, 12)}
-   - Justificación / Acciones de mejora: {safe_get_text(row, 13)}
-   - ¿Existen deficiencias de formación previas?: {safe_get_text(row, 14)}
-   - Detalles de deficiencias: {safe_get_text(row, 15)}
+   - Valoración Docente (1-5): {col['valoracion'][i]}
+   - Justificación / Acciones de mejora: {col['justificacion'][i]}
+   - ¿Existen deficiencias de formación previas?: {col['deficiencias'][i]}
+   - Detalles de deficiencias: {col['detalle_deficiencias'][i]}
 
 3. DOCENCIA E INCIDENCIAS:
-   - ¿Temario completo?: {safe_get_text(row, 18)}
-   - Causa si no se completó: {safe_get_text(row, 19)}
-   - Incidencias generales: {safe_get_text(row, 20)}
-   - Problemas detectados: {safe_get_text(row, 21)}
-   - Detalles adicionales: {safe_get_text(row, 22)}
+   - ¿Temario completo?: {col['temario'][i]}
+   - Causa si no se completó: {col['causa_temario'][i]}
+   - Incidencias generales: {col['incidencias'][i]}
+   - Problemas detectados: {col['problemas'][i]}
+   - Detalles adicionales: {col['detalles'][i]}
 
 4. GRUPO Y COORDINACIÓN:
-   - Características del grupo: {safe_get_text(row, 23)}
-   - Satisfacción con el grupo: {safe_get_text(row, 24)}
-   - Coordinación con otras asignaturas: {safe_get_text(row, 30)}
+   - Características del grupo: {col['caracteristicas_grupo'][i]}
+   - Satisfacción con el grupo: {col['satisfaccion'][i]}
+   - Coordinación con otras asignaturas: {col['coordinacion'][i]}
 
 5. CIERRE:
-   - Otras incidencias: {safe_get_text(row, 33)}
-   - Sugerencias: {safe_get_text(row, 34)}
+   - Otras incidencias: {col['otras_incidencias'][i]}
+   - Sugerencias: {col['sugerencias'][i]}
 
 ------------------------------------------------------------
 """
-        texto_acumulado.append(bloque)
 
-    # Unimos todo en un solo string
-    return "\n".join(texto_acumulado)
+@instrumentar()
+def generar_acta_texto(df, progreso=None):
+    """
+    Toma el DataFrame filtrado y genera un string largo con toda la información
+    de las asignaturas, formateado para ser leído por una IA.
+
+    El resultado se cachea por el hash de los datos del subgrupo.
+    progreso: (Opcional) función progreso(hechas, total), llamada tras cada asignatura.
+    """
+    clave = hash_dataframe(df)
+    with _lock_acta:
+        texto = _cache_acta.get(clave)
+        if texto is not None:
+            _cache_acta.move_to_end(clave)
+    if texto is not None:
+        if progreso:
+            progreso(len(df), len(df))
+        return texto
+
+    trozos = []
+    for trozo in iterar_acta_texto(df):
+        trozos.append(trozo)
+        # Los tres primeros trozos son la cabecera; después, uno por asignatura
+        if progreso and len(trozos) > 3:
+            progreso(len(trozos) - 3, len(df))
+    texto = "".join(trozos)
+
+    with _lock_acta:
+        _cache_acta[clave] = texto
+        while len(_cache_acta) > MAX_CACHE_ACTA:
+            _cache_acta.popitem(last=False)
+
+    return texto
@@ -1,20 +1,64 @@
 import pandas as pd
 from docx import Document
-from docx.shared import Pt, RGBColor, Inches
+from docx.shared import Pt, RGBColor, Inches, Emu
 from docx.enum.text import WD_ALIGN_PARAGRAPH
-import io  # <--- NUEVO IMPORT PARA MANEJAR MEMORIA
+from docx.oxml.ns import qn
+import io
+import functools
+import hashlib
+from collections import OrderedDict
+import re
+import threading
+import zipfile
+from xml.sax.saxutils import escape
+import numpy as np
+from logic.utils import calcular_tasas_exito, TEXTO_NO_INDICADO
+from logic.esquema import resolver_esquema
+from logic.instrumentacion import instrumentar
 
-# --- FUNCIONES AUXILIARES (Sin cambios) ---
+# Campos del esquema (ver logic/esquema.py) que se leen del DataFrame del subgrupo
+CAMPOS_INFORME = [
+    'profesor',
+    'titulacion',
+    'asignatura',
+    'aprobados',
+    'matriculados',
+    'curso',
+    'cuatrimestre',
+    'valoracion',
+    'justificacion',
+    'deficiencias',
+    'detalle_deficiencias',
+    'temario',
+    'causa_temario',
+    'incidencias',
+    'problemas',
+    'detalles',
+    'caracteristicas_grupo',
+    'satisfaccion',
+    'coordinacion',
+    'otras_incidencias',
+    'sugerencias',
+]
 
-def safe_get(row, idx):
-    """Obtiene valor seguro de la columna, manejando NaNs."""
-    try:
-        val = row.iloc[idx]
-        if pd.isna(val) or val == "" or str(val).lower() == "nan":
-            return "No indicado / No aplica"
-        return str(val).strip()
-    except IndexError:
-        return "N/A"
+# Estilo de cada nivel de título (0 = portada)
+ESTILOS_TITULO = {0: 'Title', 1: 'Heading 1', 2: 'Heading 2'}
+
+# Parte del paquete .docx que contiene el cuerpo del documento
+PARTE_DOCUMENTO = 'word/document.xml'
+
+# Filas que se pasan a texto a la vez (la memoria de trabajo depende de esto, no del subgrupo)
+FILAS_POR_TROZO = 256
+
+# XML ya generado de cada sección de asignatura (escritor en streaming).
+# Acotada por bytes y no por entradas, para que el pico de memoria no crezca
+# con el número de asignaturas. La comparten los hilos de trabajos en segundo plano
+MAX_BYTES_CACHE_SECCIONES = 4 * 1024 * 1024
+_cache_secciones = OrderedDict()
+_bytes_cache_secciones = 0
+_lock_secciones = threading.Lock()
+
+# --- FUNCIONES AUXILIARES (Sin cambios) ---
 
 def add_qa_bloque(doc, pregunta, respuesta):
     """Añade bloque Pregunta (Azul/Negrita) - Respuesta (Normal)."""
@@ -36,110 +80,407 @@ def add_qa_bloque(doc, pregunta, respuesta):
         run_res.font.size = Pt(10)
         p_res.paragraph_format.space_after = Pt(8)
 
+def add_heading_rapido(doc, texto, estilo_id):
+    """
+    Equivalente a doc.add_heading() pero con el id de estilo ya resuelto:
+    python-docx busca el estilo por nombre (XPath sobre styles.xml) en cada llamada.
+    """
+    p = doc.add_paragraph(texto)
+    p._p.style = estilo_id
+    return p
+
+def volcar_contenido(doc_trabajo, doc):
+    """
+    Mueve los bloques de doc_trabajo al final del cuerpo de doc (antes de su
+    sectPr). python-docx busca el sectPr recorriendo todo el cuerpo en cada
+    inserción, así que construir cada asignatura en un documento auxiliar vacío
+    y moverla después evita el coste cuadrático con miles de asignaturas.
+    """
+    sect_pr = doc.element.body.sectPr
+    for elemento in list(doc_trabajo.element.body):
+        if elemento.tag != qn('w:sectPr'):
+            sect_pr.addprevious(elemento)
+
 # --- FUNCIÓN PRINCIPAL MODIFICADA ---
 
-def generar_partes_docentes(df):
+def orden_por_curso(df, esquema=None):
     """
-    Genera un documento Word en memoria con todas las asignaturas.
-    Retorna un objeto BytesIO listo para descargar.
+    Posiciones de las filas ordenadas por Curso (numérico si se puede) ->
+    Cuatrimestre -> Asignatura. Solo se ordenan las tres claves: el DataFrame
+    no se copia.
     """
-    
-    # 1. ORDENAR DATOS
     print("🔄 Ordenando datos por Curso y Asignatura...")
+    esquema = esquema or resolver_esquema(df.columns)
+    curso, cuatrimestre, asignatura = (
+        df.iloc[:, esquema.pos(c)].reset_index(drop=True) for c in ("curso", "cuatrimestre", "asignatura")
+    )
     try:
-        df_sorted = df.copy()
-        df_sorted['Curso_Num'] = pd.to_numeric(df_sorted.iloc[:, 9], errors='coerce').fillna(999)
-        df_sorted = df_sorted.sort_values(by=['Curso_Num', df.columns[10], df.columns[6]])
+        claves = pd.DataFrame({
+            'Curso_Num': pd.to_numeric(curso, errors='coerce').fillna(999),
+            'Cuatrimestre': cuatrimestre,
+            'Asignatura': asignatura,
+        })
+        return claves.sort_values(by=list(claves.columns)).index.to_numpy()
     except Exception as e:
         print(f"⚠️ No se pudo ordenar numéricamente, usando orden alfabético: {e}")
-        df_sorted = df.sort_values(by=[df.columns[9], df.columns[6]])
+        claves = pd.DataFrame({'Curso': curso, 'Asignatura': asignatura})
+        return claves.sort_values(by=list(claves.columns)).index.to_numpy()
 
-    # 2. CREAR DOCUMENTO
-    doc = Document()
+def ordenar_por_curso(df, esquema=None):
+    """Ordena por Curso (numérico si se puede) -> Cuatrimestre -> Asignatura."""
+    return df.iloc[orden_por_curso(df, esquema)]
+
+def _trozos_informe(df, filas_por_trozo=FILAS_POR_TROZO):
+    """
+    Recorre el subgrupo en el orden del documento, en trozos de filas_por_trozo
+    filas, y devuelve para cada trozo (col, textos_tasa) con sus columnas ya en
+    texto. Solo el orden se calcula para todo el subgrupo, así la memoria de
+    trabajo depende del tamaño del trozo y no del número de asignaturas.
+    """
     
-    # Portada General
-    titulo_principal = doc.add_heading('INFORME DE CALIDAD DOCENTE', 0)
-    titulo_principal.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    doc.add_paragraph(f"Total de asignaturas procesadas: {len(df)}").alignment = WD_ALIGN_PARAGRAPH.CENTER
-    doc.add_page_break()
-
-    # 3. BUCLE DE GENERACIÓN
-    for index, row in df_sorted.iterrows():
-        
-        # --- ENCABEZADO DE ASIGNATURA ---
-        asignatura = safe_get(row, 6)
-        profesor = safe_get(row, 4)
-        curso = safe_get(row, 9)
-        
-        h1 = doc.add_heading(asignatura, level=1)
-        h1.style.font.color.rgb = RGBColor(0, 0, 0)
-        
-        p_meta = doc.add_paragraph()
-        p_meta.add_run(f"Curso: {curso} | Cuatrimestre: {safe_get(row, 10)}").bold = True
-        p_meta.add_run(f"\nProfesor/a: {profesor}")
-        p_meta.add_run(f"\nTitulación: {safe_get(row, 5)}")
+    # 1. ORDENAR DATOS (solo las posiciones; resueltas una vez por cabecera)
+    esquema = resolver_esquema(df.columns)
+    orden = orden_por_curso(df, esquema)
+
+    faltan = esquema.faltan(CAMPOS_INFORME)
+    if faltan:
+        print(f"⚠️ Campos no presentes en el subgrupo (se mostrarán como N/A): {', '.join(faltan)}")
+
+    # 2. PRE-PASADA VECTORIZADA POR TROZOS: las columnas del trozo a listas de texto
+    for inicio in range(0, len(orden), filas_por_trozo):
+        trozo = df.iloc[orden[inicio:inicio + filas_por_trozo]]
+        col = esquema.textos(trozo, CAMPOS_INFORME)
+        tasas = calcular_tasas_exito(col['aprobados'], col['matriculados'])
+        textos_tasa = [
+            f"Tasa Éxito: {t:.1f}%" if not np.isnan(t) else "Tasa Éxito: N/A"
+            for t in tasas
+        ]
+        yield col, textos_tasa
+
+def _bloques_portada(n_asignaturas):
+    """Portada General."""
+    return [
+        ("titulo", 'INFORME DE CALIDAD DOCENTE', 0, True),
+        ("parrafo", f"Total de asignaturas procesadas: {n_asignaturas}", True),
+        ("salto",),
+    ]
+
+def _bloques_asignatura(col, textos_tasa, i, ultima):
+    """Sección de la asignatura i (la última no termina en salto de página)."""
+    bloques = []
 
-        doc.add_paragraph("_" * 50).alignment = WD_ALIGN_PARAGRAPH.CENTER 
+    # --- ENCABEZADO DE ASIGNATURA ---
+    bloques.append(("titulo", col['asignatura'][i], 1, False))
+    bloques.append(("runs", [
+        (f"Curso: {col['curso'][i]} | Cuatrimestre: {col['cuatrimestre'][i]}", True),
+        (f"\nProfesor/a: {col['profesor'][i]}", False),
+        (f"\nTitulación: {col['titulacion'][i]}", False),
+    ]))
+    bloques.append(("parrafo", "_" * 50, True))
 
-        # --- SECCIÓN 1: DATOS CUANTITATIVOS ---
-        doc.add_heading('1. Datos Cuantitativos', level=2)
-        matriculados = safe_get(row, 8)
-        aprobados = safe_get(row, 7)
+    # --- SECCIÓN 1: DATOS CUANTITATIVOS ---
+    bloques.append(("titulo", '1. Datos Cuantitativos', 2, False))
+    bloques.append(("tabla", [
+        f"Matriculados: {col['matriculados'][i]}",
+        f"Aprobados: {col['aprobados'][i]}",
+        textos_tasa[i],
+    ]))
+    bloques.append(("vacio",))
+
+    # --- SECCIÓN 2: RESULTADOS ---
+    bloques.append(("titulo", '2. Análisis de Resultados', 2, False))
+    bloques.append(("qa", "Valoración (1-5):", col['valoracion'][i]))
+    bloques.append(("qa", "Justificación / Acciones:", col['justificacion'][i]))
+    
+    if "sí" in col['deficiencias'][i].lower():
+        bloques.append(("qa", "Deficiencias previas:", col['detalle_deficiencias'][i]))
+
+    # --- SECCIÓN 3: DOCENCIA ---
+    bloques.append(("titulo", '3. Docencia e Incidencias', 2, False))
+    temario = col['temario'][i]
+    bloques.append(("qa", "¿Temario completo?:", temario))
+    if "no" in temario.lower():
+        bloques.append(("qa", "Causa:", col['causa_temario'][i]))
         
-        table = doc.add_table(rows=1, cols=3)
+    bloques.append(("qa", "Incidencias / Problemas:", f"{col['incidencias'][i]}\n{col['problemas'][i]}"))
+    detalles = col['detalles'][i]
+    if detalles != TEXTO_NO_INDICADO:
+        bloques.append(("qa", "Detalles adicionales:", detalles))
+
+    # --- SECCIÓN 4: COORDINACIÓN Y GRUPO ---
+    bloques.append(("titulo", '4. Grupo y Coordinación', 2, False))
+    bloques.append(("qa", "Características Grupo:", col['caracteristicas_grupo'][i]))
+    bloques.append(("qa", "Satisfacción Grupo:", col['satisfaccion'][i]))
+    bloques.append(("qa", "Coordinación:", col['coordinacion'][i]))
+
+    # --- SECCIÓN 5: CIERRE ---
+    bloques.append(("titulo", '5. Cierre', 2, False))
+    bloques.append(("qa", "Otras incidencias:", col['otras_incidencias'][i]))
+    bloques.append(("qa", "Sugerencias:", col['sugerencias'][i]))
+
+    if not ultima:
+        bloques.append(("salto",))
+
+    return bloques
+
+def secciones_documento(df):
+    """
+    Maquetación del informe, independiente del formato de salida.
+
+    Genera una lista de bloques por sección (primero la portada, después una por
+    asignatura). Cada bloque es una tupla cuyo primer elemento es su tipo:
+        ("titulo", texto, nivel, centrado)   ("parrafo", texto, centrado)
+        ("runs", [(texto, negrita), ...])    ("tabla", [texto, ...])
+        ("qa", pregunta, respuesta)          ("vacio",)   ("salto",)
+    """
+    yield _bloques_portada(len(df))
+
+    # 3. UNA SECCIÓN POR ASIGNATURA
+    n_filas = len(df)
+    hechas = 0
+    for col, textos_tasa in _trozos_informe(df):
+        for i in range(len(textos_tasa)):
+            hechas += 1
+            yield _bloques_asignatura(col, textos_tasa, i, hechas == n_filas)
+
+def nuevo_documento_base():
+    """Documento vacío con los estilos del informe ya configurados."""
+    doc = Document()
+    doc.styles['Heading 1'].font.color.rgb = RGBColor(0, 0, 0)
+    return doc
+
+def add_bloque_docx(doc, bloque, ids_titulo):
+    """Añade un bloque de secciones_documento() a un documento python-docx."""
+    tipo = bloque[0]
+
+    if tipo == "titulo":
+        _, texto, nivel, centrado = bloque
+        p = add_heading_rapido(doc, texto, ids_titulo[nivel])
+        if centrado: p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    elif tipo == "parrafo":
+        _, texto, centrado = bloque
+        p = doc.add_paragraph(texto)
+        if centrado: p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    elif tipo == "runs":
+        p = doc.add_paragraph()
+        for texto, negrita in bloque[1]:
+            run = p.add_run(texto)
+            if negrita: run.bold = True
+    elif tipo == "tabla":
+        textos = bloque[1]
+        table = doc.add_table(rows=1, cols=len(textos))
         table.autofit = True
         cells = table.rows[0].cells
-        cells[0].text = f"Matriculados: {matriculados}"
-        cells[1].text = f"Aprobados: {aprobados}"
-        
-        try:
-            pct = (float(aprobados) / float(matriculados)) * 100
-            cells[2].text = f"Tasa Éxito: {pct:.1f}%"
-        except:
-            cells[2].text = "Tasa Éxito: N/A"
-            
+        for c, texto in zip(cells, textos):
+            c.text = texto
         for c in cells:
             if c.paragraphs: c.paragraphs[0].runs[0].bold = True
-
+    elif tipo == "qa":
+        add_qa_bloque(doc, bloque[1], bloque[2])
+    elif tipo == "vacio":
         doc.add_paragraph()
+    elif tipo == "salto":
+        doc.add_page_break()
 
-        # --- SECCIÓN 2: RESULTADOS ---
-        doc.add_heading('2. Análisis de Resultados', level=2)
-        add_qa_bloque(doc, "Valoración (1-5):", safe_get(row, 12))
-        add_qa_bloque(doc, "Justificación / Acciones:", safe_get(row, 13))
-        
-        if "sí" in safe_get(row, 14).lower():
-            add_qa_bloque(doc, "Deficiencias previas:", safe_get(row, 15))
-
-        # --- SECCIÓN 3: DOCENCIA ---
-        doc.add_heading('3. Docencia e Incidencias', level=2)
-        temario = safe_get(row, 18)
-        add_qa_bloque(doc, "¿Temario completo?:", temario)
-        if "no" in temario.lower():
-            add_qa_bloque(doc, "Causa:", safe_get(row, 19))
-            
-        add_qa_bloque(doc, "Incidencias / Problemas:", f"{safe_get(row, 20)}\n{safe_get(row, 21)}")
-        detalles = safe_get(row, 22)
-        if detalles != "No indicado / No aplica":
-            add_qa_bloque(doc, "Detalles adicionales:", detalles)
-
-        # --- SECCIÓN 4: COORDINACIÓN Y GRUPO ---
-        doc.add_heading('4. Grupo y Coordinación', level=2)
-        add_qa_bloque(doc, "Características Grupo:", safe_get(row, 23))
-        add_qa_bloque(doc, "Satisfacción Grupo:", safe_get(row, 24))
-        add_qa_bloque(doc, "Coordinación:", safe_get(row, 30))
-
-        # --- SECCIÓN 5: CIERRE ---
-        doc.add_heading('5. Cierre', level=2)
-        add_qa_bloque(doc, "Otras incidencias:", safe_get(row, 33))
-        add_qa_bloque(doc, "Sugerencias:", safe_get(row, 34))
-
-        if index != df_sorted.index[-1]:
-            doc.add_page_break()
-
-    # 4. GUARDAR EN MEMORIA (MODIFICADO)
+@instrumentar()
+def generar_partes_docentes(df):
+    """
+    Genera un documento Word en memoria con todas las asignaturas.
+    Retorna un objeto BytesIO listo para descargar.
+    """
+    doc = nuevo_documento_base()
+
+    # Estilos resueltos una sola vez, no por fila
+    ids_titulo = {nivel: doc.styles[nombre].style_id for nivel, nombre in ESTILOS_TITULO.items()}
+
+    # Documento auxiliar donde se construye cada sección (ver volcar_contenido)
+    doc_trabajo = Document()
+
+    for bloques in secciones_documento(df):
+        for bloque in bloques:
+            add_bloque_docx(doc_trabajo, bloque, ids_titulo)
+        volcar_contenido(doc_trabajo, doc)
+
+    # GUARDAR EN MEMORIA (MODIFICADO)
     buffer = io.BytesIO()
     doc.save(buffer)
     buffer.seek(0)
     print("✅ Documento generado en memoria.")
     return buffer
+
+# --- ESCRITURA EN STREAMING (MEMORIA ACOTADA) ---
+
+# Caracteres no admitidos en XML 1.0 (python-docx fallaría con ellos)
+_RE_CONTROL_XML = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+_RE_SEPARADORES_RUN = re.compile(r'(\t|\r|\n)')
+
+# Formato de los bloques QA (mismo XML que generan add_qa_bloque y python-docx)
+_RPR_PREGUNTA = '<w:rPr><w:b/><w:color w:val="003366"/><w:sz w:val="22"/></w:rPr>'
+_RPR_SIN_RESPUESTA = '<w:rPr><w:i/><w:sz w:val="20"/></w:rPr>'
+_PPR_RESPUESTA = '<w:pPr><w:spacing w:after="160"/><w:ind w:left="288"/></w:pPr>'
+
+def _xml_contenido_run(texto):
+    """Contenido de un <w:r>: tabuladores y saltos de línea como hace python-docx."""
+    partes = []
+    for trozo in _RE_SEPARADORES_RUN.split(_RE_CONTROL_XML.sub('', texto)):
+        if trozo == '\t':
+            partes.append('<w:tab/>')
+        elif trozo in ('\r', '\n'):
+            partes.append('<w:br/>')
+        elif trozo:
+            espacio = ' xml:space="preserve"' if len(trozo.strip()) < len(trozo) else ''
+            partes.append(f'<w:t{espacio}>{escape(trozo)}</w:t>')
+    return ''.join(partes)
+
+def _xml_run(texto, rpr=''):
+    return f'<w:r>{rpr}{_xml_contenido_run(texto)}</w:r>' if texto else ''
+
+def _xml_parrafo(texto, estilo_id=None, centrado=False):
+    ppr = ''
+    if estilo_id: ppr += f'<w:pStyle w:val="{estilo_id}"/>'
+    if centrado: ppr += '<w:jc w:val="center"/>'
+    if ppr: ppr = f'<w:pPr>{ppr}</w:pPr>'
+    return f'<w:p>{ppr}{_xml_run(texto)}</w:p>'
+
+def _xml_bloque(bloque, ids_titulo, ancho_tabla):
+    """Serializa un bloque de secciones_documento() a WordprocessingML."""
+    tipo = bloque[0]
+
+    if tipo == "titulo":
+        _, texto, nivel, centrado = bloque
+        return _xml_parrafo(texto, ids_titulo[nivel], centrado)
+    if tipo == "parrafo":
+        _, texto, centrado = bloque
+        return _xml_parrafo(texto, centrado=centrado)
+    if tipo == "runs":
+        runs = ''.join(_xml_run(texto, '<w:rPr><w:b/></w:rPr>' if negrita else '') for texto, negrita in bloque[1])
+        return f'<w:p>{runs}</w:p>'
+    if tipo == "tabla":
+        textos = bloque[1]
+        ancho = Emu(ancho_tabla // len(textos)).twips
+        rejilla = ''.join(f'<w:gridCol w:w="{ancho}"/>' for _ in textos)
+        celdas = ''.join(
+            f'<w:tc><w:tcPr><w:tcW w:type="dxa" w:w="{ancho}"/></w:tcPr>'
+            f'<w:p>{_xml_run(texto, "<w:rPr><w:b/></w:rPr>")}</w:p></w:tc>'
+            for texto in textos
+        )
+        return (
+            '<w:tbl><w:tblPr><w:tblW w:type="auto" w:w="0"/><w:tblLayout w:type="autofit"/>'
+            '<w:tblLook w:firstColumn="1" w:firstRow="1" w:lastColumn="0" w:lastRow="0" '
+            'w:noHBand="0" w:noVBand="1" w:val="04A0"/></w:tblPr>'
+            f'<w:tblGrid>{rejilla}</w:tblGrid><w:tr>{celdas}</w:tr></w:tbl>'
+        )
+    if tipo == "qa":
+        _, pregunta, respuesta = bloque
+        xml = f'<w:p>{_xml_run(pregunta, _RPR_PREGUNTA)}</w:p>'
+        if respuesta and respuesta != "No indicado / No aplica":
+            return xml + f'<w:p>{_PPR_RESPUESTA}{_xml_run(respuesta)}</w:p>'
+        return xml + f'<w:p>{_PPR_RESPUESTA}{_xml_run("Sin comentarios / No aplica.", _RPR_SIN_RESPUESTA)}</w:p>'
+    if tipo == "vacio":
+        return '<w:p/>'
+    if tipo == "salto":
+        return '<w:p><w:r><w:br w:type="page"/></w:r></w:p>'
+    raise ValueError(f"Tipo de bloque desconocido: {tipo}")
+
+@functools.lru_cache(maxsize=1)
+def _paquete_base():
+    """
+    Partes del .docx vacío (estilos, relaciones, tema...) y el document.xml
+    partido en cabecera (hasta <w:body>) y cola (desde <w:sectPr>).
+    """
+    doc = nuevo_documento_base()
+    ids_titulo = {nivel: doc.styles[nombre].style_id for nivel, nombre in ESTILOS_TITULO.items()}
+    seccion = doc.sections[0]
+    ancho_tabla = seccion.page_width - seccion.left_margin - seccion.right_margin  # EMU
+
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    with zipfile.ZipFile(buffer) as zin:
+        partes = [(info, zin.read(info.filename)) for info in zin.infolist()]
+
+    xml_doc = dict((info.filename, datos) for info, datos in partes)[PARTE_DOCUMENTO].decode('utf-8')
+    inicio_body = xml_doc.index('<w:body>') + len('<w:body>')
+    inicio_sect = xml_doc.index('<w:sectPr', inicio_body)
+
+    return partes, xml_doc[:inicio_body], xml_doc[inicio_sect:], ids_titulo, ancho_tabla
+
+@instrumentar()
+def generar_partes_docentes_stream(df, destino, progreso=None):
+    """
+    Variante de generar_partes_docentes que escribe el .docx de forma
+    incremental: word/document.xml se va volcando al zip sección a sección,
+    sin construir el árbol DOM completo. El pico de memoria no depende del
+    número de asignaturas: los textos se preparan en trozos de FILAS_POR_TROZO
+    filas y la caché de secciones está acotada a MAX_BYTES_CACHE_SECCIONES.
+
+    Args:
+        df: DataFrame del subgrupo.
+        destino: Ruta del fichero o stream binario de escritura.
+        progreso: (Opcional) función progreso(hechas, total), llamada tras
+            escribir cada asignatura.
+    """
+    partes, cabecera, cola, ids_titulo, ancho_tabla = _paquete_base()
+
+    def serializar(bloques):
+        return ''.join(_xml_bloque(b, ids_titulo, ancho_tabla) for b in bloques).encode('utf-8')
+
+    with zipfile.ZipFile(destino, 'w', compression=zipfile.ZIP_DEFLATED) as zout:
+        for info, datos in partes:
+            if info.filename == PARTE_DOCUMENTO:
+                # El documento se escribe en su posición, en streaming
+                with zout.open(PARTE_DOCUMENTO, 'w') as f:
+                    f.write(cabecera.encode('utf-8'))
+                    f.write(serializar(_bloques_portada(len(df))))
+
+                    n_filas = len(df)
+                    hechas = 0
+                    for col, textos_tasa in _trozos_informe(df):
+                        for i in range(len(textos_tasa)):
+                            # Cada sección depende solo de los textos de su fila: si ya se
+                            # generó (p.ej. con un rango de fechas más corto), se reutiliza
+                            hechas += 1
+                            ultima = hechas == n_filas
+                            clave = _huella_seccion((ultima,) + tuple(col[c][i] for c in CAMPOS_INFORME))
+                            xml = _seccion_cacheada(clave)
+                            if xml is None:
+                                xml = serializar(_bloques_asignatura(col, textos_tasa, i, ultima))
+                                _guardar_seccion(clave, xml)
+                            f.write(xml)
+                            if progreso:
+                                progreso(hechas, n_filas)
+                    f.write(cola.encode('utf-8'))
+            else:
+                zout.writestr(info.filename, datos, compress_type=zipfile.ZIP_DEFLATED)
+
+    print("✅ Documento generado en streaming.")
+    return destino
+
+def _huella_seccion(textos):
+    """
+    Clave de tamaño fijo de una sección: los textos completos ocuparían tanto
+    como el XML y no entrarían en MAX_BYTES_CACHE_SECCIONES.
+    """
+    return hashlib.blake2b(repr(textos).encode('utf-8'), digest_size=16).digest()
+
+def _seccion_cacheada(clave):
+    """XML de una sección ya generada (None si no está en la caché)."""
+    with _lock_secciones:
+        xml = _cache_secciones.get(clave)
+        if xml is not None:
+            _cache_secciones.move_to_end(clave)
+        return xml
+
+def _guardar_seccion(clave, xml):
+    """Guarda el XML de una sección y expulsa las más antiguas hasta volver al límite de bytes."""
+    global _bytes_cache_secciones
+    if len(xml) > MAX_BYTES_CACHE_SECCIONES:
+        return
+    with _lock_secciones:
+        anterior = _cache_secciones.pop(clave, None)
+        if anterior is not None:
+            _bytes_cache_secciones -= len(anterior)
+        _cache_secciones[clave] = xml
+        _bytes_cache_secciones += len(xml)
+        while _bytes_cache_secciones > MAX_BYTES_CACHE_SECCIONES:
+            _, expulsada = _cache_secciones.popitem(last=False)
+            _bytes_cache_secciones -= len(expulsada)
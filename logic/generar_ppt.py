@@ -1,40 +1,133 @@
+import functools
+import hashlib
 import io
 import json
+import math
+import os
+import re
+import threading
 import pandas as pd
 from pptx import Presentation
+from pptx.chart.data import CategoryChartData
+from pptx.enum.chart import XL_CHART_TYPE, XL_LEGEND_POSITION
 from pptx.util import Inches, Pt
 from pptx.enum.text import PP_ALIGN
 from pptx.dml.color import RGBColor
+from pptx.enum.shapes import MSO_SHAPE_TYPE
+from pptx.oxml import parse_xml
+from pptx.oxml.ns import nsdecls, qn
+from pptx.oxml.xmlchemy import OxmlElement
+from logic.config import FILAS_TABLA_PPT
+from logic.instrumentacion import instrumentar
+from logic.preparar_datos_graficas import preparar_datos_graficas
+
+# Plantilla corporativa (ruta absoluta, independiente del directorio de trabajo)
+RUTA_PLANTILLA = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "assets", "Plantilla_ReunionesCoordinacionFinCuatrimestre.pptx"
+)
+
+# Caché en memoria de los bytes de la plantilla (se invalida si cambia su mtime)
+_cache_plantilla = {"ruta": None, "mtime": None, "contenido": None, "indice": None}
+_lock_plantilla = threading.Lock()
+estadisticas_plantilla = {"aciertos": 0, "fallos": 0}
+
+def cargar_plantilla(ruta=RUTA_PLANTILLA):
+    """
+    Devuelve una Presentation nueva de la plantilla sin volver a leer el disco.
+
+    Los bytes se leen una vez por proceso y se reutilizan mientras el mtime del
+    fichero no cambie. Cada llamada obtiene su propia copia editable.
+    Los aciertos/fallos quedan en estadisticas_plantilla.
+    """
+    mtime = os.path.getmtime(ruta)
+
+    with _lock_plantilla:
+        if _cache_plantilla["ruta"] == ruta and _cache_plantilla["mtime"] == mtime:
+            estadisticas_plantilla["aciertos"] += 1
+        else:
+            estadisticas_plantilla["fallos"] += 1
+            with open(ruta, "rb") as f:
+                _cache_plantilla.update(ruta=ruta, mtime=mtime, contenido=f.read(), indice=None)
+        contenido = _cache_plantilla["contenido"]
+
+    return Presentation(io.BytesIO(contenido))
+
+# --- TABLAS (XML EN BLOQUE, PAGINADAS) ---
+
+# Plantillas de celda ya con estilo: centrado, cabecera en negrita 9pt sobre gris
+# y cuerpo en 8pt (lo mismo que los setters de python-pptx, sin una llamada por celda)
+_CELDA_CABECERA = (
+    '<a:tc><a:txBody><a:bodyPr/><a:lstStyle/><a:p><a:pPr algn="ctr"><a:defRPr b="1" sz="900"/></a:pPr>'
+    '<a:r><a:t>{}</a:t></a:r></a:p></a:txBody>'
+    '<a:tcPr><a:solidFill><a:srgbClr val="DCDCDC"/></a:solidFill></a:tcPr></a:tc>'
+)
+_CELDA_CUERPO = (
+    '<a:tc><a:txBody><a:bodyPr/><a:lstStyle/><a:p><a:pPr algn="ctr"><a:defRPr sz="800"/></a:pPr>'
+    '<a:r><a:t>{}</a:t></a:r></a:p></a:txBody><a:tcPr/></a:tc>'
+)
+
+# Caracteres de control no admitidos en XML (salvo tabulador y saltos de línea)
+RE_CONTROL_XML = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+def _texto_celda(valor):
+    """Texto de la celda (floats con 2 decimales) escapado para XML."""
+    texto = f"{valor:.2f}" if isinstance(valor, float) else str(valor)
+    texto = texto.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+    return RE_CONTROL_XML.sub("", texto)
 
 def df_to_ppt_table(slide, df, left, top, width, height):
-    """Dibuja la tabla en la slide indicada."""
-    # Limitamos filas para que no se salga de la diapo
-    df_to_print = df.head(12) 
-    rows, cols = df_to_print.shape
-    
-    table_shape = slide.shapes.add_table(rows + 1, cols, left, top, width, height)
-    table = table_shape.table
-
-    # Estilos básicos cabecera
-    for col_idx, col_name in enumerate(df_to_print.columns):
-        cell = table.cell(0, col_idx)
-        cell.text = str(col_name)
-        p = cell.text_frame.paragraphs[0]
-        p.font.bold = True
-        p.font.size = Pt(9)
-        p.alignment = PP_ALIGN.CENTER
-        cell.fill.solid()
-        cell.fill.fore_color.rgb = RGBColor(220, 220, 220)
-
-    # Cuerpo de la tabla
-    for row_idx, row in df_to_print.iterrows():
-        for col_idx, value in enumerate(row):
-            cell = table.cell(row_idx + 1, col_idx)
-            val_str = f"{value:.2f}" if isinstance(value, float) else str(value)
-            cell.text = val_str
-            p = cell.text_frame.paragraphs[0]
-            p.font.size = Pt(8)
-            p.alignment = PP_ALIGN.CENTER
+    """
+    Dibuja la tabla completa (cabecera + todas las filas de df) en la slide indicada.
+
+    La forma se crea con una sola fila y se le añaden todas las filas como un
+    bloque XML generado a partir de las plantillas de celda.
+    """
+    n_filas = len(df) + 1
+    n_cols = df.shape[1]
+
+    table_shape = slide.shapes.add_table(1, n_cols, left, top, width, height)
+    tbl = table_shape._element.graphic.graphicData.tbl
+    tbl.remove(tbl.tr_lst[0])
+
+    # Textos por columna (una pasada por columna, no un setter por celda)
+    columnas = [[_texto_celda(v) for v in df.iloc[:, j].tolist()] for j in range(n_cols)]
+
+    # Mismo reparto que python-pptx: alto entero por fila y el resto en la última
+    alto = height // n_filas
+    altos = [alto] * (n_filas - 1) + [height - alto * (n_filas - 1)]
+
+    partes = [f'<a:tr h="{altos[0]}">']
+    partes.extend(_CELDA_CABECERA.format(_texto_celda(str(c))) for c in df.columns)
+    partes.append("</a:tr>")
+    for alto_fila, fila in zip(altos[1:], zip(*columnas)):
+        partes.append(f'<a:tr h="{alto_fila}">')
+        partes.extend(_CELDA_CUERPO.format(texto) for texto in fila)
+        partes.append("</a:tr>")
+
+    filas_xml = parse_xml(f'<a:tbl {nsdecls("a")}>{"".join(partes)}</a:tbl>')
+    tbl.extend(list(filas_xml))
+    return table_shape
+
+def agregar_tablas_paginadas(prs, layout, df, titulo, left, top, width, alto_fila,
+                             filas_por_diapositiva=FILAS_TABLA_PPT):
+    """
+    Reparte df en tantas diapositivas como hagan falta (filas_por_diapositiva
+    filas en cada una, con la cabecera repetida). Devuelve las diapositivas.
+    """
+    filas_por_diapositiva = max(1, filas_por_diapositiva)
+    n_paginas = max(1, math.ceil(len(df) / filas_por_diapositiva))
+
+    diapositivas = []
+    for pagina in range(n_paginas):
+        trozo = df.iloc[pagina * filas_por_diapositiva:(pagina + 1) * filas_por_diapositiva]
+        slide = prs.slides.add_slide(layout)
+        if slide.shapes.title:
+            slide.shapes.title.text = titulo if n_paginas == 1 else f"{titulo} ({pagina + 1}/{n_paginas})"
+        df_to_ppt_table(slide, trozo, left, top, width, alto_fila * (len(trozo) + 1))
+        diapositivas.append(slide)
+
+    return diapositivas
 
 def agregar_placeholder_ia(slide, texto_marcador):
     """Añade un cuadro de texto visual indicando dónde irá la IA."""
@@ -51,45 +144,302 @@ def agregar_placeholder_ia(slide, texto_marcador):
     p.font.italic = True
     p.alignment = PP_ALIGN.CENTER
 
-def reemplazar_marcadores(prs, diccionario_datos):
+# --- GRÁFICAS NATIVAS (editables en PowerPoint, sin Matplotlib) ---
+
+# Modos de las diapositivas de gráficas: imágenes ya renderizadas o gráficos nativos
+MODO_IMAGEN = "imagen"
+MODO_NATIVO = "nativo"
+
+# Etiquetas del eje X giradas 45º (unidades de 1/60000 de grado)
+ROTACION_ETIQUETAS = "-2700000"
+
+def _hex_color(color):
+    """Tupla RGB (0-1) -> RGBColor."""
+    return RGBColor(*(round(c * 255) for c in color))
+
+def _valores_grafica(valores):
+    """Floats del array para CategoryChartData (None donde no hay dato)."""
+    return [None if pd.isna(v) else round(float(v), 2) for v in valores]
+
+def _es_svg(contenido):
+    """True si los bytes son una imagen SVG (XML)."""
+    inicio = contenido[:256].lstrip()
+    return inicio.startswith(b"<svg") or (inicio.startswith(b"<?xml") and b"<svg" in contenido[:1024])
+
+def agregar_grafica_nativa(slide, spec, left, top, width, height):
+    """
+    Dibuja en la slide un gráfico de barras nativo a partir de una
+    especificación de preparar_datos_graficas (mismos datos, orden y colores
+    que la versión Matplotlib).
+
+    Las globales llevan una serie por curso (barras superpuestas, así cada
+    asignatura conserva el color de su curso y la leyenda muestra los cursos)
+    y la media como línea discontinua roja.
+    """
+    cfg = spec["cfg"]
+    datos = spec["datos"]
+    asignaturas = [str(a) for a in datos["asignaturas"]]
+    valores = _valores_grafica(datos["valores"])
+
+    chart_data = CategoryChartData()
+    chart_data.categories = asignaturas
+
+    if spec["palette"]:
+        colores = list(spec["palette"].items())
+        cursos = [str(c) for c in datos["cursos"]]
+        for curso, _ in colores:
+            chart_data.add_series(curso, [v if c == curso else None for v, c in zip(valores, cursos)])
+    else:
+        colores = [(cfg["col"], spec["color"])]
+        chart_data.add_series(cfg["col"], valores)
+
+    if spec["media"] is not None:
+        chart_data.add_series(f"Media: {spec['media']:.2f}", [round(float(spec["media"]), 2)] * len(asignaturas))
+
+    chart = slide.shapes.add_chart(
+        XL_CHART_TYPE.COLUMN_CLUSTERED, left, top, width, height, chart_data
+    ).chart
+
+    # Barras: un color por serie y sin separación entre series (no se desplazan)
+    plot = chart.plots[0]
+    plot.overlap = 100
+    plot.gap_width = 50
+    for serie, (_, color) in zip(plot.series, colores):
+        serie.format.fill.solid()
+        serie.format.fill.fore_color.rgb = _hex_color(color)
+
+    if spec["media"] is not None:
+        _serie_como_linea_media(chart)
+
+    # Título, ejes y leyenda
+    chart.has_title = True
+    chart.chart_title.text_frame.text = spec["titulo_grafica"]
+    chart.chart_title.text_frame.paragraphs[0].font.size = Pt(16)
+
+    eje_y = chart.value_axis
+    eje_y.minimum_scale, eje_y.maximum_scale = cfg["ylim"]
+    eje_y.has_title = True
+    eje_y.axis_title.text_frame.text = cfg["ylabel"]
+
+    eje_x = chart.category_axis
+    eje_x.has_title = True
+    eje_x.axis_title.text_frame.text = "Asignatura"
+    eje_x.tick_labels.font.size = Pt(8)
+    eje_x._element.get_or_add_txPr().bodyPr.set("rot", ROTACION_ETIQUETAS)
+
+    chart.has_legend = bool(spec["palette"]) or spec["media"] is not None
+    if chart.has_legend:
+        chart.legend.position = XL_LEGEND_POSITION.RIGHT
+        chart.legend.include_in_layout = False
+
+    return chart
+
+def _serie_como_linea_media(chart):
+    """
+    Pasa la última serie del gráfico de barras a un lineChart sobre los mismos
+    ejes. Sigue referenciando su columna de la hoja incrustada (editable).
+    """
+    plot_area = chart._chartSpace.plotArea
+    bar_chart = plot_area.find(qn("c:barChart"))
+    serie = bar_chart.findall(qn("c:ser"))[-1]
+    bar_chart.remove(serie)
+
+    invertir = serie.find(qn("c:invertIfNegative"))
+    if invertir is not None:
+        serie.remove(invertir)
+
+    # spPr y marker van justo tras c:tx (orden del esquema de c:ser de línea)
+    sp_pr = serie.find(qn("c:spPr"))
+    if sp_pr is not None:
+        serie.remove(sp_pr)
+    sp_pr = parse_xml(
+        f'<c:spPr {nsdecls("c", "a")}><a:ln w="25400"><a:solidFill><a:srgbClr val="FF0000"/>'
+        '</a:solidFill><a:prstDash val="dash"/></a:ln></c:spPr>'
+    )
+    marcador = parse_xml(f'<c:marker {nsdecls("c")}><c:symbol val="none"/></c:marker>')
+    serie.find(qn("c:tx")).addnext(sp_pr)
+    sp_pr.addnext(marcador)
+    serie.append(_elemento("c:smooth", "0"))
+
+    line_chart = OxmlElement("c:lineChart")
+    line_chart.append(_elemento("c:grouping", "standard"))
+    line_chart.append(_elemento("c:varyColors", "0"))
+    line_chart.append(serie)
+    line_chart.append(_elemento("c:marker", "1"))
+    for eje in bar_chart.findall(qn("c:axId")):
+        line_chart.append(_elemento("c:axId", eje.get("val")))
+    bar_chart.addnext(line_chart)
+
+def _elemento(etiqueta, valor):
+    """Elemento <c:xxx val="..."/>."""
+    elemento = OxmlElement(etiqueta)
+    elemento.set("val", valor)
+    return elemento
+
+# --- MOTOR DE SUSTITUCIÓN DE MARCADORES ---
+
+# Cualquier marcador {{...}} (para detectar los que quedan sin sustituir)
+RE_MARCADOR = re.compile(r"\{\{[^{}]*\}\}")
+
+@functools.lru_cache(maxsize=32)
+def _compilar_patron(claves):
+    """Una única expresión regular con todas las claves (las largas primero)."""
+    return re.compile("|".join(re.escape(c) for c in sorted(claves, key=len, reverse=True)))
+
+def _marcos_de_texto(shapes, ruta=()):
+    """Recorre formas (incluidos grupos y tablas): (ruta_forma, celda, text_frame)."""
+    for i, shape in enumerate(shapes):
+        ruta_shape = ruta + (i,)
+        if shape.shape_type == MSO_SHAPE_TYPE.GROUP:
+            yield from _marcos_de_texto(shape.shapes, ruta_shape)
+            continue
+        if shape.has_text_frame:
+            yield ruta_shape, None, shape.text_frame
+        if getattr(shape, "has_table", False) and shape.has_table:
+            for r, row in enumerate(shape.table.rows):
+                for c, cell in enumerate(row.cells):
+                    yield ruta_shape, (r, c), cell.text_frame
+
+def indexar_marcadores(prs):
+    """
+    Pre-índice de los párrafos que contienen "{{" (en cualquier run): lista de
+    localizadores (diapositiva, ruta_forma, celda, párrafo). Se calcula una vez
+    por plantilla y se reutiliza en cada presentación generada a partir de ella.
+    """
+    indice = []
+    for s, slide in enumerate(prs.slides):
+        for ruta_shape, celda, text_frame in _marcos_de_texto(slide.shapes):
+            for p, paragraph in enumerate(text_frame.paragraphs):
+                if "{{" in "".join(r.text for r in paragraph.runs):
+                    indice.append((s, ruta_shape, celda, p))
+    return indice
+
+def _resolver_parrafo(prs, localizador):
+    """Obtiene el párrafo de prs indicado por un localizador del índice."""
+    s, ruta_shape, celda, p = localizador
+    shape = prs.slides[s].shapes[ruta_shape[0]]
+    for i in ruta_shape[1:]:
+        shape = shape.shapes[i]
+    text_frame = shape.table.cell(*celda).text_frame if celda else shape.text_frame
+    return text_frame.paragraphs[p]
+
+def _segmentos_runs(paragraph):
+    """Grupos de runs consecutivos (un salto de línea o un campo cortan el grupo)."""
+    segmentos, actual = [], []
+    for hijo in paragraph._p:
+        if hijo.tag == qn("a:r"):
+            actual.append(hijo)
+        elif actual:
+            segmentos.append(actual)
+            actual = []
+    if actual:
+        segmentos.append(actual)
+    return segmentos
+
+def _sustituir_en_segmento(runs, patron, datos):
+    """
+    Sustituye marcadores aunque PowerPoint los haya partido en varios runs.
+    El valor queda en el run donde empieza el marcador (conserva su formato) y
+    los runs consumidos por completo se eliminan.
+    """
+    originales = [r.text for r in runs]
+    coincidencias = list(patron.finditer("".join(originales)))
+    if not coincidencias:
+        return
+
+    # Tramo [inicio, fin) de cada run dentro del texto del segmento
+    tramos = []
+    acumulado = 0
+    for t in originales:
+        tramos.append((acumulado, acumulado + len(t)))
+        acumulado += len(t)
+
+    def run_de(pos):
+        return next(k for k, (ini, fin) in enumerate(tramos) if ini <= pos < fin)
+
+    textos = list(originales)
+
+    # De atrás hacia delante para no invalidar las posiciones anteriores
+    for m in reversed(coincidencias):
+        i, j = run_de(m.start()), run_de(m.end() - 1)
+        off_i, off_j = m.start() - tramos[i][0], m.end() - tramos[j][0]
+        valor = str(datos[m.group(0)])
+        if i == j:
+            textos[i] = textos[i][:off_i] + valor + textos[i][off_j:]
+        else:
+            textos[i] = textos[i][:off_i] + valor
+            textos[j] = textos[j][off_j:]
+            for k in range(i + 1, j):
+                textos[k] = ""
+
+    for r, t_original, t_nuevo in zip(runs, originales, textos):
+        if t_nuevo == t_original:
+            continue
+        if t_nuevo == "" and r is not runs[0]:
+            r.getparent().remove(r)
+        else:
+            r.text = t_nuevo
+
+def reemplazar_marcadores(prs, diccionario_datos, indice=None):
     """
     Recorre TODA la presentación sustituyendo las claves del diccionario 
     por sus valores, manteniendo el estilo original.
+
+    Todas las claves se buscan a la vez con una expresión regular compilada y
+    solo se visitan los párrafos del pre-índice (ver indexar_marcadores).
+
+    Returns:
+        Lista ordenada de marcadores {{...}} que siguen en la presentación.
     """
-    if not diccionario_datos:
-        return
+    if indice is None:
+        indice = indexar_marcadores(prs)
+
+    patron = _compilar_patron(tuple(diccionario_datos)) if diccionario_datos else None
+    pendientes = set()
+
+    for localizador in indice:
+        paragraph = _resolver_parrafo(prs, localizador)
+        if patron is not None:
+            for segmento in _segmentos_runs(paragraph):
+                _sustituir_en_segmento(segmento, patron, diccionario_datos)
+        pendientes.update(RE_MARCADOR.findall("".join(r.text for r in paragraph.runs)))
+
+    return sorted(pendientes)
 
-    def sustituir_en_parrafo(paragraph, datos):
-        for run in paragraph.runs:
-            texto_run = run.text
-            for marcador, valor in datos.items():
-                if marcador in texto_run:
-                    run.text = texto_run.replace(marcador, str(valor))
-
-    for slide in prs.slides:
-        for shape in slide.shapes:
-            if shape.has_text_frame:
-                for paragraph in shape.text_frame.paragraphs:
-                    sustituir_en_parrafo(paragraph, diccionario_datos)
-            
-            if shape.has_table:
-                for row in shape.table.rows:
-                    for cell in row.cells:
-                        for paragraph in cell.text_frame.paragraphs:
-                            sustituir_en_parrafo(paragraph, diccionario_datos)
-
-def generar_ppt(df, lista_figuras, ruta_json=None):
+def indice_marcadores_plantilla(prs):
+    """Pre-índice de la plantilla cacheada (se calcula la primera vez)."""
+    with _lock_plantilla:
+        if _cache_plantilla["indice"] is None:
+            _cache_plantilla["indice"] = indexar_marcadores(prs)
+        return _cache_plantilla["indice"]
+
+@instrumentar()
+def generar_ppt(df, lista_figuras=None, ruta_json=None, progreso=None, modo_graficas=MODO_IMAGEN,
+                filas_tabla=FILAS_TABLA_PPT, destino=None):
     """
     Genera el PPT:
     1. Carga plantilla.
     2. Sustituye marcadores (si hay JSON).
     3. Añade NUEVAS slides para tablas, placeholders y gráficas.
+
+    lista_figuras admite tuplas (Titulo, Figura) o (Titulo, bytes PNG/JPEG).
+    Las imágenes SVG (que PowerPoint no admite aquí) se vuelven a generar en PNG.
+    modo_graficas: MODO_IMAGEN inserta lista_figuras; MODO_NATIVO ignora
+    lista_figuras y dibuja gráficos nativos (editables) a partir de df.
+    filas_tabla: Filas de la tabla resumen por diapositiva (se añaden las
+    diapositivas necesarias, con la cabecera repetida).
+    progreso: (Opcional) función progreso(hechas, total) llamada tras cada
+    diapositiva de gráfica y al guardar.
+    destino: (Opcional) Ruta o stream binario de escritura. Si se indica, la
+    presentación se guarda ahí (sin copia intermedia en memoria) y se devuelve
+    destino; si no, se devuelve un BytesIO.
     """
     
-    # 1. CARGAR PLANTILLA
-    ruta_plantilla = "assets/Plantilla_ReunionesCoordinacionFinCuatrimestre.pptx"
+    # 1. CARGAR PLANTILLA (desde la caché en memoria)
+    indice = None
     try:
-        prs = Presentation(ruta_plantilla)
+        prs = cargar_plantilla()
+        indice = indice_marcadores_plantilla(prs)
     except Exception as e:
         print(f"Error cargando plantilla: {e}")
         prs = Presentation()
@@ -99,7 +449,9 @@ def generar_ppt(df, lista_figuras, ruta_json=None):
         try:
             with open(ruta_json, 'r', encoding='utf-8') as f:
                 datos_diccionario = json.load(f)
-            reemplazar_marcadores(prs, datos_diccionario)
+            pendientes = reemplazar_marcadores(prs, datos_diccionario, indice)
+            if pendientes:
+                print(f"⚠️ Marcadores sin sustituir: {', '.join(pendientes)}")
         except Exception as e:
             print(f"Error cargando o procesando el archivo JSON: {e}")
 
@@ -108,12 +460,11 @@ def generar_ppt(df, lista_figuras, ruta_json=None):
     layout_index = 5 if len(prs.slide_layouts) > 5 else len(prs.slide_layouts) - 1
     layout_solo_titulo = prs.slide_layouts[layout_index]
 
-    # 3. AÑADIR NUEVA SLIDE PARA LA TABLA DATAFRAME
-    slide_tabla = prs.slides.add_slide(layout_solo_titulo)
-    if slide_tabla.shapes.title:
-        slide_tabla.shapes.title.text = "Resumen de Datos (Tabla)"
-    
-    df_to_ppt_table(slide_tabla, df, Inches(0.5), Inches(2), Inches(9), Inches(4))
+    # 3. AÑADIR SLIDES PARA LA TABLA DATAFRAME (todas las filas, paginadas)
+    agregar_tablas_paginadas(
+        prs, layout_solo_titulo, df, "Resumen de Datos (Tabla)",
+        Inches(0.5), Inches(2), Inches(9), Inches(4) // (filas_tabla + 1), filas_tabla
+    )
     
     # 4. AÑADIR NUEVAS SLIDES PARA PLACEHOLDERS IA
     # Docentes
@@ -135,23 +486,53 @@ def generar_ppt(df, lista_figuras, ruta_json=None):
     agregar_placeholder_ia(slide_ia_coord, "AQUÍ IRÁ LA INFO DE COORDINACIÓN")
 
     # 5. AÑADIR NUEVAS SLIDES PARA GRÁFICAS
-    for titulo_grafica, figura in lista_figuras:
+    if modo_graficas == MODO_NATIVO:
+        graficas = [(spec["titulo"], spec) for spec in preparar_datos_graficas(df)]
+    else:
+        graficas = lista_figuras or []
+        if any(isinstance(figura, bytes) and _es_svg(figura) for _, figura in graficas):
+            # Import diferido: el modo nativo no debe cargar Matplotlib
+            from logic.genera_graficas import renderizar_graficas
+            print("⚠️ El PPT no admite SVG: las gráficas se incrustan en PNG.")
+            graficas = renderizar_graficas(df, formato="png")
+
+    # Huellas de las imágenes: python-pptx guarda una sola vez cada contenido repetido
+    huellas = set()
+    total_pasos = len(graficas) + 1
+    for paso, (titulo_grafica, figura) in enumerate(graficas, start=1):
         slide_grafica = prs.slides.add_slide(layout_solo_titulo)
         
         # Título
         if slide_grafica.shapes.title:
             slide_grafica.shapes.title.text = titulo_grafica
         
-        # Imagen
-        image_stream = io.BytesIO()
-        figura.savefig(image_stream, format='png', bbox_inches='tight', dpi=150)
-        image_stream.seek(0)
+        # Gráfico nativo, imagen ya codificada por renderizar_graficas o figura Matplotlib
+        if modo_graficas == MODO_NATIVO:
+            agregar_grafica_nativa(slide_grafica, figura, Inches(0.5), Inches(1.5), Inches(9), Inches(5.5))
+            if progreso:
+                progreso(paso, total_pasos)
+            continue
+        if isinstance(figura, bytes):
+            image_stream = io.BytesIO(figura)
+        else:
+            image_stream = io.BytesIO()
+            figura.savefig(image_stream, format='png', bbox_inches='tight', dpi=150)
+            image_stream.seek(0)
         
+        huellas.add(hashlib.sha1(image_stream.getvalue()).hexdigest())
         slide_grafica.shapes.add_picture(image_stream, Inches(1), Inches(1.5), width=Inches(8))
+        if progreso:
+            progreso(paso, total_pasos)
+
+    if huellas:
+        print(f"🖼️ PPT: {len(graficas)} gráficas, {len(huellas)} imágenes distintas en el paquete.")
 
     # GUARDAR
-    output = io.BytesIO()
+    output = io.BytesIO() if destino is None else destino
     prs.save(output)
-    output.seek(0)
+    if destino is None:
+        output.seek(0)
+    if progreso:
+        progreso(total_pasos, total_pasos)
     
     return output
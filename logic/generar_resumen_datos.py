@@ -1,7 +1,11 @@
 import pandas as pd
 import numpy as np
+from logic.config import ORDEN_CURSOS
+from logic.esquema import resolver_esquema
+from logic.instrumentacion import instrumentar
 
 
+@instrumentar()
 def generar_resumen_datos(df):
     """
     Genera una tabla resumen extendida con datos académicos, satisfacción y gestión de solicitudes.
@@ -9,18 +13,19 @@ def generar_resumen_datos(df):
     if df is None or df.empty:
         return pd.DataFrame()
 
-    # 1. Identificar columnas clave (Asignatura, Curso, Cuatrimestre)
-    col_asig = next((c for c in df.columns if str(c).strip().startswith("Seleccione")), None)
-    col_curso = next((c for c in df.columns if "Curso" in str(c)), None)
-    col_cuatri = next((c for c in df.columns if "Cuatrimestre" in str(c)), None)
+    # 1. Identificar columnas clave (Asignatura, Curso, Cuatrimestre) con el esquema
+    #    de la cabecera (resuelto una sola vez por cabecera)
+    esquema = resolver_esquema(df.columns)
+    col_asig = esquema.col("asignatura")
+    col_curso = esquema.col("curso")
+    col_cuatri = esquema.col("cuatrimestre")
 
-    # 2. Identificar las 4 nuevas columnas por palabras clave (más seguro que por índice)
-    col_sat_res = next((c for c in df.columns if "satisfacción" in str(c) and "resultados" in str(c)), None)
-    col_sat_grup = next((c for c in df.columns if "satisfacción" in str(c) and "grupo" in str(c)), None)
-    
+    # 2. Identificar las columnas de satisfacción por palabras clave (más seguro que por índice)
+    col_sat_res = esquema.col("satisfaccion_resultados")
+    col_sat_grup = esquema.col("satisfaccion_grupo")
 
     # Verificación básica
-    if not all([col_asig, col_curso, col_cuatri]):
+    if esquema.faltan(["asignatura", "curso", "cuatrimestre"], por_cabecera=True):
         print("Error: Faltan columnas estructurales (Asignatura/Curso/Cuatrimestre).")
         return df
 
@@ -43,8 +48,9 @@ def generar_resumen_datos(df):
     df_res = df[cols_a_extraer].copy()
 
     # 5. Cálculos Numéricos (% Aprobados)
-    df_res['Aprobados_Subgrupo'] = pd.to_numeric(df_res['Aprobados_Subgrupo'], errors='coerce').fillna(0)
-    df_res['Matriculados_Subgrupo'] = pd.to_numeric(df_res['Matriculados_Subgrupo'], errors='coerce').fillna(0)
+    #    Los recuentos pueden venir como enteros compactos (Int8/Int16); el resumen trabaja en float
+    df_res['Aprobados_Subgrupo'] = pd.to_numeric(df_res['Aprobados_Subgrupo'], errors='coerce').astype('float64').fillna(0)
+    df_res['Matriculados_Subgrupo'] = pd.to_numeric(df_res['Matriculados_Subgrupo'], errors='coerce').astype('float64').fillna(0)
 
     df_res['% Aprobados'] = np.where(
         df_res['Matriculados_Subgrupo'] > 0,
@@ -54,14 +60,9 @@ def generar_resumen_datos(df):
     df_res['% Aprobados'] = df_res['% Aprobados'].round(2)
 
     # 6. Ordenación (Lógica de Curso texto a número)
-    mapa_orden = {
-        'Primero': 1, 'Segundo': 2, 'Tercero': 3, 'Cuarto': 4, 'Quinto': 5,
-        '1': 1, '2': 2, '3': 3, '4': 4, '1º': 1, '2º': 2, '3º': 3, '4º': 4
-    }
-    
     # Columnas temporales para ordenar
-    df_res['sort_curso'] = df_res[col_curso].astype(str).str.strip().map(mapa_orden).fillna(99)
-    df_res['sort_cuatri'] = df_res[col_cuatri].astype(str).str.strip().map(mapa_orden).fillna(99)
+    df_res['sort_curso'] = df_res[col_curso].astype(str).str.strip().map(ORDEN_CURSOS).fillna(99)
+    df_res['sort_cuatri'] = df_res[col_cuatri].astype(str).str.strip().map(ORDEN_CURSOS).fillna(99)
     
     # Ordenamos
     df_res = df_res.sort_values(by=['sort_curso', 'sort_cuatri', col_asig])
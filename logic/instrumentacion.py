@@ -0,0 +1,196 @@
+import functools
+import json
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+import pandas as pd
+from logic.config import INSTRUMENTAR_MEMORIA, MAX_MEDIDAS
+
+# Medidas recientes (una por llamada) y acumulados por etapa desde el arranque
+_medidas = deque(maxlen=MAX_MEDIDAS)
+_totales = {}
+_lock = threading.Lock()
+
+# Etapas que están midiendo memoria ahora mismo, en cualquier hilo (protegidas por
+# _lock). tracemalloc es global al proceso: se arranca con la primera y se para
+# con la última, y su pico solo se reinicia tras anotarlo en todas las abiertas
+_marcos_memoria = []
+_tracemalloc_propio = False
+_memoria_activa = INSTRUMENTAR_MEMORIA
+
+MB = 1024 * 1024
+
+def activar_memoria(activa=True):
+    """Activa o desactiva la medición de memoria (tracemalloc) para todas las etapas."""
+    global _memoria_activa
+    _memoria_activa = activa
+
+def _contar_filas(resultado):
+    if isinstance(resultado, pd.DataFrame):
+        return len(resultado)
+    if isinstance(resultado, (list, tuple, dict)):
+        return len(resultado)
+    return None
+
+def _registrar(medida):
+    with _lock:
+        _medidas.append(medida)
+        total = _totales.setdefault(medida["etapa"], {
+            "llamadas": 0, "errores": 0, "tiempo_s": 0.0, "cpu_s": 0.0,
+            "filas": 0, "memoria_pico_mb": 0.0,
+        })
+        total["llamadas"] += 1
+        total["errores"] += 1 if medida.get("error") else 0
+        total["tiempo_s"] += medida["tiempo_s"]
+        total["cpu_s"] += medida["cpu_s"]
+        total["filas"] += medida["filas_entrada"] or 0
+        if medida["memoria_pico_mb"] is not None:
+            total["memoria_pico_mb"] = max(total["memoria_pico_mb"], medida["memoria_pico_mb"])
+
+# -----------------------------------------------------------------------------
+# Medición
+# -----------------------------------------------------------------------------
+
+@contextmanager
+def medir_etapa(nombre, filas_entrada=None, memoria=None):
+    """
+    Mide un bloque: tiempo de reloj, tiempo de CPU del hilo, pico de memoria
+    reservada por Python (tracemalloc) y filas procesadas.
+
+        with medir_etapa("lectura") as medida:
+            df = ...
+            medida["filas_salida"] = len(df)
+
+    Las etapas se pueden anidar: el pico de la exterior incluye el de las
+    interiores. tracemalloc es global al proceso: con varios hilos a la vez,
+    el pico de una etapa incluye lo que reservan las demás durante ella (nunca
+    es menor que el suyo propio).
+
+    Args:
+        nombre: Nombre de la etapa.
+        filas_entrada: (Opcional) Filas de entrada.
+        memoria: True/False para forzar la medición de memoria; por defecto,
+            INSTRUMENTAR_MEMORIA (ver activar_memoria).
+    """
+    medir_memoria = _memoria_activa if memoria is None else memoria
+    medida = {
+        "etapa": nombre,
+        "inicio": datetime.now().isoformat(timespec="seconds"),
+        "filas_entrada": filas_entrada,
+        "filas_salida": None,
+        "memoria_pico_mb": None,
+    }
+    marco = {"base": 0, "pico": 0}
+
+    if medir_memoria:
+        _abrir_marco_memoria(marco)
+
+    t0, cpu0 = time.perf_counter(), time.thread_time()
+    try:
+        yield medida
+    except Exception as e:
+        medida["error"] = type(e).__name__
+        raise
+    finally:
+        medida["tiempo_s"] = round(time.perf_counter() - t0, 4)
+        medida["cpu_s"] = round(time.thread_time() - cpu0, 4)
+
+        if medir_memoria:
+            pico = _cerrar_marco_memoria(marco)
+            medida["memoria_pico_mb"] = round((pico - marco["base"]) / MB, 2)
+
+        _registrar(medida)
+
+def _abrir_marco_memoria(marco):
+    """Empieza a medir la memoria de una etapa (arranca tracemalloc si es la primera)."""
+    global _tracemalloc_propio
+    with _lock:
+        if not _marcos_memoria and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracemalloc_propio = True
+        actual, pico = tracemalloc.get_traced_memory()
+        # El pico de las etapas abiertas (de este u otros hilos) se guarda antes de reiniciarlo
+        for abierto in _marcos_memoria:
+            abierto["pico"] = max(abierto["pico"], pico)
+        tracemalloc.reset_peak()
+        marco["base"] = marco["pico"] = actual
+        _marcos_memoria.append(marco)
+
+def _cerrar_marco_memoria(marco):
+    """Pico de memoria de la etapa desde que se abrió (para tracemalloc si era la última)."""
+    global _tracemalloc_propio
+    with _lock:
+        _, pico = tracemalloc.get_traced_memory()
+        pico = max(pico, marco["pico"])
+        # Por identidad: dos marcos pueden tener los mismos valores
+        del _marcos_memoria[next(i for i, m in enumerate(_marcos_memoria) if m is marco)]
+        if not _marcos_memoria and _tracemalloc_propio:
+            tracemalloc.stop()
+            _tracemalloc_propio = False
+        return pico
+
+def instrumentar(nombre=None):
+    """
+    Decorador para los puntos de entrada de logic/: mide cada llamada con
+    medir_etapa. Las filas de entrada son las del primer argumento (si es un
+    DataFrame) y las de salida, las del resultado.
+    """
+    def decorador(funcion):
+        etapa = nombre or funcion.__name__
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            df = args[0] if args and isinstance(args[0], pd.DataFrame) else None
+            with medir_etapa(etapa, len(df) if df is not None else None) as medida:
+                resultado = funcion(*args, **kwargs)
+                medida["filas_salida"] = _contar_filas(resultado)
+            return resultado
+
+        return envoltura
+    return decorador
+
+# -----------------------------------------------------------------------------
+# Consulta y exportación
+# -----------------------------------------------------------------------------
+
+def medidas():
+    """Copia de las medidas recientes (la más antigua primero)."""
+    with _lock:
+        return list(_medidas)
+
+def totales():
+    """Acumulados por etapa desde el arranque del proceso."""
+    with _lock:
+        return {etapa: dict(valores) for etapa, valores in _totales.items()}
+
+def limpiar_medidas():
+    """Vacía las medidas recientes (los acumulados de Prometheus se conservan)."""
+    with _lock:
+        _medidas.clear()
+
+def exportar_json():
+    """Medidas recientes y acumulados, como texto JSON."""
+    return json.dumps({"medidas": medidas(), "totales": totales()}, ensure_ascii=False, indent=2)
+
+def exportar_prometheus():
+    """Acumulados por etapa en el formato de texto de Prometheus."""
+    metricas = [
+        ("informe_etapa_llamadas_total", "counter", "Llamadas por etapa.", "llamadas"),
+        ("informe_etapa_errores_total", "counter", "Llamadas terminadas en excepción.", "errores"),
+        ("informe_etapa_segundos_total", "counter", "Tiempo de reloj acumulado (s).", "tiempo_s"),
+        ("informe_etapa_cpu_segundos_total", "counter", "Tiempo de CPU acumulado (s).", "cpu_s"),
+        ("informe_etapa_filas_total", "counter", "Filas de entrada procesadas.", "filas"),
+        ("informe_etapa_memoria_pico_bytes", "gauge", "Mayor pico de memoria de una llamada.", "memoria_pico_mb"),
+    ]
+    acumulados = totales()
+    lineas = []
+    for nombre, tipo, ayuda, clave in metricas:
+        lineas.append(f"# HELP {nombre} {ayuda}")
+        lineas.append(f"# TYPE {nombre} {tipo}")
+        for etapa, valores in sorted(acumulados.items()):
+            valor = valores[clave] * MB if clave == "memoria_pico_mb" else valores[clave]
+            lineas.append(f'{nombre}{{etapa="{etapa}"}} {round(valor, 6)}')
+    return "\n".join(lineas) + "\n"
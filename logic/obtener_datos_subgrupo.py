@@ -1,68 +1,178 @@
 import pandas as pd
 import numpy as np
 from logic.config import MAPA_TITULACIONES, IDX_COMUNES
+from logic.instrumentacion import instrumentar
 
-def obtener_datos_subgrupo(df, codigo):
-    codigo = codigo.upper()
-    config = MAPA_TITULACIONES.get(codigo)
-    
-    if not config:
-        print(f"Error: Código '{codigo}' no encontrado.")
-        return None
+# -----------------------------------------------------------------------------
+# Funciones auxiliares (compartidas por la extracción individual y la masiva)
+# -----------------------------------------------------------------------------
 
-    # 1. Preparar DF
-    df_temp = df.copy()
-    df_temp.iloc[:, 5] = df_temp.iloc[:, 5].astype(str).str.strip()
+def _texto_sin_espacios(serie, texto_nulo):
+    """
+    Columna como texto sin espacios sobrantes. En columnas 'category' solo se
+    normalizan las categorías (una vez cada una) y se expanden por sus códigos.
+    """
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        categorias = serie.cat.categories.astype(str).str.strip().to_numpy(dtype=object)
+        # El código -1 (nulo) toma el último elemento: texto_nulo
+        valores = np.append(categorias, texto_nulo)[serie.cat.codes.to_numpy()]
+        return pd.Series(valores, index=serie.index, dtype=object)
+    if texto_nulo == '':
+        serie = serie.fillna('')
+    return serie.astype(str).str.strip()
 
-    # 2. Filtro Nombre (Col 5)
-    mask_nombre = df_temp.iloc[:, 5] == config['raiz']
+def _normalizar_titulos(df):
+    """Columna de titulación (Col 5) como texto sin espacios sobrantes."""
+    return _texto_sin_espacios(df.iloc[:, 5], 'nan')
 
-    # 3. Filtro Campus (Si aplica)
-    mask_campus = True
-    col_campus_idx = -1 # Valor centinela
-    
+def _normalizar_campus(df, col_campus_idx):
+    """Columna de campus como texto sin espacios (vacío si no hay dato)."""
+    return _texto_sin_espacios(df.iloc[:, col_campus_idx], '')
+
+def _filtrar_posiciones(df, config, candidatos, campus_norm):
+    """
+    Aplica los filtros de campus y de datos existentes sobre las filas candidatas
+    (las que ya coinciden en titulación). Devuelve posiciones enteras.
+    """
+    # Filtro Campus (Si aplica)
     if 'filtro_campus' in config:
         datos_campus = config['filtro_campus']
-        col_campus_idx = datos_campus['col']
-        valor_esperado = datos_campus['valor']
-        
-        # Convertimos a string y comparamos
-        col_campus_vals = df_temp.iloc[:, col_campus_idx].fillna('').astype(str).str.strip()
-        mask_campus = col_campus_vals == valor_esperado
-
-    # 4. Filtro Datos Existentes (Buscamos datos en la columna de Aprobados)
+        col_campus = campus_norm(datos_campus['col'])
+        mask_campus = col_campus.iloc[candidatos].to_numpy() == datos_campus['valor']
+        candidatos = candidatos[mask_campus]
+
+    # Filtro Datos Existentes (Buscamos datos en la columna de Aprobados)
     # Nota: config['cols'][1] es Aprobados (porque el 0 ahora es Asignatura)
-    col_aprobados_idx = config['cols'][1] 
-    mask_datos = pd.notna(df_temp.iloc[:, col_aprobados_idx])
+    col_aprobados_idx = config['cols'][1]
+    mask_datos = pd.notna(df.iloc[candidatos, col_aprobados_idx]).to_numpy()
 
-    # Aplicar Filtros
-    mask_final = mask_nombre & mask_campus & mask_datos
+    return candidatos[mask_datos]
 
-    if not mask_final.any():
+def _extraer_subgrupo(df, titulos, codigo, config, posiciones):
+    """Construye el DataFrame final del subgrupo a partir de sus posiciones."""
+    if len(posiciones) == 0:
         print(f"Aviso: No se encontraron registros para {codigo}.")
         return pd.DataFrame()
 
-    # 5. Selección de Columnas (Eliminando explícitamente la de Campus)
+    cols_seleccionadas, cabecera = columnas_subgrupo(df, config)
+
+    # Crear DF Final (con la titulación ya normalizada) y Renombrar
+    df_resultado = df.iloc[posiciones, cols_seleccionadas].copy()
+    df_resultado.isetitem(cols_seleccionadas.index(5), titulos.iloc[posiciones].to_numpy())
+    df_resultado.columns = cabecera
+
+    print(f"Extracción exitosa: {codigo} -> {len(df_resultado)} registros.")
+    return df_resultado
+
+def columnas_subgrupo(df, config):
+    """
+    Columnas (posiciones en df) que forman el DataFrame de un subgrupo y su
+    cabecera final, ya renombrada: Aprobados_Subgrupo / Matriculados_Subgrupo.
+    """
+    # Selección de Columnas (Eliminando explícitamente la de Campus)
     cols_seleccionadas = IDX_COMUNES + config['cols']
-    
+
     # SEGURIDAD: Si la columna de campus está en la lista de selección, la quitamos
-    if col_campus_idx != -1 and col_campus_idx in cols_seleccionadas:
-        cols_seleccionadas.remove(col_campus_idx)
-        
+    if 'filtro_campus' in config:
+        col_campus_idx = config['filtro_campus']['col']
+        if col_campus_idx in cols_seleccionadas:
+            cols_seleccionadas.remove(col_campus_idx)
+
     cols_seleccionadas.sort()
 
-    # 6. Crear DF Final y Renombrar
-    df_resultado = df_temp.iloc[mask_final.values, cols_seleccionadas].copy()
-    
     # Renombrado dinámico (Ahora Asignatura es el índice 0 de 'cols')
     col_aprobados_name = df.columns[config['cols'][1]]
     col_matriculados_name = df.columns[config['cols'][2]]
-    
+
     rename_dict = {
         col_aprobados_name: 'Aprobados_Subgrupo',
         col_matriculados_name: 'Matriculados_Subgrupo'
     }
-    df_resultado.rename(columns=rename_dict, inplace=True)
-    
-    print(f"Extracción exitosa: {codigo} -> {len(df_resultado)} registros.")
-    return df_resultado
+    cabecera = [rename_dict.get(df.columns[i], df.columns[i]) for i in cols_seleccionadas]
+    return cols_seleccionadas, cabecera
+
+def _cache_campus(df):
+    """Normaliza cada columna de campus una sola vez, bajo demanda."""
+    normalizadas = {}
+
+    def campus_norm(col_campus_idx):
+        if col_campus_idx not in normalizadas:
+            normalizadas[col_campus_idx] = _normalizar_campus(df, col_campus_idx)
+        return normalizadas[col_campus_idx]
+
+    return campus_norm
+
+# -----------------------------------------------------------------------------
+# Extracción de un subgrupo
+# -----------------------------------------------------------------------------
+
+@instrumentar()
+def obtener_datos_subgrupo(df, codigo):
+    codigo = codigo.upper()
+    config = MAPA_TITULACIONES.get(codigo)
+
+    if not config:
+        print(f"Error: Código '{codigo}' no encontrado.")
+        return None
+
+    # 1. Filtro Nombre (Col 5)
+    titulos = _normalizar_titulos(df)
+    candidatos = np.flatnonzero((titulos == config['raiz']).to_numpy())
+
+    # 2. Filtros Campus y Datos Existentes
+    posiciones = _filtrar_posiciones(df, config, candidatos, _cache_campus(df))
+
+    # 3. Selección de columnas y renombrado
+    return _extraer_subgrupo(df, titulos, codigo, config, posiciones)
+
+# -----------------------------------------------------------------------------
+# Extracción de todos los subgrupos en una pasada
+# -----------------------------------------------------------------------------
+
+def obtener_indices_subgrupos(df, codigos=None):
+    """
+    Calcula las filas (posiciones enteras) de cada subgrupo con una sola pasada.
+
+    La titulación y el campus se normalizan una única vez y las filas se agrupan
+    por titulación; cada subgrupo solo filtra campus/datos sobre su grupo.
+
+    Args:
+        df: DataFrame completo (ya filtrado por fechas).
+        codigos: (Opcional) Lista de códigos. Por defecto, todo MAPA_TITULACIONES.
+
+    Returns:
+        (titulos, {codigo: np.ndarray de posiciones})
+    """
+    codigos = [c.upper() for c in (codigos or MAPA_TITULACIONES.keys())]
+
+    titulos = _normalizar_titulos(df)
+    grupos = titulos.groupby(titulos.to_numpy(), sort=False).indices
+    campus_norm = _cache_campus(df)
+    vacio = np.array([], dtype=np.intp)
+
+    indices = {}
+    for codigo in codigos:
+        config = MAPA_TITULACIONES.get(codigo)
+        if not config:
+            print(f"Error: Código '{codigo}' no encontrado.")
+            continue
+        candidatos = grupos.get(config['raiz'], vacio)
+        indices[codigo] = _filtrar_posiciones(df, config, candidatos, campus_norm)
+
+    return titulos, indices
+
+@instrumentar()
+def obtener_todos_subgrupos(df, codigos=None):
+    """
+    Equivalente a llamar a obtener_datos_subgrupo para cada código, pero
+    recorriendo y normalizando el DataFrame una sola vez.
+
+    Returns:
+        Diccionario {codigo: DataFrame} (DataFrame vacío si no hay registros).
+    """
+    titulos, indices = obtener_indices_subgrupos(df, codigos)
+
+    return {
+        codigo: _extraer_subgrupo(df, titulos, codigo, MAPA_TITULACIONES[codigo], posiciones)
+        for codigo, posiciones in indices.items()
+    }
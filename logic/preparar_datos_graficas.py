@@ -0,0 +1,172 @@
+import numpy as np
+import pandas as pd
+from logic.esquema import resolver_esquema
+
+# Métricas a representar (globales y por curso)
+CONFIG_GRAFICAS = [
+    {"col": "% Aprobados", "titulo": "Porcentaje de Aprobados", "ylabel": "% Aprobados", "ylim": (0, 100)},
+    {"col": "Valoración Resultados", "titulo": "Valoración Resultados", "ylabel": "Puntuación (0-5)", "ylim": (0, 5)},
+    {"col": "Valoración Grupo", "titulo": "Valoración Grupo", "ylabel": "Puntuación (0-5)", "ylim": (0, 5)}
+]
+
+# Paleta cualitativa 'Set2' (ColorBrewer), la misma que sns.color_palette("Set2"),
+# sin importar seaborn/Matplotlib: el PPT con gráficas nativas no los necesita
+PALETA_SET2 = ["66C2A5", "FC8D62", "8DA0CB", "E78AC3", "A6D854", "FFD92F", "E5C494", "B3B3B3"]
+
+# -----------------------------------------------------------------------------
+# Función principal
+# -----------------------------------------------------------------------------
+
+def preparar_datos_graficas(df):
+    """
+    Especificaciones (dict) de todas las gráficas, con los datos ya listos para
+    pintar: arrays de solo lectura con Asignatura, valor y (en las globales)
+    Curso, en el orden final de las barras.
+
+    Todo el trabajo sobre el DataFrame se hace una vez: un orden global
+    (Curso, Asignatura), un único lexsort por métrica que ordena a la vez todos
+    los cursos (Curso, valor descendente) y las medias de todas las métricas
+    en una sola operación. El renderizador no toca pandas.
+
+    Args:
+        df: DataFrame resumen (salida de generar_resumen_datos).
+    """
+    df = _normalizar_columnas(df)
+    if df is None:
+        return []
+
+    metricas = [cfg for cfg in CONFIG_GRAFICAS if cfg["col"] in df.columns]
+    n_filas = len(df)
+    posiciones = np.arange(n_filas)
+    asignaturas = df['Asignatura'].to_numpy(dtype=object)
+
+    # --- 1. CURSOS Y COLORES ---
+    # Convertimos curso a string para evitar errores de ordenación con tipos mixtos
+    if 'Curso' in df.columns:
+        cursos = df['Curso'].astype(str).to_numpy(dtype=object)
+        cursos_unicos, codigo_curso = np.unique(cursos, return_inverse=True)
+        cursos_unicos = cursos_unicos.tolist()
+    else:
+        cursos, codigo_curso, cursos_unicos = None, None, []
+
+    # Configuración de colores
+    if cursos_unicos:
+        mapa_colores = {curso: color_set2(i) for i, curso in enumerate(cursos_unicos)}
+    else:
+        mapa_colores = {}
+
+    # --- 2. VALORES Y MEDIAS DE TODAS LAS MÉTRICAS A LA VEZ ---
+    valores = pd.DataFrame(
+        {cfg["col"]: pd.to_numeric(df[cfg["col"]], errors='coerce') for cfg in metricas},
+        index=df.index,
+    ).astype('float64')
+    # Línea de media (solo si hay datos numéricos válidos)
+    medias = valores.mean().where(valores.notna().any())
+    valores = {col: valores[col].to_numpy() for col in valores.columns}
+
+    especificaciones = []
+
+    # --- 3. GRÁFICAS GLOBALES (un solo orden para todas las métricas) ---
+    orden_global = _orden_global(df, cursos)
+    usar_hue = cursos is not None and bool(mapa_colores)
+
+    for cfg in metricas:
+        especificaciones.append({
+            "titulo": f"Global: {cfg['titulo']}",
+            "titulo_grafica": f"GLOBAL - {cfg['titulo']}",
+            "cfg": cfg,
+            "figsize": (14, 8),
+            "datos": _datos_grafica(asignaturas, valores[cfg["col"]], orden_global,
+                                    cursos if usar_hue else None),
+            "palette": mapa_colores if usar_hue else None,
+            "color": None,
+            "media": None if pd.isna(medias[cfg["col"]]) else medias[cfg["col"]],
+        })
+
+    # --- 4. GRÁFICAS POR CURSO ---
+    if not cursos_unicos:
+        return especificaciones
+
+    # Un lexsort por métrica: agrupa por curso y ordena por valor descendente
+    # (NaN al final, empates en el orden original); luego se corta por curso
+    limites = np.cumsum(np.bincount(codigo_curso, minlength=len(cursos_unicos)))[:-1]
+    tramos = {}
+    for cfg in metricas:
+        v = valores[cfg["col"]]
+        clave_valor = np.where(np.isnan(v), np.inf, -v)
+        orden = np.lexsort((posiciones, clave_valor, codigo_curso))
+        tramos[cfg["col"]] = np.split(orden, limites)
+
+    for i, curso in enumerate(cursos_unicos):
+        for cfg in metricas:
+            especificaciones.append({
+                "titulo": f"Curso {curso}: {cfg['titulo']}",
+                "titulo_grafica": f"CURSO {curso} - {cfg['titulo']}",
+                "cfg": cfg,
+                "figsize": (10, 6),
+                "datos": _datos_grafica(asignaturas, valores[cfg["col"]], tramos[cfg["col"]][i]),
+                "palette": None,
+                "color": mapa_colores[curso],
+                "media": None,
+            })
+
+    return especificaciones
+
+# -----------------------------------------------------------------------------
+# Funciones auxiliares
+# -----------------------------------------------------------------------------
+
+def color_set2(i):
+    """Color i de la paleta Set2 como tupla RGB (0-1); se repite en ciclo, como seaborn."""
+    hexadecimal = PALETA_SET2[i % len(PALETA_SET2)]
+    return tuple(int(hexadecimal[k:k + 2], 16) / 255 for k in (0, 2, 4))
+
+def _normalizar_columnas(df):
+    """Renombra Asignatura/Curso/Cuatrimestre por el esquema; None si falta Asignatura."""
+    # En lugar de usar nombres fijos, buscamos las columnas por palabras clave
+    # (esquema cacheado por cabecera: Asignatura, Curso y Cuatrimestre)
+    esquema = resolver_esquema(df.columns, tipo="resumen")
+    col_asig = esquema.col("asignatura")
+    col_curso = esquema.col("curso")
+    col_cuatri = esquema.col("cuatrimestre")
+
+    rename_map = {}
+    if col_asig: rename_map[col_asig] = 'Asignatura'
+    if col_curso: rename_map[col_curso] = 'Curso'
+    if col_cuatri: rename_map[col_cuatri] = 'Cuatrimestre'
+
+    df = df.rename(columns=rename_map)
+    df.columns = df.columns.str.strip()
+
+    # Validación de seguridad: Si no encontramos las columnas clave, salimos
+    if 'Asignatura' not in df.columns:
+        print("⚠️ No se encontró la columna de Asignatura.")
+        return None
+
+    # Columnas 'category' (Excel compactado) como valores sueltos: seaborn pintaría
+    # todas las categorías, también las que no tienen datos en este subgrupo
+    for c in df.columns[df.dtypes == 'category']:
+        df[c] = df[c].astype(object)
+    return df
+
+def _orden_global(df, cursos):
+    """Posiciones ordenadas por (Curso, Asignatura); el orden original si no se puede ordenar."""
+    claves = pd.DataFrame({'Asignatura': df['Asignatura'].to_numpy()})
+    if cursos is not None:
+        claves.insert(0, 'Curso', cursos)
+    try:
+        return claves.sort_values(by=list(claves.columns)).index.to_numpy()
+    except TypeError:
+        return claves.index.to_numpy()
+
+def _datos_grafica(asignaturas, valores, orden, cursos=None):
+    """Arrays de solo lectura de una gráfica, ya en el orden de las barras."""
+    datos = {
+        "asignaturas": asignaturas[orden],
+        "valores": valores[orden],
+        "cursos": cursos[orden] if cursos is not None else None,
+    }
+    for array in datos.values():
+        if array is not None:
+            array.flags.writeable = False
+    return datos
@@ -0,0 +1,132 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Trabajos que se conservan (con su resultado); se expulsan primero los más antiguos ya terminados
+MAX_TRABAJOS = 32
+
+# Hilos para los trabajos (las gráficas ya reparten su render en un pool de procesos)
+MAX_WORKERS_TRABAJOS = 2
+
+# Estados de un trabajo
+PENDIENTE = "pendiente"
+EN_CURSO = "en curso"
+TERMINADO = "terminado"
+ERROR = "error"
+
+_trabajos = OrderedDict()   # id -> Trabajo
+_por_clave = {}             # (tipo, clave) -> id
+_lock = threading.Lock()
+_pool_trabajos = None
+
+class Trabajo:
+    """
+    Estado de un trabajo en segundo plano (Word, PPT, gráficas, texto del acta).
+    La interfaz lo consulta periódicamente: estado, progreso (0-1) y mensaje.
+    """
+
+    def __init__(self, tipo, clave):
+        self.id = uuid.uuid4().hex[:12]
+        self.tipo = tipo
+        self.clave = clave
+        self.estado = PENDIENTE
+        self.progreso = 0.0
+        self.mensaje = "En cola..."
+        self.resultado = None
+        self.error = None
+        self.creado = time.time()
+        self.duracion = None
+
+    @property
+    def en_curso(self):
+        return self.estado in (PENDIENTE, EN_CURSO)
+
+    def actualizar(self, hechas, total, mensaje=None):
+        """Callback de progreso para las funciones de logic/ (progreso=trabajo.actualizar)."""
+        self.progreso = min(1.0, hechas / total) if total else 1.0
+        self.mensaje = mensaje or f"{hechas} de {total}"
+
+def subprogreso(progreso, desde, hasta, etiqueta):
+    """
+    Adapta un callback de progreso a un tramo [desde, hasta] del total, para
+    trabajos con varias fases (p.ej. gráficas y después diapositivas).
+    """
+    def callback(hechas, total, mensaje=None):
+        fraccion = hechas / total if total else 1.0
+        progreso(desde + (hasta - desde) * fraccion, 1.0, f"{etiqueta}: {mensaje or f'{hechas} de {total}'}")
+    return callback
+
+# -----------------------------------------------------------------------------
+# Ejecución
+# -----------------------------------------------------------------------------
+
+def _obtener_pool():
+    global _pool_trabajos
+    with _lock:
+        if _pool_trabajos is None:
+            _pool_trabajos = ThreadPoolExecutor(max_workers=MAX_WORKERS_TRABAJOS, thread_name_prefix="trabajo")
+        return _pool_trabajos
+
+def _ejecutar(trabajo, funcion, args, kwargs):
+    trabajo.estado = EN_CURSO
+    trabajo.mensaje = "Iniciando..."
+    t0 = time.perf_counter()
+    try:
+        trabajo.resultado = funcion(*args, progreso=trabajo.actualizar, **kwargs)
+        trabajo.progreso = 1.0
+        trabajo.mensaje = "Terminado"
+        trabajo.estado = TERMINADO
+    except Exception as e:
+        print(f"❌ Trabajo {trabajo.tipo} ({trabajo.id}) fallido: {e}")
+        trabajo.error = f"{type(e).__name__}: {e}"
+        trabajo.mensaje = "Error"
+        trabajo.estado = ERROR
+    finally:
+        trabajo.duracion = round(time.perf_counter() - t0, 3)
+
+def _expulsar():
+    """Mantiene el almacén acotado sin descartar trabajos que siguen en marcha."""
+    sobrantes = len(_trabajos) - MAX_TRABAJOS
+    for id_trabajo in [i for i, t in _trabajos.items() if not t.en_curso][:max(0, sobrantes)]:
+        trabajo = _trabajos.pop(id_trabajo)
+        if _por_clave.get((trabajo.tipo, trabajo.clave)) == id_trabajo:
+            del _por_clave[(trabajo.tipo, trabajo.clave)]
+
+def enviar_trabajo(tipo, clave, funcion, *args, **kwargs):
+    """
+    Encola funcion(*args, progreso=callback, **kwargs) y devuelve el id del trabajo.
+
+    Si ya hay un trabajo con el mismo (tipo, clave) en marcha o terminado, no se
+    lanza otro: se devuelve su id. Los fallidos se relanzan (quien llama decide
+    cuándo reintentar; la app solo lo hace al pulsar "Reintentar").
+
+    Args:
+        tipo: 'word', 'ppt', 'graficas', 'prompt'...
+        clave: Identifica el contenido (p.ej. fichero, titulación y fechas). Hashable.
+        funcion: Debe aceptar el argumento 'progreso'.
+    """
+    with _lock:
+        existente = _trabajos.get(_por_clave.get((tipo, clave)))
+        if existente is not None and existente.estado != ERROR:
+            _trabajos.move_to_end(existente.id)
+            return existente.id
+
+        trabajo = Trabajo(tipo, clave)
+        _trabajos[trabajo.id] = trabajo
+        _por_clave[(tipo, clave)] = trabajo.id
+        _expulsar()
+
+    _obtener_pool().submit(_ejecutar, trabajo, funcion, args, kwargs)
+    return trabajo.id
+
+def obtener_trabajo(id_trabajo):
+    """Trabajo por id (None si no existe o ya se expulsó)."""
+    with _lock:
+        return _trabajos.get(id_trabajo)
+
+def buscar_trabajo(tipo, clave):
+    """Último trabajo lanzado para (tipo, clave), o None."""
+    with _lock:
+        return _trabajos.get(_por_clave.get((tipo, clave)))
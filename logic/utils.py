@@ -1,11 +1,62 @@
+import functools
+import hashlib
 import pandas as pd
 import numpy as np
+from logic.instrumentacion import instrumentar
 
 # -----------------------------------------------------------------------------
 # Filtros de dataframes
 # -----------------------------------------------------------------------------
 
-def filtrar_por_fechas(df, fecha_inicio, fecha_fin=None):
+@functools.lru_cache(maxsize=64)
+def _parsear_fecha(texto):
+    """Convierte 'DD-MM-AAAA' a Timestamp (cacheado: los límites se repiten en cada rerun)."""
+    return pd.to_datetime(texto, dayfirst=True)
+
+def preparar_fechas(df):
+    """
+    Convierte (en el sitio) la columna de marca temporal (Col 1) a datetime64.
+    Se hace una sola vez, al cargar el Excel; si ya es datetime64 no hace nada.
+    """
+    if not pd.api.types.is_datetime64_any_dtype(df.iloc[:, 1]):
+        df.isetitem(1, pd.to_datetime(df.iloc[:, 1], dayfirst=True, errors='coerce'))
+    return df
+
+class IndiceFechas:
+    """
+    Índice ordenado de la columna de fechas (Col 1) de un DataFrame.
+
+    Filtrar un rango es una búsqueda binaria (searchsorted) en lugar de
+    comparar toda la columna. Las filas sin fecha (NaT) nunca se seleccionan.
+    """
+
+    def __init__(self, df):
+        valores = df.iloc[:, 1].to_numpy(dtype='datetime64[ns]')
+        self.n_filas = len(df)
+        self.orden = np.argsort(valores, kind='stable')  # NaT queda al final
+        ordenadas = valores[self.orden]
+        self.fechas = ordenadas[:int((~np.isnat(ordenadas)).sum())]
+
+    def posiciones(self, inicio_dt, fin_dt=None):
+        """Posiciones (en el orden original) con inicio_dt <= fecha <= fin_dt."""
+        lo = np.searchsorted(self.fechas, np.datetime64(inicio_dt, 'ns'), side='left')
+        if fin_dt is not None:
+            hi = np.searchsorted(self.fechas, np.datetime64(fin_dt, 'ns'), side='right')
+        else:
+            hi = len(self.fechas)
+        return np.sort(self.orden[lo:max(lo, hi)])
+
+def seleccionar_filas(df, posiciones):
+    """
+    df.iloc[posiciones], pero si las posiciones son consecutivas (Excel ordenado
+    por fecha de envío, lo habitual) devuelve un slice sin copiar filas.
+    """
+    if len(posiciones) and posiciones[-1] - posiciones[0] + 1 == len(posiciones):
+        return df.iloc[posiciones[0]:posiciones[-1] + 1]
+    return df.iloc[posiciones]
+
+@instrumentar()
+def filtrar_por_fechas(df, fecha_inicio, fecha_fin=None, indice=None):
     """
     Filtra el DataFrame por rango de fechas (DD-MM-AAAA).
     
@@ -13,33 +64,89 @@ def filtrar_por_fechas(df, fecha_inicio, fecha_fin=None):
         df: DataFrame original.
         fecha_inicio: String 'DD-MM-AAAA' (ej: '25-01-2024').
         fecha_fin: (Opcional) String 'DD-MM-AAAA'.
+        indice: (Opcional) IndiceFechas de df ya construido, para no reordenar
+            la columna de fechas en cada llamada.
     """
-    df_res = df.copy()
-    
-    # 1. Convertir columna del Excel a datetime (asumiendo formato europeo)
-    df_res.iloc[:, 1] = pd.to_datetime(df_res.iloc[:, 1], dayfirst=True, errors='coerce')
-    
     try:
-        # 2. Convertir fecha de inicio (Forzamos día primero)
-        inicio_dt = pd.to_datetime(fecha_inicio, dayfirst=True)
-        
-        # 3. Definir la máscara de filtrado
-        if fecha_fin:
-            fin_dt = pd.to_datetime(fecha_fin, dayfirst=True)
-            # Filtro: Entre inicio y fin (ambos inclusive)
-            mask = (df_res.iloc[:, 1] >= inicio_dt) & (df_res.iloc[:, 1] <= fin_dt)
-        else:
-            # Filtro: Desde inicio en adelante
-            mask = df_res.iloc[:, 1] >= inicio_dt
-            
-        return df_res[mask]
-
+        # 1. Convertir fechas límite (Forzamos día primero)
+        inicio_dt = _parsear_fecha(fecha_inicio)
+        fin_dt = _parsear_fecha(fecha_fin) if fecha_fin else None
     except Exception as e:
         print(f"Error al procesar las fechas: {e}")
         return pd.DataFrame()
 
+    # 2. Columna del Excel a datetime (solo si no se hizo ya al cargar)
+    if not pd.api.types.is_datetime64_any_dtype(df.iloc[:, 1]):
+        df = preparar_fechas(df.copy())
+        indice = None
 
+    # 3. Búsqueda binaria sobre el índice ordenado (ambos extremos inclusive)
+    if indice is None or indice.n_filas != len(df):
+        indice = IndiceFechas(df)
 
+    return seleccionar_filas(df, indice.posiciones(inicio_dt, fin_dt))
 
+# -----------------------------------------------------------------------------
+# Normalización de textos (pre-pasada vectorizada)
+# -----------------------------------------------------------------------------
+
+TEXTO_NO_INDICADO = "No indicado / No aplica"
+
+def normalizar_columnas_texto(df, indices):
+    """
+    Convierte las columnas indicadas (por posición) en listas de str, columna a
+    columna, con la misma regla que el antiguo safe_get por fila:
+    nulos, vacíos o "nan" -> "No indicado / No aplica"; resto -> str(valor).strip();
+    columna inexistente -> "N/A".
+
+    Returns:
+        Diccionario {indice: [str, ...]} en el orden de filas de df.
+    """
+    resultado = {}
+    for idx in indices:
+        if not -df.shape[1] <= idx < df.shape[1]:
+            resultado[idx] = ["N/A"] * len(df)
+            continue
+
+        serie = df.iloc[:, idx]
+        if pd.api.types.is_extension_array_dtype(serie.dtype) and serie.dtype.kind in "iu":
+            # Recuentos compactados a Int* (ver compactar_tipos): venían de columnas
+            # float y se escriben como siempre ("102.0"), con los nulos como NaN
+            serie = serie.astype("float64")
+        valores = serie.to_numpy(dtype=object)
+        textos = pd.Series(valores, dtype=object).map(str)
+
+        vacios = pd.isna(valores) | (valores == "") | textos.str.lower().eq("nan").to_numpy()
+        resultado[idx] = textos.str.strip().where(~vacios, TEXTO_NO_INDICADO).tolist()
 
+    return resultado
 
+def calcular_tasas_exito(aprobados, matriculados, solo_matriculados_positivos=False):
+    """
+    Tasa de éxito (Aprobados / Matriculados * 100) a partir de los textos ya
+    normalizados. Devuelve floats, NaN donde no es calculable (texto no
+    numérico, 0 matriculados o, si se pide, matriculados negativos).
+    """
+    a = pd.to_numeric(pd.Series(aprobados, dtype=object), errors="coerce").to_numpy(dtype=float)
+    m = pd.to_numeric(pd.Series(matriculados, dtype=object), errors="coerce").to_numpy(dtype=float)
+    validos = m > 0 if solo_matriculados_positivos else m != 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tasas = np.where(validos, a / m * 100, np.nan)
+    return tasas
+
+# -----------------------------------------------------------------------------
+# Huellas de datos (claves de caché)
+# -----------------------------------------------------------------------------
+
+def hash_dataframe(df, *extras):
+    """
+    Huella SHA-256 del contenido de un DataFrame (valores, índice, columnas y
+    tipos) más cualquier parámetro adicional que afecte al resultado cacheado.
+    """
+    h = hashlib.sha256()
+    h.update(repr(list(df.columns)).encode())
+    h.update(repr([str(t) for t in df.dtypes]).encode())
+    h.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    for extra in extras:
+        h.update(repr(extra).encode())
+    return h.hexdigest()